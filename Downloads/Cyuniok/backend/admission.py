@@ -0,0 +1,209 @@
+from __future__ import annotations
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Per-mode admission control: at most `concurrency` inferences run at once,
+# at most `queue` more wait (FIFO) for up to `timeout_s`; everything beyond
+# that is shed immediately so tail latency stays bounded under overload.
+#
+# Background work (batch jobs) waits in a separate, unbounded lane without a
+# deadline. It only gets a slot when no interactive request is waiting and
+# at least `reserve` slots would stay free for interactive traffic. A freed
+# slot always goes to a waiting interactive request first.
+
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "sklearn": {"concurrency": 8, "queue": 64, "timeout_s": 2},
+    "hf": {"concurrency": 2, "queue": 16, "timeout_s": 10},
+    "zeroshot": {"concurrency": 1, "queue": 8, "timeout_s": 20},
+    "llm": {"concurrency": 1, "queue": 4, "timeout_s": 30},
+    "gemini": {"concurrency": 16, "queue": 64, "timeout_s": 10},
+    "hf_api": {"concurrency": 8, "queue": 32, "timeout_s": 20},
+}
+
+
+class Rejected(Exception):
+    """Raised instead of queueing: 429 when the queue is full, 503 on queue timeout."""
+
+    def __init__(self, mode: str, status: int, reason: str, retry_after: int):
+        super().__init__(f"{mode} {reason}; retry after {retry_after}s")
+        self.mode = mode
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A held slot. `release()` is idempotent so every exit path may call it."""
+
+    def __init__(self, gate: "AdmissionGate", background: bool = False):
+        self._gate: Optional[AdmissionGate] = gate
+        self._started = time.monotonic()
+        self.background = background
+        if background:
+            gate.background_active += 1
+
+    def release(self) -> None:
+        gate, self._gate = self._gate, None
+        if gate is not None:
+            if self.background:
+                gate.background_active -= 1
+            gate._release(time.monotonic() - self._started)
+
+
+class AdmissionGate:
+    def __init__(self, mode: str, concurrency: int, queue: int, timeout_s: float):
+        self.mode = mode
+        self.concurrency = max(1, int(concurrency))
+        self.queue = max(0, int(queue))
+        self.timeout_s = float(timeout_s)
+        self.active = 0
+        self._waiters: deque = deque()
+        self._bg_waiters: deque = deque()
+        self.reserve = 1
+        self.background_active = 0
+        self.background_admitted = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.queue_wait_total_s = 0.0
+        self._service_ewma = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for f in self._waiters if not f.done())
+
+    @property
+    def background_queued(self) -> int:
+        return sum(1 for f in self._bg_waiters if not f.done())
+
+    def _background_limit(self) -> int:
+        # With a single slot there is nothing to reserve; interactive
+        # requests still win every handover.
+        return self.concurrency - max(0, min(self.reserve, self.concurrency - 1))
+
+    def retry_after(self) -> int:
+        # Rough time for the current backlog to drain, never less than a second
+        service = self._service_ewma or 1.0
+        backlog = self.active + self.queued
+        return max(1, math.ceil(service * backlog / self.concurrency))
+
+    def configure(self, concurrency: int, queue: int, timeout_s: float) -> None:
+        self.concurrency = max(1, int(concurrency))
+        self.queue = max(0, int(queue))
+        self.timeout_s = float(timeout_s)
+        # A raised limit hands free slots to whoever is already waiting
+        while self.active < self.concurrency and self._wake_one():
+            self.active += 1
+        while self.active < self._background_limit() and self._wake_one(self._bg_waiters):
+            self.active += 1
+
+    async def acquire(self) -> Ticket:
+        if self.active < self.concurrency and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            return Ticket(self)
+        if self.queued >= self.queue:
+            self.rejected_queue_full += 1
+            raise Rejected(self.mode, 429, "queue full", self.retry_after())
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        enqueued = time.monotonic()
+        try:
+            done, _ = await asyncio.wait({fut}, timeout=self.timeout_s)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release(None)  # slot was handed over as we were cancelled
+            else:
+                fut.cancel()
+            raise
+        finally:
+            self.queue_wait_total_s += time.monotonic() - enqueued
+        if not done:
+            fut.cancel()
+            self.rejected_timeout += 1
+            raise Rejected(self.mode, 503, "queue timeout", self.retry_after())
+        self.admitted += 1
+        return Ticket(self)
+
+    async def acquire_background(self) -> Ticket:
+        """Slot for bulk work: waits as long as needed, behind interactive requests."""
+        if self.active < self._background_limit() and not self.queued and not self.background_queued:
+            self.active += 1
+            self.background_admitted += 1
+            return Ticket(self, background=True)
+        fut = asyncio.get_running_loop().create_future()
+        self._bg_waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release(None)
+            else:
+                fut.cancel()
+            raise
+        self.background_admitted += 1
+        return Ticket(self, background=True)
+
+    def _wake_one(self, waiters: Optional[deque] = None) -> bool:
+        waiters = self._waiters if waiters is None else waiters
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return True
+        return False
+
+    def _release(self, service_s: Optional[float]) -> None:
+        if service_s is not None:
+            self._service_ewma = service_s if not self._service_ewma else 0.8 * self._service_ewma + 0.2 * service_s
+        # Hand the slot straight to the next waiter, interactive first; otherwise free it
+        if self.active > self.concurrency:
+            self.active -= 1
+        elif self._wake_one():
+            pass
+        elif self.active > self._background_limit() or not self._wake_one(self._bg_waiters):
+            self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "queue_limit": self.queue,
+            "queue_timeout_s": self.timeout_s,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "queue_wait_total_s": round(self.queue_wait_total_s, 6),
+            "avg_service_ms": round(self._service_ewma * 1000, 3),
+            "background_active": self.background_active,
+            "background_queued": self.background_queued,
+            "background_admitted": self.background_admitted,
+        }
+
+
+_gates: Dict[str, AdmissionGate] = {}
+
+
+def _limits(mode: str, config: Dict[str, Any]) -> tuple:
+    base = dict(DEFAULT_LIMITS.get(mode) or DEFAULT_LIMITS["sklearn"])
+    override = (config.get("admission") or {}).get(mode) or {}
+    base.update({k: v for k, v in override.items() if v is not None})
+    return int(base["concurrency"]), int(base["queue"]), float(base["timeout_s"])
+
+
+def get_gate(mode: str, config: Dict[str, Any]) -> AdmissionGate:
+    limits = _limits(mode, config)
+    gate = _gates.get(mode)
+    if gate is None:
+        gate = _gates[mode] = AdmissionGate(mode, *limits)
+    elif (gate.concurrency, gate.queue, gate.timeout_s) != limits:
+        gate.configure(*limits)
+    return gate
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    return {mode: gate.stats() for mode, gate in _gates.items()}
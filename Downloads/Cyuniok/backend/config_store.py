@@ -0,0 +1,276 @@
+from __future__ import annotations
+import contextvars
+import json
+import os
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+# Immutable config snapshots. config.json is parsed and validated once per
+# change into a Snapshot: values are coerced to the type of their default,
+# `*_labels` become tuples of label strings (a comma-separated string is
+# split here, once), and nested lists/dicts are frozen. Publishing a new
+# config replaces one reference, so a reader sees either the old snapshot or
+# the new one, never a mix.
+#
+# A request pins the snapshot that is current when it starts (pin(), called
+# by the HTTP middleware) and every CONFIG read in that request, including
+# threadpool work it starts, sees that snapshot. A watcher thread polls the
+# file's mtime/size/inode and publishes a new snapshot when it changes.
+
+_pinned: contextvars.ContextVar[Optional["Snapshot"]] = contextvars.ContextVar("config_snapshot", default=None)
+
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off", ""}
+
+
+def labels(value: Any) -> Tuple[str, ...]:
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(str(v).strip() for v in (value or ()) if str(v).strip())
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def coerce(key: str, value: Any, default: Any) -> Any:
+    """`value` as the type of `default`; raises ValueError if it cannot be."""
+    if key.endswith("_labels"):
+        return labels(value) or labels(default)
+    if default is None or value is None:
+        return _freeze(value)
+    if isinstance(default, bool):
+        if isinstance(value, str):
+            if value.strip().lower() in _TRUE:
+                return True
+            if value.strip().lower() in _FALSE:
+                return False
+            raise ValueError(f"expected a boolean, got {value!r}")
+        return bool(value)
+    if isinstance(default, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"expected a number, got {value!r}")
+        number = float(value) if isinstance(value, str) else value
+        if isinstance(default, int) and float(number).is_integer():
+            return int(number)
+        return float(number)
+    if isinstance(default, str):
+        if isinstance(value, (Mapping, list, tuple)):
+            raise ValueError(f"expected a string, got {value!r}")
+        return str(value)
+    if isinstance(default, dict) and not isinstance(value, Mapping):
+        raise ValueError(f"expected an object, got {value!r}")
+    if isinstance(default, (list, tuple)) and not isinstance(value, (list, tuple)):
+        raise ValueError(f"expected a list, got {value!r}")
+    return _freeze(value)
+
+
+class Snapshot(Mapping):
+    """Read-only, validated config; `version` increases with every publish."""
+
+    __slots__ = ("_data", "version")
+
+    def __init__(self, data: Mapping[str, Any], version: int = 0):
+        self._data = MappingProxyType(dict(data))
+        self.version = version
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain JSON-ready copy."""
+        return {k: _thaw(v) for k, v in self._data.items()}
+
+
+def parse(raw: Mapping[str, Any], defaults: Mapping[str, Any], version: int = 0) -> Snapshot:
+    """Defaults overlaid with `raw`, validated; invalid values keep their default."""
+    data = {k: coerce(k, v, v) for k, v in defaults.items()}
+    for key, value in raw.items():
+        default = defaults.get(key)
+        try:
+            data[key] = coerce(key, value, default)
+        except (TypeError, ValueError) as e:
+            print(f"[config] {key}: {e}; using {default!r}")
+    return Snapshot(data, version)
+
+
+class ConfigStore:
+    def __init__(self, path: Path, defaults: Mapping[str, Any]):
+        self.path = path
+        self.defaults = dict(defaults)
+        # Two layers: what the file says, and in-memory overrides (CLI flags,
+        # tests) applied on top of every file load and never written back
+        self._file: Dict[str, Any] = {}
+        self._overrides: Dict[str, Any] = {}
+        self._current = parse({}, self.defaults)
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._lock = threading.Lock()  # writers only; readers just take the reference
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def current(self) -> Snapshot:
+        return self._current
+
+    def _file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _publish_locked(self) -> Snapshot:
+        self._current = parse({**self._file, **self._overrides}, self.defaults, self._current.version + 1)
+        return self._current
+
+    def load(self) -> bool:
+        """Read the file if it changed since the last load; True if a new snapshot was published."""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp is None:
+                if not self.path.exists():
+                    # Write defaults the first time
+                    self._write_locked(parse(self._file, self.defaults).to_dict())
+                return False
+            if stamp == self._stamp:
+                return False
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                # Fail-soft: keep serving the last good snapshot
+                print(f"[config] ignoring {self.path}: {e}")
+                self._stamp = stamp
+                return False
+            self._stamp = stamp
+            if not isinstance(data, dict):
+                return False
+            self._file = data
+            self._publish_locked()
+            return True
+
+    def _write_locked(self, data: Dict[str, Any]) -> None:
+        try:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)  # readers of the file never see half of it
+            self._stamp = self._file_stamp()
+        except OSError as e:
+            print(f"[config] could not write {self.path}: {e}")
+
+    def update(self, changes: Mapping[str, Any], drop: Iterable[str] = (), persist: bool = True) -> Snapshot:
+        """Publish a snapshot with `changes` applied (and `drop` keys removed).
+
+        persist=True changes the file layer and writes it; a key changed that
+        way also loses its in-memory override, so the change takes effect.
+        persist=False changes only the override layer.
+        """
+        with self._lock:
+            layer = self._file if persist else self._overrides
+            layer.update(changes)
+            for key in drop:
+                layer.pop(key, None)
+            if persist:
+                for key in (*changes, *drop):
+                    self._overrides.pop(key, None)
+                # Overrides stay out of the file
+                self._write_locked(parse(self._file, self.defaults).to_dict())
+            return self._publish_locked()
+
+    def derive(self, overrides: Mapping[str, Any], base: Optional[Snapshot] = None) -> Snapshot:
+        """An unpublished snapshot: `base` (default: the current one) with `overrides` applied."""
+        base = base or self._current
+        return parse({**base.to_dict(), **overrides}, self.defaults, base.version)
+
+    # -- watcher --
+    def start_watcher(self, interval_s: float = 1.0) -> None:
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def watch() -> None:
+            while not self._stop.wait(max(0.05, float(self._current.get("config_watch_s") or interval_s))):
+                try:
+                    if self.load():
+                        print(f"[config] reloaded {self.path} (version {self._current.version})")
+                except Exception as e:  # the watcher must outlive a bad edit
+                    print(f"[config] reload failed: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+
+
+def pin(snapshot: Optional[Snapshot]) -> Optional[Snapshot]:
+    """Make `snapshot` what CONFIG reads in this context (request, task); None unpins."""
+    _pinned.set(snapshot)
+    return snapshot
+
+
+class ConfigView(Mapping):
+    """CONFIG: the pinned snapshot inside a request, else the current one.
+
+    Item assignment sets an in-memory override: it survives file reloads and
+    is never written to the file. It exists for CLI overrides and tests; the
+    API goes through ConfigStore.update().
+    """
+
+    def __init__(self, store: ConfigStore):
+        self._store = store
+
+    def snapshot(self) -> Snapshot:
+        return _pinned.get() or self._store.current()
+
+    def __getitem__(self, key: str) -> Any:
+        return self.snapshot()[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.snapshot().get(key, default)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.snapshot())
+
+    def __len__(self) -> int:
+        return len(self.snapshot())
+
+    def _republish(self, snapshot: Snapshot) -> None:
+        if _pinned.get() is not None:
+            _pinned.set(snapshot)  # the writer sees its own change
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._republish(self._store.update({key: value}, persist=False))
+
+    def __delitem__(self, key: str) -> None:
+        self._republish(self._store.update({}, drop=[key], persist=False))
+
+    def update(self, changes: Mapping[str, Any], persist: bool = True) -> Snapshot:
+        snapshot = self._store.update(changes, persist=persist)
+        self._republish(snapshot)
+        return snapshot
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.snapshot().to_dict()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+import os
+import sys
+from typing import Any, Dict, List, Mapping, Optional
+
+# CPU thread topology for the torch backends (hf, zeroshot, llm).
+#
+# torch sizes its intra-op pool to every core of the machine. With several
+# workers on one box that is workers x cores threads competing for the same
+# cores, and latency gets worse as workers are added. Each worker therefore
+# gets torch_threads intra-op threads (0 = its share of the cores) and
+# torch_interop_threads inter-op threads. With cpu_affinity, backend.serve also
+# pins worker i to its own slice of the cores, so threads do not migrate
+# between workers' caches.
+#
+# The worker count comes from backend.serve (set_worker) or, under plain
+# `uvicorn --workers N`, from WEB_CONCURRENCY.
+
+_THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+_worker: Dict[str, Any] = {"index": None, "workers": None, "pinned": False}
+_applied: Dict[str, int] = {}
+
+
+def available_cores() -> List[int]:
+    """Cores this process may run on (its affinity mask where supported)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_slice(cores: List[int], index: int, workers: int) -> List[int]:
+    """Worker `index`'s contiguous share of `cores`; shares differ by at most one core."""
+    workers = max(1, workers)
+    if workers >= len(cores):
+        return [cores[index % len(cores)]]
+    size, extra = divmod(len(cores), workers)
+    start = index * size + min(index, extra)
+    return cores[start:start + size + (1 if index < extra else 0)]
+
+
+def worker_count() -> int:
+    if _worker["workers"]:
+        return int(_worker["workers"])
+    try:
+        return max(1, int(os.getenv("WEB_CONCURRENCY") or 1))
+    except ValueError:
+        return 1
+
+
+def intra_threads(config: Mapping[str, Any]) -> int:
+    configured = int(config.get("torch_threads") or 0)
+    if configured > 0:
+        return configured
+    cores = len(available_cores())
+    # A pinned worker's mask is already its share
+    return max(1, cores if _worker["pinned"] else cores // worker_count())
+
+
+def set_worker(index: int, workers: int, config: Mapping[str, Any]) -> None:
+    """Called in each forked worker before it serves: affinity and thread env."""
+    _worker.update(index=index, workers=workers, pinned=False)
+    if config.get("cpu_affinity"):
+        if hasattr(os, "sched_setaffinity"):
+            cores = core_slice(available_cores(), index, workers)
+            try:
+                os.sched_setaffinity(0, cores)
+                _worker["pinned"] = True
+            except OSError as e:
+                print(f"[cpu] worker {index}: affinity {cores} failed: {e}", file=sys.stderr)
+        else:
+            print("[cpu] cpu_affinity needs Linux; ignored", file=sys.stderr)
+    threads = str(intra_threads(config))
+    for var in _THREAD_ENV:
+        # Only matters for libraries not yet imported (torch: apply_torch); an explicit setting wins
+        os.environ.setdefault(var, threads)
+    apply_torch(config)
+
+
+def apply_torch(config: Mapping[str, Any]) -> Dict[str, int]:
+    """Size torch's thread pools for this worker, if torch is loaded; idempotent."""
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return {}
+    intra = intra_threads(config)
+    if _applied.get("intra") != intra:
+        torch.set_num_threads(intra)
+        _applied["intra"] = intra
+    inter = int(config.get("torch_interop_threads") or 0)
+    if inter > 0 and "inter" not in _applied:
+        try:
+            # Allowed once, before any inter-op work has started
+            torch.set_num_interop_threads(inter)
+        except RuntimeError as e:
+            print(f"[cpu] torch_interop_threads={inter} not applied: {e}", file=sys.stderr)
+        _applied["inter"] = torch.get_num_interop_threads()
+    return dict(_applied)
+
+
+def describe(config: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "pid": os.getpid(),
+        "worker": _worker["index"],
+        "workers": worker_count(),
+        "pinned": _worker["pinned"],
+        "cores": available_cores(),
+    }
+    if config is not None:
+        out["torch_threads_target"] = intra_threads(config)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        out["torch_threads"] = torch.get_num_threads()
+        out["torch_interop_threads"] = torch.get_num_interop_threads()
+    return out
@@ -0,0 +1,127 @@
+from __future__ import annotations
+import gzip
+import json
+from typing import Any, FrozenSet, Iterable, Mapping, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from . import metrics
+
+# Fast JSON responses for the prediction endpoints.
+#
+# Handlers build plain dicts from values they already typed themselves, and
+# these are encoded once, with orjson when it is installed. The default
+# FastAPI path instead validates the return value against response_model
+# again, walks it with jsonable_encoder and then runs json.dumps. response_model
+# stays on the routes for the OpenAPI schema only.
+#
+# Clients can ask for a subset of fields (?fields=prediction,confidence). The
+# body is compressed with brotli (if installed) or gzip when the client
+# accepts it and the body is at least compress_min_bytes long. Multi-KB
+# remote `reason` texts and large batches compress well.
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output
+    orjson = None
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+EXPLAIN_LEVELS = ("none", "features", "full")
+# Bodies larger than this are compressed in the threadpool, off the event loop
+_INLINE_COMPRESS_BYTES = 256 * 1024
+
+
+def _default(obj: Any) -> Any:
+    # numpy scalars (np.float64 is a float subclass orjson does not take)
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_default).encode("utf-8")
+
+
+def parse_fields(value: Optional[str], allowed: Iterable[str]) -> Optional[FrozenSet[str]]:
+    """The requested field names, or None for all; ValueError on an unknown name."""
+    if not value:
+        return None
+    fields = frozenset(f.strip() for f in value.split(",") if f.strip())
+    unknown = sorted(fields - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown field(s) {', '.join(unknown)}; choose from {', '.join(sorted(allowed))}")
+    return fields or None
+
+
+def select(payload: Mapping[str, Any], fields: Optional[FrozenSet[str]]) -> Mapping[str, Any]:
+    if fields is None:
+        return payload
+    return {k: v for k, v in payload.items() if k in fields}
+
+
+def explain_for(explain: str, fields: Optional[FrozenSet[str]]) -> str:
+    """The cheapest explain level that still fills the requested fields."""
+    if fields is None:
+        return explain
+    if fields & {"reason", "reason_id"}:
+        needed = "full"
+    elif "top_features" in fields:
+        needed = "features"
+    else:
+        needed = "none"
+    return min(explain, needed, key=EXPLAIN_LEVELS.index)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The coding to use for an Accept-Encoding header: br, gzip or None (q-values honoured)."""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    star = weights.get("*", 0.0)
+    options = [("br", weights.get("br", star)), ("gzip", weights.get("gzip", star))]
+    if brotli is None:
+        options = options[1:]
+    # Highest q wins; on a tie the first (br: smaller output) does
+    best = max(options, key=lambda o: o[1])
+    return best[0] if best[1] > 0 else None
+
+
+def compress(body: bytes, coding: str, config: Mapping[str, Any]) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=int(config.get("brotli_quality", 4)))
+    return gzip.compress(body, compresslevel=int(config.get("gzip_level", 5)))
+
+
+async def respond(request: Any, payload: Any, config: Mapping[str, Any], status_code: int = 200) -> Response:
+    """`payload` as a JSON response, compressed when negotiated and worth it."""
+    body = dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    coding = None
+    min_bytes = int(config.get("compress_min_bytes") or 0)
+    if min_bytes > 0 and len(body) >= min_bytes:
+        coding = negotiate(request.headers.get("accept-encoding", "") if request is not None else "")
+    metrics.inc("predictor_response_json_bytes_total", len(body))
+    if coding is not None:
+        if len(body) > _INLINE_COMPRESS_BYTES:
+            body = await run_in_threadpool(compress, body, coding, config)
+        else:
+            body = compress(body, coding, config)
+        headers["Content-Encoding"] = coding
+    metrics.inc("predictor_response_bytes_total", len(body), encoding=coding or "identity")
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
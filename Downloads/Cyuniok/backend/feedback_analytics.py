@@ -0,0 +1,149 @@
+from __future__ import annotations
+import re
+import sqlite3
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Running feedback aggregates, kept in the feedback database next to the raw
+# rows and updated in the same transaction that inserts them. Every worker's
+# writer contributes, and a report reads only these small tables:
+#   confusion  (mode, model, actual, predicted) -> n
+#   hourly     (mode, hour) -> total, corrected
+#   terms      (mode, term) -> rows where the prediction was corrected
+# Reading is bounded by the label set, the 30 days of hourly buckets and
+# the `top` terms, not by how much feedback has been collected.
+#
+# A row whose correct_label is empty confirms the prediction; otherwise the
+# correct label is the truth and the row counts as corrected when it differs.
+
+WINDOWS = (("1h", 3600), ("24h", 86400), ("7d", 7 * 86400), ("30d", 30 * 86400))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agg_confusion (
+    mode TEXT NOT NULL, model TEXT NOT NULL, actual TEXT NOT NULL, predicted TEXT NOT NULL,
+    n INTEGER NOT NULL, PRIMARY KEY (mode, model, actual, predicted)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agg_hourly (
+    mode TEXT NOT NULL, hour INTEGER NOT NULL, total INTEGER NOT NULL, corrected INTEGER NOT NULL,
+    PRIMARY KEY (mode, hour)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agg_terms (
+    mode TEXT NOT NULL, term TEXT NOT NULL, n INTEGER NOT NULL, PRIMARY KEY (mode, term)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS agg_terms_top ON agg_terms (mode, n DESC);
+"""
+
+_TOKEN = re.compile(r"[a-z][a-z'-]{2,}")
+_STOP = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most my
+myself no nor not now of off on once only or other our ours ourselves out over own same she should so
+some such than that the their theirs them themselves then there these they this those through to too
+under until up very was we were what when where which while who whom why will with would you your
+yours yourself yourselves case plaintiff defendant court
+""".split())
+
+
+def terms(text: str) -> List[str]:
+    """Distinct content words of `text`, each counted once per row."""
+    return list(dict.fromkeys(t.strip("'-") for t in _TOKEN.findall(text.lower()) if t not in _STOP))
+
+
+def _deltas(rows: Iterable[Sequence[Any]]) -> Tuple[Counter, Dict[Tuple[str, int], List[int]], Counter]:
+    # rows: (created, summary, predicted, correct_label, mode, model)
+    confusion: Counter = Counter()
+    hourly: Dict[Tuple[str, int], List[int]] = {}
+    term_counts: Counter = Counter()
+    for created, summary, predicted, correct, mode, model in rows:
+        actual = (correct or "").strip() or predicted
+        corrected = actual != predicted
+        mode = mode or "unknown"
+        confusion[(mode, model or "", actual, predicted)] += 1
+        bucket = hourly.setdefault((mode, int(created // 3600)), [0, 0])
+        bucket[0] += 1
+        bucket[1] += corrected
+        if corrected:
+            for term in terms(summary):
+                term_counts[(mode, term)] += 1
+    return confusion, hourly, term_counts
+
+
+def apply(conn: sqlite3.Connection, rows: Iterable[Sequence[Any]]) -> None:
+    """Fold new feedback rows into the aggregates (inside the caller's transaction)."""
+    confusion, hourly, term_counts = _deltas(rows)
+    conn.executemany(
+        "INSERT INTO agg_confusion (mode, model, actual, predicted, n) VALUES (?, ?, ?, ?, ?)"
+        " ON CONFLICT (mode, model, actual, predicted) DO UPDATE SET n = n + excluded.n",
+        [(*k, n) for k, n in confusion.items()],
+    )
+    conn.executemany(
+        "INSERT INTO agg_hourly (mode, hour, total, corrected) VALUES (?, ?, ?, ?)"
+        " ON CONFLICT (mode, hour) DO UPDATE SET total = total + excluded.total,"
+        " corrected = corrected + excluded.corrected",
+        [(*k, t, c) for k, (t, c) in hourly.items()],
+    )
+    conn.executemany(
+        "INSERT INTO agg_terms (mode, term, n) VALUES (?, ?, ?)"
+        " ON CONFLICT (mode, term) DO UPDATE SET n = n + excluded.n",
+        [(*k, n) for k, n in term_counts.items()],
+    )
+
+
+def rebuild(conn: sqlite3.Connection, chunk: int = 5000) -> None:
+    """Recompute every aggregate from the raw rows (inside the caller's transaction)."""
+    for table in ("agg_confusion", "agg_hourly", "agg_terms"):
+        conn.execute(f"DELETE FROM {table}")
+    cur = conn.execute("SELECT created, summary, predicted, correct_label, mode, model FROM feedback ORDER BY id")
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            return
+        apply(conn, rows)
+
+
+def report(conn: sqlite3.Connection, mode: Optional[str] = None, top: int = 20,
+           now: Optional[float] = None) -> Dict[str, Any]:
+    now = time.time() if now is None else now
+    where, args = ("WHERE mode = ?", (mode,)) if mode else ("", ())
+    out: Dict[str, Any] = {}
+
+    def entry(m: str) -> Dict[str, Any]:
+        return out.setdefault(m, {"models": {}, "correction_rate": {}, "misclassified_terms": []})
+
+    for m, model, actual, predicted, n in conn.execute(
+        f"SELECT mode, model, actual, predicted, n FROM agg_confusion {where} ORDER BY mode, model, actual, predicted", args
+    ):
+        stats = entry(m)["models"].setdefault(model, {"total": 0, "correct": 0, "confusion": {}})
+        stats["total"] += n
+        stats["correct"] += n if actual == predicted else 0
+        stats["confusion"].setdefault(actual, {})[predicted] = n
+    for m in out:
+        for stats in out[m]["models"].values():
+            stats["accuracy"] = round(stats["correct"] / stats["total"], 4) if stats["total"] else None
+
+    oldest = int((now - WINDOWS[-1][1]) // 3600)
+    hours: Dict[str, List[Tuple[int, int, int]]] = {}
+    for m, hour, total, corrected in conn.execute(
+        f"SELECT mode, hour, total, corrected FROM agg_hourly WHERE hour >= ?{' AND mode = ?' if mode else ''}",
+        (oldest, *args),
+    ):
+        hours.setdefault(m, []).append((hour, total, corrected))
+    for m, buckets in hours.items():
+        rates = entry(m)["correction_rate"]
+        for name, seconds in WINDOWS:
+            since = int((now - seconds) // 3600)
+            total = sum(t for h, t, _ in buckets if h >= since)
+            corrected = sum(c for h, _, c in buckets if h >= since)
+            rates[name] = {"total": total, "corrected": corrected,
+                           "rate": round(corrected / total, 4) if total else None}
+
+    for m in list(out):
+        entry(m)["misclassified_terms"] = [
+            {"term": term, "count": n}
+            for term, n in conn.execute(
+                "SELECT term, n FROM agg_terms WHERE mode = ? ORDER BY n DESC, term LIMIT ?", (m, int(top))
+            )
+        ]
+    return out
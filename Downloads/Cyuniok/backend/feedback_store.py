@@ -0,0 +1,340 @@
+"""Feedback persistence: SQLite in WAL mode with batched background writes.
+
+    python -m backend.feedback_store export data/feedback_train.csv
+    python -m backend.feedback_store stats
+
+POST /feedback only puts the row on an in-process queue. A writer thread
+drains it every `flush_ms` (or as soon as `batch` rows are waiting) and
+inserts everything pending in one transaction. WAL mode lets readers run
+alongside the writer. Several uvicorn workers can share the database
+because each process has its own connection and transactions start with
+BEGIN IMMEDIATE under a busy timeout, so concurrent flushes queue up
+instead of interleaving. After a fork the writer thread is restarted in
+the child.
+
+The legacy data/feedback.csv is imported into a database the first time it
+is opened. The export streams rows in the summary,outcome
+format read by train_model.load_data; only rows with a correct_label are
+exported, and the latest label wins for a repeated summary.
+"""
+from __future__ import annotations
+import argparse
+import csv
+import io
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import feedback_analytics
+
+COLUMNS = ("summary", "predicted", "correct_label", "notes")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    summary TEXT NOT NULL,
+    predicted TEXT NOT NULL,
+    correct_label TEXT NOT NULL DEFAULT '',
+    notes TEXT NOT NULL DEFAULT '',
+    pid INTEGER,
+    mode TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS feedback_labeled ON feedback (summary, id) WHERE correct_label != '';
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+_INSERT = ("INSERT INTO feedback (created, summary, predicted, correct_label, notes, pid, mode, model)"
+           " VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+class Full(Exception):
+    """The write queue is full; the caller should retry shortly."""
+
+
+def connect(path: Path, timeout_s: float = 10.0) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=timeout_s, isolation_level=None, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout={int(timeout_s * 1000)}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # WAL keeps commits atomic; fsync at checkpoints
+    conn.executescript(_SCHEMA)
+    have = {row[1] for row in conn.execute("PRAGMA table_info(feedback)")}
+    for column in ("mode", "model"):  # databases created before analytics
+        if column not in have:
+            try:
+                conn.execute(f"ALTER TABLE feedback ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+    conn.executescript(feedback_analytics.SCHEMA)
+    return conn
+
+
+def _build_analytics(conn: sqlite3.Connection) -> None:
+    # One-off backfill for rows written before the aggregates existed
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'analytics_v1'").fetchone():
+            feedback_analytics.rebuild(conn)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('analytics_v1', '1')")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _import_legacy_csv(conn: sqlite3.Connection, csv_path: Optional[Path]) -> int:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_csv_imported'").fetchone():
+            conn.execute("COMMIT")
+            return 0
+        rows: List[Tuple[Any, ...]] = []
+        if csv_path is not None and csv_path.exists():
+            with csv_path.open(newline="", encoding="utf-8") as f:
+                for rec in csv.DictReader(f):
+                    rows.append((os.path.getmtime(csv_path), *(rec.get(c) or "" for c in COLUMNS), None, "", ""))
+        conn.executemany(_INSERT, rows)
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'analytics_v1'").fetchone():
+            feedback_analytics.apply(conn, [(r[0], r[1], r[2], r[3], r[6], r[7]) for r in rows])
+        conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_csv_imported', ?)", (str(len(rows)),))
+        conn.execute("COMMIT")
+        return len(rows)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+class FeedbackStore:
+    def __init__(self, path: Path, legacy_csv: Optional[Path] = None, flush_ms: float = 200,
+                 batch: int = 500, max_queue: int = 10000):
+        self.path = Path(path)
+        self.legacy_csv = legacy_csv
+        self.flush_s = max(0.001, float(flush_ms) / 1000)
+        self.batch = max(1, int(batch))
+        self._queue: "queue.Queue[Tuple[Any, ...]]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._flushed = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+
+    # -- writer --
+    def _ensure(self) -> None:
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # Fresh state after a fork: the parent's thread and connection do not exist here
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._stop = threading.Event()
+            self._conn = connect(self.path)
+            _import_legacy_csv(self._conn, self.legacy_csv)
+            _build_analytics(self._conn)
+            self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _drain(self) -> List[Tuple[Any, ...]]:
+        rows: List[Tuple[Any, ...]] = []
+        try:
+            while True:
+                rows.append(self._queue.get_nowait())
+        except queue.Empty:
+            return rows
+
+    def _write(self, rows: List[Tuple[Any, ...]]) -> None:
+        conn = self._conn
+        assert conn is not None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(_INSERT, rows)
+            # Aggregates move in the same transaction as the rows they count
+            feedback_analytics.apply(conn, [(r[0], r[1], r[2], r[3], r[6], r[7]) for r in rows])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_s)
+            self._wakeup.clear()
+            stopping = self._stop.is_set()
+            rows = self._drain()
+            if rows:
+                try:
+                    self._write(rows)
+                    self.written += len(rows)
+                    self.flushes += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[feedback] dropped {len(rows)} rows: {e}")
+            with self._flushed:
+                self._flushed.notify_all()
+            if stopping and self._queue.empty():
+                return
+
+    # -- API --
+    def add(self, summary: str, predicted: str, correct_label: str = "", notes: str = "",
+            mode: str = "", model: str = "") -> None:
+        """Queue one row; raises Full instead of blocking when the writer is behind."""
+        self._ensure()
+        row = (time.time(), summary, predicted, correct_label or "", notes or "", os.getpid(), mode or "", model or "")
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            raise Full("feedback queue is full")
+        if self._queue.qsize() >= self.batch:
+            self._wakeup.set()
+
+    def flush(self, timeout_s: float = 10.0) -> bool:
+        """Write everything queued so far; True when the queue drained in time."""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout_s
+        with self._flushed:
+            while not self._queue.empty():
+                self._wakeup.set()
+                if not self._flushed.wait(max(0.0, deadline - time.monotonic())):
+                    return False
+            # rows taken off the queue may still be in the transaction
+            self._wakeup.set()
+            return self._flushed.wait(max(0.0, deadline - time.monotonic()))
+
+    def close(self) -> None:
+        with self._lock:
+            thread = self._thread
+            if thread is not None and self._pid == os.getpid():
+                self._stop.set()
+                self._wakeup.set()
+                thread.join(timeout=10)
+                if self._conn is not None:
+                    self._conn.close()
+            self._thread = None
+            self._conn = None
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def analytics(self, mode: Optional[str] = None, top: int = 20) -> Dict[str, Any]:
+        conn = connect(self.path)
+        try:
+            if not conn.execute("SELECT 1 FROM meta WHERE key = 'analytics_v1'").fetchone():
+                _build_analytics(conn)
+            return feedback_analytics.report(conn, mode, top)
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        conn = connect(self.path)
+        try:
+            total, labeled = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(correct_label != ''), 0) FROM feedback"
+            ).fetchone()
+        finally:
+            conn.close()
+        return {"rows": total, "labeled": labeled, "queued": self.queue_depth(),
+                "written": self.written, "flushes": self.flushes, "errors": self.errors}
+
+
+def labeled_rows(path: Path, chunk: int = 1000) -> Iterator[Tuple[str, str]]:
+    """(summary, outcome) per distinct summary, using its latest correct_label."""
+    conn = connect(path)
+    try:
+        cur = conn.execute(
+            "SELECT f.summary, f.correct_label FROM feedback f"
+            " JOIN (SELECT summary, MAX(id) AS id FROM feedback WHERE correct_label != '' GROUP BY summary) latest"
+            " ON f.id = latest.id ORDER BY f.id"
+        )
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                return
+            for summary, label in rows:
+                summary, label = summary.strip(), label.strip()
+                if summary and label:
+                    yield summary, label
+    finally:
+        conn.close()
+
+
+def labeled_since(path: Path, after_id: int = 0, chunk: int = 1000) -> Iterator[Tuple[int, str, str]]:
+    """(id, summary, correct_label) of labeled rows newer than `after_id`, oldest first."""
+    conn = connect(path)
+    try:
+        cur = conn.execute(
+            "SELECT id, summary, correct_label FROM feedback WHERE id > ? AND correct_label != '' ORDER BY id",
+            (int(after_id),),
+        )
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        conn.close()
+
+
+def export_csv_chunks(path: Path, chunk: int = 1000) -> Iterator[str]:
+    """The training CSV (summary,outcome) as text chunks, for streaming responses."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["summary", "outcome"])
+    n = 0
+    for row in labeled_rows(path, chunk):
+        writer.writerow(row)
+        n += 1
+        if n % chunk == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def export_csv(path: Path, out: Path) -> int:
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    n = 0
+    with tmp.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["summary", "outcome"])
+        for row in labeled_rows(path):
+            writer.writerow(row)
+            n += 1
+    os.replace(tmp, out)
+    return n
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", default=os.getenv("FEEDBACK_DB_PATH", "data/feedback.db"))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    exp = sub.add_parser("export", help="write labeled feedback as summary,outcome CSV")
+    exp.add_argument("out")
+    sub.add_parser("stats", help="row counts")
+    args = ap.parse_args(argv)
+    db = Path(args.db)
+    if args.cmd == "export":
+        n = export_csv(db, Path(args.out))
+        print(f"[feedback] exported {n} labeled rows to {args.out}")
+    else:
+        print(FeedbackStore(db).stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
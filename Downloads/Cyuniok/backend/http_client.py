@@ -0,0 +1,311 @@
+from __future__ import annotations
+import asyncio
+import json
+import random
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Set
+
+if TYPE_CHECKING:
+    import httpx
+
+# Shared async HTTP layer for the remote providers (gemini, hf_api).
+# One pooled keep-alive client per provider, bounded concurrency, jittered
+# retries on 429/503 and a circuit breaker so a dead upstream fails fast.
+# httpx is imported on first use, so local-only deployments never load it.
+
+RETRY_STATUSES = {429, 503}
+
+
+class RemoteHTTPError(RuntimeError):
+    def __init__(self, provider: str, status: int, detail: str):
+        super().__init__(f"{provider} HTTP {status}: {detail}")
+        self.provider = provider
+        self.status = status
+        self.detail = detail
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} circuit open; retry in {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures.
+
+    After `reset_timeout` seconds one trial request is let through (half-open);
+    its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._trial_started = 0.0
+
+    def is_open(self) -> bool:
+        return self.state == "open" and self.retry_after() > 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if self.retry_after() > 0:
+                return False
+            self.state = "half_open"
+            self._trial_started = 0.0
+        # half_open: a single trial request at a time (a trial that never
+        # reported back, e.g. a cancelled request, expires after reset_timeout)
+        now = time.monotonic()
+        if self._trial_started and now - self._trial_started < self.reset_timeout:
+            return False
+        self._trial_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = "closed"
+        self._trial_started = 0.0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_started = 0.0
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+def _backoff(attempt: int, base: float, cap: float, retry_after: Optional[str] = None) -> float:
+    # Honor a numeric Retry-After when the server sends one, else full jitter
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class ProviderClient:
+    def __init__(
+        self,
+        name: str,
+        *,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        concurrency: int = 8,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.name = name
+        self.timeout = float(timeout)
+        self.connect_timeout = float(connect_timeout)
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self.breaker = breaker or CircuitBreaker()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    def _bind(self) -> None:
+        # httpx connections and asyncio semaphores belong to one event loop;
+        # rebuild them if we are called from a different one (tests, forks).
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is loop:
+            return
+        import httpx
+        self._retire()
+        self._loop = loop
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+                keepalive_expiry=60.0,
+            ),
+        )
+        self._sem = asyncio.Semaphore(self.concurrency)
+
+    def _retire(self) -> None:
+        """Detach the httpx client and close it on its own loop once its requests finish."""
+        loop, client, sem = self._loop, self._client, self._sem
+        self._loop = self._client = self._sem = None
+        if client is None or sem is None or loop is None or loop.is_closed():
+            return  # nothing open, or its connections went with the loop
+        slots = self.concurrency
+
+        async def drain_and_close() -> None:
+            # Requests in flight hold a slot; once all are back the pool is idle
+            for _ in range(slots):
+                await sem.acquire()
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+            for _ in range(slots):
+                sem.release()
+
+        fut = asyncio.run_coroutine_threadsafe(drain_and_close(), loop)
+        _retiring.add(fut)
+        fut.add_done_callback(_retiring.discard)
+
+    async def post_json(self, url: str, payload: Any, headers: Optional[Dict[str, str]] = None) -> Any:
+        import httpx
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name, self.breaker.retry_after())
+        self._bind()
+        # A settings change may retire self._client mid-request; keep using this one
+        client, sem = self._client, self._sem
+        assert client is not None and sem is not None
+        attempt = 0
+        async with sem:
+            while True:
+                try:
+                    resp = await client.post(url, json=payload, headers=headers)
+                except (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError) as e:
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(_backoff(attempt, self.backoff_base, self.backoff_max))
+                        attempt += 1
+                        continue
+                    self.breaker.record_failure()
+                    raise RemoteHTTPError(self.name, 0, str(e) or type(e).__name__) from e
+                except httpx.TimeoutException as e:
+                    self.breaker.record_failure()
+                    raise RemoteHTTPError(self.name, 0, f"timeout: {type(e).__name__}") from e
+                if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    delay = _backoff(attempt, self.backoff_base, self.backoff_max, resp.headers.get("retry-after"))
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                break
+        if resp.status_code >= 500 or resp.status_code == 429:
+            self.breaker.record_failure()
+            raise RemoteHTTPError(self.name, resp.status_code, resp.text)
+        # Other 4xx are caller errors (bad key, bad model); the upstream is healthy
+        self.breaker.record_success()
+        if resp.status_code >= 400:
+            raise RemoteHTTPError(self.name, resp.status_code, resp.text)
+        return resp.json()
+
+    async def stream_sse(self, url: str, payload: Any, headers: Optional[Dict[str, str]] = None) -> AsyncIterator[Any]:
+        """POST and yield the decoded `data:` events of a server-sent-event response.
+
+        Retries (429/503, connection errors) only happen before the first
+        event; a stream that breaks midway is reported, not replayed.
+        """
+        import httpx
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name, self.breaker.retry_after())
+        self._bind()
+        # A settings change may retire self._client mid-request; keep using this one
+        client, sem = self._client, self._sem
+        assert client is not None and sem is not None
+        attempt = 0
+        async with sem:
+            while True:
+                delay = None
+                started = False
+                try:
+                    async with client.stream("POST", url, json=payload, headers=headers) as resp:
+                        if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                            await resp.aread()
+                            delay = _backoff(attempt, self.backoff_base, self.backoff_max, resp.headers.get("retry-after"))
+                        elif resp.status_code >= 400:
+                            detail = (await resp.aread()).decode("utf-8", errors="ignore")
+                            if resp.status_code >= 500 or resp.status_code == 429:
+                                self.breaker.record_failure()
+                            else:
+                                self.breaker.record_success()
+                            raise RemoteHTTPError(self.name, resp.status_code, detail)
+                        else:
+                            async for line in resp.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if not data or data == "[DONE]":
+                                    continue
+                                started = True
+                                yield json.loads(data)
+                            self.breaker.record_success()
+                            return
+                except (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError) as e:
+                    if started or attempt >= self.max_retries:
+                        self.breaker.record_failure()
+                        raise RemoteHTTPError(self.name, 0, str(e) or type(e).__name__) from e
+                    delay = _backoff(attempt, self.backoff_base, self.backoff_max)
+                except httpx.TimeoutException as e:
+                    self.breaker.record_failure()
+                    raise RemoteHTTPError(self.name, 0, f"timeout: {type(e).__name__}") from e
+                await asyncio.sleep(delay or 0)
+                attempt += 1
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            try:
+                await self._client.aclose()
+            except Exception:
+                pass
+        self._client = None
+        self._loop = None
+
+
+_clients: Dict[str, ProviderClient] = {}
+_retiring: Set[Any] = set()  # pending closes of replaced clients
+_client_settings: Dict[str, tuple] = {}
+
+
+def get_client(provider: str, config: Dict[str, Any]) -> ProviderClient:
+    """Return the shared client for `provider`, rebuilt if its settings changed."""
+    settings = (
+        float(config.get(f"{provider}_timeout_s", 30)),
+        float(config.get("http_connect_timeout_s", 5)),
+        int(config.get(f"{provider}_concurrency", 8)),
+        int(config.get("http_max_retries", 2)),
+        float(config.get("http_backoff_s", 0.5)),
+        float(config.get("http_backoff_max_s", 8)),
+        int(config.get("breaker_failures", 5)),
+        float(config.get("breaker_reset_s", 30)),
+    )
+    client = _clients.get(provider)
+    if client is not None and _client_settings.get(provider) == settings:
+        return client
+    timeout, connect, conc, retries, base, cap, failures, reset = settings
+    breaker = client.breaker if client is not None else None
+    if client is not None:
+        client._retire()
+    if breaker is not None:
+        breaker.failure_threshold = max(1, failures)
+        breaker.reset_timeout = reset
+    client = ProviderClient(
+        provider,
+        timeout=timeout,
+        connect_timeout=connect,
+        concurrency=conc,
+        max_retries=retries,
+        backoff_base=base,
+        backoff_max=cap,
+        breaker=breaker or CircuitBreaker(failures, reset),
+    )
+    _clients[provider] = client
+    _client_settings[provider] = settings
+    return client
+
+
+async def close_all() -> None:
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
+    _client_settings.clear()
+
+
+def breaker_states() -> Dict[str, str]:
+    return {name: c.breaker.state for name, c in _clients.items()}
@@ -0,0 +1,198 @@
+from __future__ import annotations
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Asynchronous batch jobs. A submitted job is split into batches that a
+# bounded pool of workers (shared by all jobs) pushes through a scorer
+# callback. Results are appended in completion order, each tagged with its
+# input index, so clients can stream them as NDJSON while the job runs and
+# reconnect with an offset. Finished jobs are kept (up to `max_jobs`) for
+# polling and re-streaming.
+#
+# The scorer is supplied by backend.main. It takes its admission slots in the
+# gate's background lane, so interactive /predict requests always go first.
+
+Scorer = Callable[[str, str, List[str]], Awaitable[List[Dict[str, Any]]]]
+
+TERMINAL = ("completed", "failed", "cancelled")
+
+
+class Job:
+    def __init__(self, mode: str, explain: str, items: List[Tuple[Any, str]]):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.explain = explain
+        self.items = items
+        self.total = len(items)
+        self.results: List[Dict[str, Any]] = []
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.failed = 0
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL
+
+    def _notify(self) -> None:
+        # Wake every current waiter; later ones wait on a fresh event
+        event, self._changed = self._changed, asyncio.Event()
+        event.set()
+
+    def add(self, offset: int, scored: List[Dict[str, Any]]) -> None:
+        if self.done:
+            return  # cancelled while this batch was in flight
+        for i, result in enumerate(scored):
+            row_id, _ = self.items[offset + i]
+            self.results.append({"index": offset + i, "id": row_id, **result})
+            if result.get("error"):
+                self.failed += 1
+        self._notify()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        if self.done:
+            return
+        self.status = status
+        self.error = error
+        self.finished = time.time()
+        self.items = []  # inputs are no longer needed; results stay
+        self._notify()
+
+    async def wait(self, seen: int) -> None:
+        """Return once there are more than `seen` results or the job is done."""
+        event = self._changed
+        if len(self.results) > seen or self.done:
+            return
+        await event.wait()
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started:
+            elapsed = (self.finished or time.time()) - self.started
+        return {
+            "id": self.id,
+            "status": self.status,
+            "mode": self.mode,
+            "explain": self.explain,
+            "total": self.total,
+            "completed": len(self.results),
+            "failed": self.failed,
+            "created": round(self.created, 3),
+            "started": round(self.started, 3) if self.started else None,
+            "finished": round(self.finished, 3) if self.finished else None,
+            "elapsed_s": round(elapsed, 3) if elapsed is not None else None,
+            "items_per_s": round(len(self.results) / elapsed, 2) if elapsed else None,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    def __init__(self, workers: int = 2, max_jobs: int = 100):
+        self.workers = max(1, int(workers))
+        self.max_jobs = max(1, int(max_jobs))
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def configure(self, workers: int, max_jobs: int) -> None:
+        workers = max(1, int(workers))
+        if workers != self.workers:
+            self.workers = workers
+            self._slots = None  # new limit applies to batches started from now on
+        self.max_jobs = max(1, int(max_jobs))
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.workers)
+            self._loop = loop
+        return self._slots
+
+    def submit(self, mode: str, explain: str, items: List[Tuple[Any, str]], scorer: Scorer,
+               batch_size: int) -> Job:
+        job = Job(mode, explain, items)
+        self._jobs[job.id] = job
+        self._evict()
+        job.task = asyncio.get_running_loop().create_task(self._run(job, scorer, max(1, int(batch_size))))
+        return job
+
+    def _evict(self) -> None:
+        # Oldest finished jobs go first; running jobs are never dropped
+        while len(self._jobs) > self.max_jobs:
+            victim = next((j for j in self._jobs.values() if j.done), None)
+            if victim is None:
+                return
+            del self._jobs[victim.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [job.summary() for job in reversed(self._jobs.values())]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and not job.done:
+            if job.task is not None:
+                job.task.cancel()
+            job.finish("cancelled")
+        return job
+
+    async def _run(self, job: Job, scorer: Scorer, batch_size: int) -> None:
+        slots = self._semaphore()
+        offsets = iter(range(0, job.total, batch_size))
+
+        async def worker() -> None:
+            for offset in offsets:  # shared iterator: each batch is taken once
+                async with slots:
+                    if job.started is None:
+                        job.started = time.time()
+                        job.status = "running"
+                    texts = [text for _, text in job.items[offset:offset + batch_size]]
+                    try:
+                        scored = await scorer(job.mode, job.explain, texts)
+                    except Exception as e:  # the batch fails, the job goes on
+                        scored = [{"error": f"{type(e).__name__}: {e}"} for _ in texts]
+                job.add(offset, scored)
+
+        try:
+            n = min(self.workers, max(1, -(-job.total // batch_size)))
+            await asyncio.gather(*(worker() for _ in range(n)))
+        except asyncio.CancelledError:
+            job.finish("cancelled")
+            raise
+        except Exception as e:
+            job.finish("failed", f"{type(e).__name__}: {e}")
+            print(f"[jobs] job {job.id} failed: {e}")
+        else:
+            if job.started is None:
+                job.started = time.time()
+            job.finish("completed")
+
+    async def stream(self, job: Job, start: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Results from `start` on as they complete, then a final summary record."""
+        seen = max(0, int(start))
+        while True:
+            while seen < len(job.results):
+                yield job.results[seen]
+                seen += 1
+            if job.done:
+                break
+            await job.wait(seen)
+        yield {"done": True, **job.summary()}
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.workers, "jobs": counts}
+
+
+JOBS = JobManager()
@@ -1,29 +1,45 @@
 from __future__ import annotations
 import os
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import TYPE_CHECKING, Dict, Optional, List, Tuple
 
-import joblib
 try:
     from dotenv import load_dotenv  # type: ignore
     load_dotenv()
 except Exception:
     pass
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from starlette.requests import Request
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from pydantic import BaseModel
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
 import csv
+import hmac
 import json
+import sys
+import threading
+import time
+import weakref
+
+from . import (
+    admission, attributions, config_store, cpu, encoding, feedback_store, http_client, jobs, metrics, model_pool, prediction_cache,
+    procmem, profiler, reqlog, shadow, similar, textmatch,
+)
+
+# Heavy ML libraries (sklearn/scipy, joblib, torch, transformers) are imported
+# by the loader of the backend that needs them, not here: importing this
+# module stays cheap for test collection and worker boot.
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
 
 DATA_PATH = Path("data/case_data.csv")
 MODEL_PATH = Path("models/model.pkl")
 VECTORIZER_PATH = Path("models/vectorizer.pkl")
-FEEDBACK_PATH = Path(os.getenv("FEEDBACK_PATH", "data/feedback.csv"))
+FEEDBACK_PATH = Path(os.getenv("FEEDBACK_PATH", "data/feedback.csv"))  # legacy, imported once
+FEEDBACK_DB_PATH = Path(os.getenv("FEEDBACK_DB_PATH", "data/feedback.db"))
 CONFIG_PATH = Path(os.getenv("CONFIG_PATH", "config.json"))
 
 # Default, file-backed config so you don't need terminal env vars
@@ -43,29 +59,85 @@ DEFAULT_CONFIG = {
     "hf_api_model": "meta-llama/Llama-3.2-3B-Instruct",
     "hf_api_labels": ["plaintiff_wins", "defendant_wins"],
     "hf_api_max_tokens": 1000,
+    # Remote provider HTTP client (pooled, retried, circuit-broken)
+    "gemini_base_url": "https://generativelanguage.googleapis.com",
+    "hf_api_base_url": "https://api-inference.huggingface.co",
+    "gemini_timeout_s": 30,
+    "hf_api_timeout_s": 60,
+    "gemini_concurrency": 8,
+    "hf_api_concurrency": 4,
+    "http_max_retries": 2,
+    "http_backoff_s": 0.5,
+    "breaker_failures": 5,
+    "breaker_reset_s": 30,
+    "remote_fallback": "sklearn",  # sklearn | none (when a provider's circuit is open)
+    # Per-mode admission control overrides, e.g. {"llm": {"concurrency": 1, "queue": 4, "timeout_s": 30}}
+    "admission": {},
+    # Resident model pool: RAM budget across loaded backends (0 = unbounded) and idle unload
+    "model_pool_max_mb": 0,
+    "model_idle_timeout_s": 1800,
+    "weights_mmap": False,  # memory-map joblib weight arrays (shared page cache across workers)
+    # torch CPU threads per worker (hf, zeroshot, llm); 0 = this worker's share of the cores.
+    # cpu_affinity pins each backend.serve worker to its own cores (Linux)
+    "torch_threads": 0,
+    "torch_interop_threads": 1,
+    "cpu_affinity": False,
+    # Structured request log (JSON lines via a background writer thread)
+    "request_log": True,
+    "request_log_sample_rate": 1.0,  # fraction of ordinary requests kept; errors/slow always kept
+    "request_log_slow_ms": 1000,
+    "request_log_max_per_s": 200,  # token bucket across all records (0 = unlimited)
+    "request_log_queue": 10000,  # records buffered before new ones are dropped
+    "request_log_file": "",  # empty = stdout
+    # Finished predictions by (mode, mode config, text); also backs deferred reasons
+    "prediction_cache_size": 4096,  # entries (0 = disabled)
+    "prediction_cache_ttl_s": 3600,
+    "near_dup_threshold": 0.0,  # serve a cached text this similar (MinHash Jaccard, e.g. 0.9); 0 = exact only
+    "explain_default": "full",  # none | features | full, when a request does not say
+    # hf top_features: grad_input (one extra backward pass) | none
+    "hf_attribution": "grad_input",
+    # Batch jobs (/jobs): batches in flight across all jobs, finished jobs kept,
+    # items per job, and admission slots per mode that jobs never take
+    "jobs_workers": 2,
+    "jobs_max": 100,
+    "jobs_max_items": 100000,
+    "jobs_batch_size": 64,
+    "jobs_reserved_slots": 1,
+    # Feedback rows are written in batches: every feedback_flush_ms, or sooner
+    # once feedback_batch rows are waiting
+    "feedback_flush_ms": 200,
+    "feedback_batch": 500,
+    # /similar picks up newly labeled feedback at most this often
+    "similar_refresh_s": 30,
+    # Shadow evaluation: replay a sample of /predict against a candidate mode
+    # after responding; shadow_config overrides config for those calls only
+    # (e.g. {"hf_model_dir": "models/hf_student"})
+    "shadow_mode": "",  # empty = off
+    "shadow_config": {},
+    "shadow_sample_rate": 0.05,
+    "shadow_concurrency": 1,  # shadow calls in flight; extra samples are dropped
+    # config.json is polled for changes this often; edits apply without a restart
+    "config_watch_s": 1.0,
+    # /predict* responses at least this large are gzip/brotli compressed when the
+    # client accepts it (0 = never)
+    "compress_min_bytes": 1024,
+    "gzip_level": 5,
+    "brotli_quality": 4,
     "debug_errors": False,
 }
-CONFIG = DEFAULT_CONFIG.copy()
+# CONFIG reads the immutable snapshot pinned for the current request (see
+# backend/config_store.py); outside a request, the latest one.
+CONFIG_STORE = config_store.ConfigStore(CONFIG_PATH, DEFAULT_CONFIG)
+CONFIG = config_store.ConfigView(CONFIG_STORE)
+FEEDBACK_STORE = feedback_store.FeedbackStore(FEEDBACK_DB_PATH, legacy_csv=FEEDBACK_PATH)
 
 def _load_config() -> None:
-    global CONFIG
-    try:
-        if CONFIG_PATH.exists():
-            data = json.loads(CONFIG_PATH.read_text(encoding="utf-8"))
-            if isinstance(data, dict):
-                CONFIG.update(data)
-        else:
-            # Write defaults the first time
-            CONFIG_PATH.write_text(json.dumps(CONFIG, indent=2), encoding="utf-8")
-    except Exception:
-        # Fail-soft to defaults
-        pass
-
-def _save_config() -> None:
+    # Only re-parses when the file's mtime/size changed
     try:
-        CONFIG_PATH.write_text(json.dumps(CONFIG, indent=2), encoding="utf-8")
-    except Exception:
-        pass
+        CONFIG_STORE.load()
+    except Exception as e:
+        # Fail-soft: keep the current snapshot
+        print(f"[config] load failed: {e}")
 
 app = FastAPI(title="Case Outcome Predictor API")
 app.add_middleware(
@@ -76,22 +148,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Lightweight logging middleware to help diagnose fetch failures
+# Request logging + metrics. Records are structured JSON written off the event
+# loop by backend/reqlog.py (sampled and rate limited, see request_log_* keys).
 @app.middleware("http")
 async def _log_requests(request, call_next):  # type: ignore
-    from time import time
-    start = time()
+    start = time.perf_counter()
     path = request.url.path
-    mode = (CONFIG.get("model_type") or "sklearn")
+    # One consistent config for the whole request, whatever is published meanwhile
+    config_store.pin(CONFIG_STORE.current())
+    ctx = metrics.begin_request(mode=(CONFIG.get("model_type") or "sklearn"))
     try:
         response = await call_next(request)
-        duration = (time() - start) * 1000
-        print(f"[REQ] {path} mode={mode} status={response.status_code} {duration:.1f}ms")
-        return response
     except Exception as e:  # noqa
-        duration = (time() - start) * 1000
-        print(f"[ERR] {path} mode={mode} error={e} {duration:.1f}ms")
+        duration = (time.perf_counter() - start) * 1000
+        metrics.inc("predictor_requests_total", route=path, status="exception")
+        reqlog.log_request(CONFIG, _request_fields(request, ctx, path, 500, duration), exc=e)
         raise
+    end = time.perf_counter()
+    mode = ctx.get("mode")
+    # Time from the handler returning to the response starting is encoding
+    if "handler_end" in ctx:
+        metrics.record_stage("serialize", mode, end - ctx["handler_end"])
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.observe("predictor_request_seconds", end - start, route=route, mode=mode)
+    metrics.inc("predictor_requests_total", route=route, status=str(response.status_code))
+    reqlog.log_request(CONFIG, _request_fields(request, ctx, route, response.status_code, (end - start) * 1000))
+    return response
+
+
+def _request_fields(request, ctx: dict, route: str, status: int, duration_ms: float) -> dict:
+    return {
+        "method": request.method,
+        "path": request.url.path,
+        "route": route,
+        "status": status,
+        "ms": round(duration_ms, 2),
+        "mode": ctx.get("mode"),
+        "model": ctx.get("model"),
+        "text_len": ctx.get("text_len"),
+        "cache_hit": ctx.get("cache_hit"),
+        "stages_ms": {k: round(v * 1000, 3) for k, v in (ctx.get("stages") or {}).items()},
+    }
 
 
 # Global exception handler (optional detailed trace when debug_errors enabled)
@@ -102,7 +199,8 @@ async def _unhandled(request: Request, exc: Exception):  # type: ignore
         return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
     if CONFIG.get("debug_errors"):
         import traceback
-        trace = traceback.format_exc().splitlines()
+        # Only the innermost frames are returned; the full trace is in the request log
+        trace = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__, limit=-10)).splitlines()
         return JSONResponse(status_code=500, content={
             "detail": str(exc),
             "trace": trace[-25:],
@@ -110,27 +208,112 @@ async def _unhandled(request: Request, exc: Exception):  # type: ignore
     return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
 
 
+@app.on_event("shutdown")
+async def _close_http_clients():
+    await http_client.close_all()
+
+
+@app.on_event("shutdown")
+async def _flush_request_log():
+    reqlog.close()
+
+
+@app.on_event("shutdown")
+async def _flush_feedback():
+    await run_in_threadpool(FEEDBACK_STORE.close)
+
+
+@app.on_event("shutdown")
+async def _drain_shadow():
+    await shadow.SHADOW.drain()
+
+
+@app.on_event("shutdown")
+async def _stop_config_watcher():
+    CONFIG_STORE.stop_watcher()
+
+
+@app.on_event("shutdown")
+async def _cancel_jobs():
+    for summary in jobs.JOBS.list():
+        jobs.JOBS.cancel(summary["id"])
+
+
+@app.on_event("startup")
+async def _start_config_watcher():
+    CONFIG_STORE.start_watcher()
+
+
+@app.on_event("startup")
+async def _start_model_sweeper():
+    import asyncio
+
+    async def sweep_idle_models():
+        while True:
+            idle = float(CONFIG.get("model_idle_timeout_s") or 0)
+            await asyncio.sleep(min(60.0, idle / 2) if idle > 0 else 60.0)
+            model_pool.POOL.configure(
+                int(float(CONFIG.get("model_pool_max_mb") or 0) * 2**20), idle
+            )
+            model_pool.POOL.sweep()
+
+    asyncio.get_running_loop().create_task(sweep_idle_models())
+
+
 @app.get("/debug/deps")
 async def debug_deps():
+    # Versions come from package metadata: importing torch/transformers here
+    # would take seconds and block the event loop. "loaded" lists what this
+    # worker has actually imported so far.
+    from importlib import metadata
     out = {"mode": CONFIG.get("model_type")}
-    for pkg in ["torch", "transformers", "scikit_learn"]:
+    for pkg, dist in (("torch", "torch"), ("transformers", "transformers"), ("scikit_learn", "scikit-learn")):
         try:
-            if pkg == "scikit_learn":
-                import sklearn  # type: ignore
-                out[pkg] = getattr(sklearn, "__version__", "unknown")
-            elif pkg == "torch":
-                import torch  # type: ignore
-                out[pkg] = torch.__version__
-            elif pkg == "transformers":
-                import transformers  # type: ignore
-                out[pkg] = transformers.__version__
-        except Exception as e:  # noqa
-            out[pkg] = f"missing: {e}" 
+            out[pkg] = metadata.version(dist)
+        except metadata.PackageNotFoundError as e:
+            out[pkg] = f"missing: {e}"
+    out["loaded"] = [m for m in ("torch", "transformers", "sklearn", "joblib", "httpx") if m in sys.modules]
     return out
 
 
+def _check_debug_token(request: Request) -> None:
+    # Debug endpoints that expose internals need DEBUG_TOKEN (header X-Debug-Token or Bearer)
+    expected = os.getenv("DEBUG_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Profiling disabled: set DEBUG_TOKEN to enable")
+    supplied = request.headers.get("x-debug-token") or ""
+    auth = request.headers.get("authorization") or ""
+    if not supplied and auth.lower().startswith("bearer "):
+        supplied = auth[7:].strip()
+    if not hmac.compare_digest(supplied.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid debug token")
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 10.0, interval_ms: float = 10.0,
+                        heap: bool = False, idle: bool = False, top: int = 30, format: str = "json"):
+    """Sample this worker's threads for `seconds` under live traffic.
+
+    format=collapsed returns the flame-graph input as text/plain; json adds a
+    top-functions summary (self/total samples) and the heap snapshot.
+    """
+    _check_debug_token(request)
+    seconds = min(max(seconds, 0.1), 60.0)
+    interval_s = min(max(interval_ms, 1.0), 1000.0) / 1000
+    try:
+        result = await run_in_threadpool(profiler.profile, seconds, interval_s, idle, heap, max(1, top))
+    except profiler.Busy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"])
+    return result
+
+
 class PredictRequest(BaseModel):
     summary: str
+    mode: Optional[str] = None  # per-request override of config model_type
+    explain: Optional[str] = None  # none | features | full (default: config explain_default)
+    defer_reason: bool = False  # with explain=full: return reason_id, fetch GET /predict/reason/{id}
 
 
 class PredictResponse(BaseModel):
@@ -138,10 +321,19 @@ class PredictResponse(BaseModel):
     confidence: float
     top_features: list[str] | None = None
     reason: str | None = None
+    reason_id: str | None = None
 
 
 class BatchPredictRequest(BaseModel):
     summaries: List[str]
+    explain: Optional[str] = None  # none | features | full
+
+
+class JobRequest(BaseModel):
+    summaries: List[str]
+    ids: Optional[List[str]] = None  # echoed in results; default is the input index
+    mode: Optional[str] = None
+    explain: Optional[str] = None
 
 
 class BatchPredictItem(BaseModel):
@@ -155,41 +347,57 @@ class BatchPredictResponse(BaseModel):
     items: List[BatchPredictItem]
 
 
+class SimilarRequest(BaseModel):
+    summary: str
+    k: int = 5
+    min_score: float = 0.0
+
+
 class FeedbackRequest(BaseModel):
     summary: str
     predicted: str
     correct_label: Optional[str] = None
     notes: Optional[str] = None
+    mode: Optional[str] = None  # mode that made the prediction; defaults to model_type
+    model: Optional[str] = None  # defaults to that mode's configured model
 
 
-_model: Optional[LogisticRegression] = None
-_vectorizer: Optional[TfidfVectorizer] = None
-_hf_tokenizer = None
-_hf_model = None
-_zs_pipe = None
-_llm_tokenizer = None
-_llm_model = None
+MODES = ("sklearn", "hf", "zeroshot", "llm", "gemini", "hf_api")
 
 
 def _reset_models() -> None:
-    global _model, _vectorizer, _hf_model, _hf_tokenizer, _zs_pipe
-    _model = None
-    _vectorizer = None
-    _hf_model = None
-    _hf_tokenizer = None
-    _zs_pipe = None
-    global _llm_model, _llm_tokenizer
-    _llm_model = None
-    _llm_tokenizer = None
+    # Pool keys carry the model dir/name, so a changed model loads under a new
+    # key. Entries pinned by backend.serve stay: reloading them would give this
+    # worker a private copy instead of the one shared copy-on-write.
+    model_pool.POOL.clear(keep_pinned=True)
+    prediction_cache.CACHE.clear()
 
 
 # Load config at import time
 _load_config()
 
 
-def _ensure_model_loaded() -> None:
-    global _model, _vectorizer
-    model_type = (CONFIG.get("model_type") or "sklearn").lower()
+def _pooled(key: str, loader):
+    # Loaded backends live in the shared pool (RAM budget + idle eviction)
+    model_pool.POOL.configure(
+        int(float(CONFIG.get("model_pool_max_mb") or 0) * 2**20),
+        float(CONFIG.get("model_idle_timeout_s") or 0),
+    )
+
+    def timed_load():
+        with metrics.stage("load", key.split(":", 1)[0]):
+            value = loader()
+        # torch is imported by the loader; size its pools before the first forward
+        cpu.apply_torch(CONFIG)
+        return value
+
+    metrics.annotate(model=key)
+
+    return model_pool.POOL.get(key, timed_load)
+
+
+def _ensure_model_loaded(model_type: Optional[str] = None) -> None:
+    model_type = (model_type or CONFIG.get("model_type") or "sklearn").lower()
     if model_type == "hf":
         _ensure_hf_loaded()
         return
@@ -202,27 +410,41 @@ def _ensure_model_loaded() -> None:
     if model_type == "hf_api":
         # HF API mode doesn't need local models
         return
-    if _model is not None and _vectorizer is not None:
-        return
+    _ensure_sklearn_loaded()
+
+
+def _dataset_rows() -> list[tuple[str, str]]:
+    rows: list[tuple[str, str]] = []
+    with DATA_PATH.open(newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        if not {'summary','outcome'}.issubset(reader.fieldnames or []):
+            raise RuntimeError("Training CSV must include 'summary' and 'outcome'")
+        for r in reader:
+            s = (r.get('summary') or '').strip()
+            o = (r.get('outcome') or '').strip()
+            if s and o:
+                rows.append((s,o))
+    return rows
+
+
+def _ensure_sklearn_loaded() -> Tuple[LogisticRegression, TfidfVectorizer]:
+    return _pooled("sklearn", _load_sklearn)
+
 
+def _load_sklearn() -> Tuple[LogisticRegression, TfidfVectorizer]:
+    import joblib
     if MODEL_PATH.exists() and VECTORIZER_PATH.exists():
-        _model = joblib.load(MODEL_PATH)
-        _vectorizer = joblib.load(VECTORIZER_PATH)
-        return
+        # weights_mmap maps the pickled numpy arrays read-only from the page
+        # cache, so every worker process shares one copy
+        mmap_mode = "r" if CONFIG.get("weights_mmap") else None
+        return joblib.load(MODEL_PATH, mmap_mode=mmap_mode), joblib.load(VECTORIZER_PATH, mmap_mode=mmap_mode)
 
     # Fallback: attempt quick training if data exists
     if DATA_PATH.exists():
         try:
-            rows: list[tuple[str,str]] = []
-            with DATA_PATH.open(newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                if not {'summary','outcome'}.issubset(reader.fieldnames or []):
-                    raise RuntimeError("Training CSV must include 'summary' and 'outcome'")
-                for r in reader:
-                    s = (r.get('summary') or '').strip()
-                    o = (r.get('outcome') or '').strip()
-                    if s and o:
-                        rows.append((s,o))
+            rows = _dataset_rows()
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.linear_model import LogisticRegression
             # Simpler vectorizer for small datasets
             n_docs = len(rows)
             if n_docs < 50:
@@ -236,8 +458,7 @@ def _ensure_model_loaded() -> None:
             MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
             joblib.dump(mdl, MODEL_PATH)
             joblib.dump(vec, VECTORIZER_PATH)
-            _model, _vectorizer = mdl, vec
-            return
+            return mdl, vec
         except Exception as e:
             raise RuntimeError(f"Failed to auto-train model: {e}") from e
 
@@ -246,53 +467,60 @@ def _ensure_model_loaded() -> None:
     )
 
 
-def _ensure_hf_loaded() -> None:
-    global _hf_model, _hf_tokenizer
-    if _hf_model is not None and _hf_tokenizer is not None:
-        return
-    try:
-        from transformers import AutoTokenizer, AutoModelForSequenceClassification
-    except ImportError as e:
-        raise RuntimeError(
-            "Hugging Face mode requires 'transformers' (and torch). Install them in your env."
-        ) from e
+def _ensure_hf_loaded():
+    """Return (model, tokenizer) for the fine-tuned classifier."""
     hf_dir = Path(str(CONFIG.get("hf_model_dir", "models/hf")))
-    if not hf_dir.exists():
-        raise RuntimeError("HF model not found. Train with 'python train_hf.py'.")
-    _hf_tokenizer = AutoTokenizer.from_pretrained(str(hf_dir))
-    _hf_model = AutoModelForSequenceClassification.from_pretrained(str(hf_dir))
 
+    def load():
+        try:
+            from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        except ImportError as e:
+            raise RuntimeError(
+                "Hugging Face mode requires 'transformers' (and torch). Install them in your env."
+            ) from e
+        if not hf_dir.exists():
+            raise RuntimeError("HF model not found. Train with 'python train_hf.py'.")
+        tokenizer = AutoTokenizer.from_pretrained(str(hf_dir))
+        model = AutoModelForSequenceClassification.from_pretrained(str(hf_dir))
+        return model, tokenizer
 
-def _ensure_zeroshot_loaded() -> None:
-    global _zs_pipe
-    if _zs_pipe is not None:
-        return
-    try:
-        from transformers import pipeline
-    except ImportError as e:
-        raise RuntimeError(
-            "Zero-shot mode requires 'transformers' (and torch). Install them in your env."
-        ) from e
+    return _pooled(f"hf:{hf_dir}", load)
+
+
+def _ensure_zeroshot_loaded():
     model_name = str(CONFIG.get("zsh_model", "facebook/bart-large-mnli"))
-    _zs_pipe = pipeline("zero-shot-classification", model=model_name)
 
+    def load():
+        try:
+            from transformers import pipeline
+        except ImportError as e:
+            raise RuntimeError(
+                "Zero-shot mode requires 'transformers' (and torch). Install them in your env."
+            ) from e
+        return pipeline("zero-shot-classification", model=model_name)
 
-def _ensure_llm_loaded() -> None:
-    global _llm_model, _llm_tokenizer
-    if _llm_model is not None and _llm_tokenizer is not None:
-        return
-    try:
-        from transformers import AutoTokenizer, AutoModelForCausalLM
-        import torch
-    except ImportError as e:
-        raise RuntimeError("LLM mode requires transformers + torch installed.") from e
+    return _pooled(f"zeroshot:{model_name}", load)
+
+
+def _ensure_llm_loaded():
+    """Return (model, tokenizer) for the causal LLM."""
     model_name = str(CONFIG.get("llm_model", "opennyaiorg/Aalap-Mistral-7B-v0.1-bf16"))
-    device = 0 if torch.cuda.is_available() else "cpu"
-    _llm_tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
-    _llm_model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.bfloat16 if torch.cuda.is_available() else None, device_map="auto" if torch.cuda.is_available() else None, trust_remote_code=True)
-    if device == "cpu":
-        # Warn via log (print) about performance
-        print("[WARN] LLM loaded on CPU; responses will be slow.")
+
+    def load():
+        try:
+            from transformers import AutoTokenizer, AutoModelForCausalLM
+            import torch
+        except ImportError as e:
+            raise RuntimeError("LLM mode requires transformers + torch installed.") from e
+        device = 0 if torch.cuda.is_available() else "cpu"
+        tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
+        model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.bfloat16 if torch.cuda.is_available() else None, device_map="auto" if torch.cuda.is_available() else None, trust_remote_code=True)
+        if device == "cpu":
+            # Warn via log (print) about performance
+            print("[WARN] LLM loaded on CPU; responses will be slow.")
+        return model, tokenizer
+
+    return _pooled(f"llm:{model_name}", load)
 
 
 @app.get("/")
@@ -331,24 +559,55 @@ async def version():
     return {"name": "case-outcome-predictor", "metadata": meta}
 
 
-def _predict_one(text: str) -> Tuple[str, float, List[str] | None, str | None]:
-    assert _model is not None and _vectorizer is not None
-    X = _vectorizer.transform([text])
-    proba = _model.predict_proba(X)[0]
+_FEATURE_NAMES: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _term_contributions(model, vectorizer, X, idx: int) -> List[Tuple[str, float]]:
+    """(term, coef * tfidf) toward class `idx` for the terms present in row X, largest first."""
+    names = _FEATURE_NAMES.get(vectorizer)
+    if names is None:
+        names = _FEATURE_NAMES[vectorizer] = vectorizer.get_feature_names_out()
+    coef = model.coef_
+    if coef.shape[0] == 1:
+        # Binary models keep one row of weights, pointing toward classes_[1]
+        weights = coef[0] if idx == 1 else -coef[0]
+    else:
+        weights = coef[idx]
+    # Only the non-zero entries of the sparse row, in feature order
+    order = X.indices.argsort(kind="stable")
+    cols, vals = X.indices[order], X.data[order]
+    scores = weights[cols] * vals
+    ranked = (-scores).argsort(kind="stable")
+    return [(str(names[cols[i]]), float(scores[i])) for i in ranked]
+
+
+def _predict_one(text: str, explain: str = "full") -> Tuple[str, float, List[str] | None, str | None]:
+    _model, _vectorizer = _ensure_sklearn_loaded()
+    with metrics.stage("vectorize", "sklearn"):
+        X = _vectorizer.transform([text])
+    with metrics.stage("forward", "sklearn"):
+        proba = _model.predict_proba(X)[0]
     classes = list(_model.classes_)
     idx = int(proba.argmax())
     pred = classes[idx]
     conf = float(proba[idx])
-    # Explanation
+    if explain == "none":
+        return pred, conf, None, None
+    with metrics.stage("explain", "sklearn"):
+        top_features, reason = _explain_sklearn(_model, _vectorizer, X, idx, pred, conf, explain)
+    return pred, conf, top_features, reason
+
+
+def _explain_sklearn(_model, _vectorizer, X, idx: int, pred: str, conf: float,
+                     explain: str = "full") -> Tuple[List[str] | None, str | None]:
+    """(top_features, reason) for one scored row; the reason only at explain="full"."""
     top_features: List[str] | None = None
     reason: str | None = None
     try:
-        feature_names = list(_vectorizer.get_feature_names_out())
-        coef = _model.coef_[idx]
-        x = X.toarray()[0]
-        contrib = [(feature_names[i], coef[i] * x[i]) for i in range(len(feature_names)) if x[i] != 0]
-        contrib.sort(key=lambda t: t[1], reverse=True)
+        contrib = _term_contributions(_model, _vectorizer, X, idx)
         top_features = [w for w, v in contrib[:8]]
+        if explain != "full":
+            return top_features, None
         
         # Generate comprehensive legal analysis format
         top_terms = [w for w, v in contrib[:5] if v > 0]
@@ -363,24 +622,10 @@ def _predict_one(text: str) -> Tuple[str, float, List[str] | None, str | None]:
             analysis_sections.append(opening)
             
             # Categorize terms by legal significance
-            legal_terms = []
-            factual_terms = []
-            procedural_terms = []
-            financial_terms = []
-            
-            for term in top_terms:
-                term_lower = term.lower()
-                if any(legal_concept in term_lower for legal_concept in 
-                      ['contract', 'breach', 'negligence', 'damages', 'liability', 'evidence', 'duty', 'causation', 'statute', 'law', 'court', 'judge', 'violation']):
-                    legal_terms.append(term)
-                elif any(procedural in term_lower for procedural in 
-                        ['motion', 'filing', 'discovery', 'deposition', 'hearing', 'trial', 'appeal', 'jurisdiction', 'service']):
-                    procedural_terms.append(term)
-                elif any(financial in term_lower for financial in 
-                        ['payment', 'money', 'cost', 'fee', 'compensation', 'refund', 'invoice', 'debt']):
-                    financial_terms.append(term)
-                else:
-                    factual_terms.append(term)
+            by_category = textmatch.TERM_CATEGORIES.bucket(top_terms, default="factual")
+            legal_terms = by_category["legal"]
+            factual_terms = by_category["factual"]
+            procedural_terms = by_category["procedural"]
             
             # Short summary based on dominant terms
             if legal_terms:
@@ -456,18 +701,47 @@ def _predict_one(text: str) -> Tuple[str, float, List[str] | None, str | None]:
             )
     except Exception:
         top_features = None
-        reason = (
-            f"Predicted {pred} with {conf:.1%} confidence through statistical text analysis. "
-            f"This AI assessment cannot replace qualified legal expertise and should only "
-            f"serve as a preliminary screening tool alongside professional legal counsel."
-        )
-    return pred, conf, top_features, reason
+        if explain == "full":
+            reason = (
+                f"Predicted {pred} with {conf:.1%} confidence through statistical text analysis. "
+                f"This AI assessment cannot replace qualified legal expertise and should only "
+                f"serve as a preliminary screening tool alongside professional legal counsel."
+            )
+    return top_features, reason
+
+
+# Secondary zero-shot passes used by _reason_zeroshot: candidate label ->
+# the sentence it contributes (label order is the candidate order)
+_ZS_STRENGTH = {
+    "strong evidence present": "In Short: The evidence overwhelmingly supports the plaintiff's position based on the facts presented.",
+    "clear legal violation": "In Short: There is a clear legal violation that strongly favors the plaintiff's case.",
+    "contractual breach evident": "In Short: There is a clear legal violation that strongly favors the plaintiff's case.",
+    "negligence demonstrated": "In Short: The defendant's negligence is evident from the circumstances described.",
+    "damages clearly established": "In Short: The damages and harm to the plaintiff are clearly established.",
+    "defendant liability obvious": "In Short: The legal analysis strongly supports the predicted outcome.",
+}
+_ZS_STRENGTH_DEFAULT = "In Short: The legal analysis strongly supports the predicted outcome."
+_ZS_EVIDENCE = {
+    "documentary evidence strong": "The Evidence is Decisive: The documented evidence in this case provides compelling proof that cannot be easily disputed. Written records, contracts, or communications create a clear paper trail that strongly supports the plaintiff's position.",
+    "witness testimony favorable": "The Evidence is Decisive: The available evidence creates a strong foundation for the plaintiff's case and undermines any potential defenses.",
+    "contractual terms clear": "The Evidence is Decisive: The contractual terms and agreements are unambiguous and clearly establish the defendant's obligations. The breach of these terms is evident from the facts presented.",
+    "factual circumstances decisive": "The Evidence is Decisive: The factual circumstances of this case create a compelling narrative that strongly supports the plaintiff's claims. The sequence of events clearly demonstrates liability.",
+    "legal precedent applicable": "The Evidence is Decisive: The available evidence creates a strong foundation for the plaintiff's case and undermines any potential defenses.",
+}
+_ZS_EVIDENCE_DEFAULT = "The Evidence is Decisive: The available evidence creates a strong foundation for the plaintiff's case and undermines any potential defenses."
+_ZS_DEFENSE = (
+    "weak defense arguments",
+    "strong procedural defenses",
+    "factual disputes present",
+    "credibility issues exist",
+    "insufficient evidence claims",
+)
 
 
 def _reason_zeroshot(res: dict, text: str) -> str:
     # Generate comprehensive legal analysis format
     try:
-        global _zs_pipe
+        _zs_pipe = _ensure_zeroshot_loaded()
         labels = res.get('labels') or []
         scores = res.get('scores') or []
         if not labels or not scores:
@@ -486,17 +760,9 @@ def _reason_zeroshot(res: dict, text: str) -> str:
         # Generate AI-powered case analysis
         try:
             # Analyze case strengths using zero-shot
-            strength_labels = [
-                "strong evidence present",
-                "clear legal violation", 
-                "contractual breach evident",
-                "negligence demonstrated",
-                "damages clearly established",
-                "defendant liability obvious"
-            ]
             strength_analysis = _zs_pipe(
                 f"Legal analysis of case evidence and claims:\n{text[:400]}",
-                candidate_labels=strength_labels,
+                candidate_labels=list(_ZS_STRENGTH),
                 multi_label=False
             )
             
@@ -505,31 +771,15 @@ def _reason_zeroshot(res: dict, text: str) -> str:
                 strength_score = strength_analysis['scores'][0]
                 
                 if strength_score > 0.5:
-                    if "evidence" in top_strength:
-                        analysis_sections.append("In Short: The evidence overwhelmingly supports the plaintiff's position based on the facts presented.")
-                    elif "violation" in top_strength or "breach" in top_strength:
-                        analysis_sections.append("In Short: There is a clear legal violation that strongly favors the plaintiff's case.")
-                    elif "negligence" in top_strength:
-                        analysis_sections.append("In Short: The defendant's negligence is evident from the circumstances described.")
-                    elif "damages" in top_strength:
-                        analysis_sections.append("In Short: The damages and harm to the plaintiff are clearly established.")
-                    else:
-                        analysis_sections.append("In Short: The legal analysis strongly supports the predicted outcome.")
+                    analysis_sections.append(_ZS_STRENGTH.get(top_strength, _ZS_STRENGTH_DEFAULT))
         except Exception:
             analysis_sections.append("In Short: The case facts strongly support the predicted legal outcome.")
         
         # Detailed evidence analysis
         try:
-            evidence_labels = [
-                "documentary evidence strong",
-                "witness testimony favorable", 
-                "contractual terms clear",
-                "factual circumstances decisive",
-                "legal precedent applicable"
-            ]
             evidence_analysis = _zs_pipe(
                 f"Evidence strength in this legal case:\n{text[:300]}",
-                candidate_labels=evidence_labels,
+                candidate_labels=list(_ZS_EVIDENCE),
                 multi_label=False
             )
             
@@ -538,14 +788,7 @@ def _reason_zeroshot(res: dict, text: str) -> str:
                 evidence_score = evidence_analysis['scores'][0]
                 
                 if evidence_score > 0.4:
-                    if "documentary" in evidence_type:
-                        analysis_sections.append("The Evidence is Decisive: The documented evidence in this case provides compelling proof that cannot be easily disputed. Written records, contracts, or communications create a clear paper trail that strongly supports the plaintiff's position.")
-                    elif "contractual" in evidence_type:
-                        analysis_sections.append("The Evidence is Decisive: The contractual terms and agreements are unambiguous and clearly establish the defendant's obligations. The breach of these terms is evident from the facts presented.")
-                    elif "factual" in evidence_type:
-                        analysis_sections.append("The Evidence is Decisive: The factual circumstances of this case create a compelling narrative that strongly supports the plaintiff's claims. The sequence of events clearly demonstrates liability.")
-                    else:
-                        analysis_sections.append("The Evidence is Decisive: The available evidence creates a strong foundation for the plaintiff's case and undermines any potential defenses.")
+                    analysis_sections.append(_ZS_EVIDENCE.get(evidence_type, _ZS_EVIDENCE_DEFAULT))
         except Exception:
             analysis_sections.append("The Evidence is Decisive: The facts and circumstances presented create a compelling case that strongly supports the predicted outcome.")
         
@@ -557,16 +800,9 @@ def _reason_zeroshot(res: dict, text: str) -> str:
         
         # Defense analysis
         try:
-            defense_labels = [
-                "weak defense arguments",
-                "strong procedural defenses",
-                "factual disputes present", 
-                "credibility issues exist",
-                "insufficient evidence claims"
-            ]
             defense_analysis = _zs_pipe(
                 f"Potential defenses in this case:\n{text[:300]}",
-                candidate_labels=defense_labels,
+                candidate_labels=list(_ZS_DEFENSE),
                 multi_label=False
             )
             
@@ -614,7 +850,7 @@ def _reason_zeroshot(res: dict, text: str) -> str:
             )
         return "Prediction analysis unavailable. Please consult qualified legal counsel."
 
-def _reason_hf(pred: str, probs, labels, case_text: str = "") -> str:
+def _reason_hf(pred: str, probs, labels, case_text: str = "", key_terms: Optional[List[str]] = None) -> str:
     """Generate comprehensive legal analysis using fine-tuned model understanding"""
     if len(probs) >= 2:
         sorted_pairs = sorted(zip(labels, probs), key=lambda t: t[1], reverse=True)
@@ -667,6 +903,10 @@ def _reason_hf(pred: str, probs, labels, case_text: str = "") -> str:
         else:
             analysis_sections.append(f"Competitive Case: While favoring {outcome_desc} at {first[1]:.1%} versus {second[1]:.1%} for {comparison_desc}, the model recognizes this as a closely contested matter with valid arguments on both sides.")
         
+        # Words that moved the model most (gradient x input attributions)
+        if key_terms:
+            analysis_sections.append(f"Influential Language: The passages weighing most toward {outcome_desc} center on: {', '.join(key_terms[:5])}.")
+        
         # Case-specific insights
         if case_text and len(case_text.split()) > 50:
             analysis_sections.append("Comprehensive Text Analysis: The detailed case description provides substantial information for the model's specialized legal analysis, enabling more nuanced pattern recognition than shorter summaries would allow.")
@@ -704,168 +944,13 @@ def _reason_hf(pred: str, probs, labels, case_text: str = "") -> str:
     )
 
 
-@app.get("/labels")
-async def labels():
-    model_type = (CONFIG.get("model_type") or "sklearn").lower()
-    if model_type == "hf":
-        try:
-            _ensure_hf_loaded()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        assert _hf_model is not None
-        return {"labels": [str(_hf_model.config.id2label[i]) for i in range(_hf_model.config.num_labels)]}
-    if model_type == "zeroshot":
-        # Return default labels for zero-shot mode
-        zlabels = CONFIG.get("zsh_labels") or ["plaintiff_wins", "defendant_wins"]
-        # If someone put a comma-separated string, split it
-        if isinstance(zlabels, str):
-            zlabels = [p.strip() for p in zlabels.split(",") if p.strip()]
-        return {"labels": zlabels}
-    if model_type == "llm":
-        llm_labels = CONFIG.get("llm_labels") or ["plaintiff_wins", "defendant_wins"]
-        if isinstance(llm_labels, str):
-            llm_labels = [p.strip() for p in llm_labels.split(",") if p.strip()]
-        return {"labels": llm_labels}
-    if model_type == "gemini":
-        g_labels = CONFIG.get("gemini_labels") or ["plaintiff_wins", "defendant_wins"]
-        if isinstance(g_labels, str):
-            g_labels = [p.strip() for p in g_labels.split(",") if p.strip()]
-        return {"labels": g_labels}
-    if model_type == "hf_api":
-        hf_api_labels = CONFIG.get("hf_api_labels") or ["plaintiff_wins", "defendant_wins"]
-        if isinstance(hf_api_labels, str):
-            hf_api_labels = [p.strip() for p in hf_api_labels.split(",") if p.strip()]
-        return {"labels": hf_api_labels}
-    _ensure_model_loaded()
-    assert _model is not None
-    return {"labels": list(_model.classes_)}
+# -------- Remote providers (gemini, hf_api) --------
+REMOTE_DISCLAIMER = "Important Legal Disclaimer: This AI analysis represents advanced language understanding but cannot substitute for professional legal counsel. Actual case outcomes depend on evidence quality, witness credibility, legal precedents, procedural factors, and judicial discretion that require human legal expertise."
 
 
-@app.post("/predict", response_model=PredictResponse)
-async def predict(body: PredictRequest):
-    text = (body.summary or "").strip()
-    if not text:
-        raise HTTPException(status_code=400, detail="Summary must not be empty")
-
-    model_type = (CONFIG.get("model_type") or "sklearn").lower()
-    if model_type == "hf":
-        try:
-            _ensure_hf_loaded()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        assert _hf_model is not None and _hf_tokenizer is not None
-        try:
-            import torch
-        except ImportError as e:
-            raise RuntimeError(
-                "Hugging Face mode requires 'torch'. Install it (CPU-only is fine)."
-            ) from e
-        with torch.no_grad():
-            hf_max_len = int(CONFIG.get("hf_max_len", 512))
-            inputs = _hf_tokenizer([text], truncation=True, max_length=hf_max_len, return_tensors="pt")
-            logits = _hf_model(**inputs).logits[0]
-            probs = torch.softmax(logits, dim=-1).cpu().numpy()
-        labels = [_hf_model.config.id2label[i] for i in range(len(probs))]
-        idx = int(probs.argmax())
-        pred = labels[idx]
-        conf = float(probs[idx])
-        feats = None  # Token attributions can be added later
-        reason = _reason_hf(pred, probs, labels, text)
-        return PredictResponse(prediction=pred, confidence=round(conf,4), top_features=feats, reason=reason)
-
-    if model_type == "zeroshot":
-        try:
-            _ensure_zeroshot_loaded()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        assert _zs_pipe is not None
-        zlabels = CONFIG.get("zsh_labels") or ["plaintiff_wins", "defendant_wins"]
-        if isinstance(zlabels, str):
-            candidate_labels = [p.strip() for p in zlabels.split(",") if p.strip()]
-        else:
-            candidate_labels = list(zlabels)
-        max_len = int(CONFIG.get("zsh_max_len", 512))
-        res = _zs_pipe(
-            text,
-            candidate_labels=candidate_labels,
-            multi_label=False,
-            truncation=True,
-            max_length=max_len,
-        )
-        # res: {'sequence': ..., 'labels': [...], 'scores': [...]}
-        labels = res.get('labels') or []
-        scores = res.get('scores') or []
-        if not labels or not scores:
-            raise HTTPException(status_code=500, detail="Zero-shot prediction failed")
-        pred = labels[0]
-        conf = float(scores[0])
-        feats = None
-        reason = _reason_zeroshot(res, text)
-        return PredictResponse(prediction=pred, confidence=round(conf,4), top_features=feats, reason=reason)
-
-    if model_type == "llm":
-        try:
-            _ensure_llm_loaded()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        assert _llm_model is not None and _llm_tokenizer is not None
-        llm_labels = CONFIG.get("llm_labels") or ["plaintiff_wins", "defendant_wins"]
-        if isinstance(llm_labels, str):
-            llm_labels = [p.strip() for p in llm_labels.split(",") if p.strip()]
-        prompt = (
-            "You are a legal outcome classifier. Given the case summary, choose exactly one label from: "
-            + ", ".join(llm_labels)
-            + "\nReturn only the label.\n\nCase Summary:\n" + text + "\nLabel:" )
-        max_new = int(CONFIG.get("llm_max_new_tokens", 32))
-        try:
-            import torch
-            inputs = _llm_tokenizer(prompt, return_tensors="pt")
-            if torch.cuda.is_available():
-                inputs = {k: v.to(_llm_model.device) for k,v in inputs.items()}
-            output_ids = _llm_model.generate(**inputs, max_new_tokens=max_new, do_sample=False)
-            gen_text = _llm_tokenizer.decode(output_ids[0][inputs['input_ids'].shape[1]:], skip_special_tokens=True).strip()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"LLM generation failed: {e}")
-        # Parse: find first label mention
-        pred = None
-        lower_gen = gen_text.lower()
-        for lab in llm_labels:
-            if lab.lower() in lower_gen:
-                pred = lab
-                break
-        if pred is None:
-            # fallback: first label
-            pred = llm_labels[0]
-        # Confidence proxy: crude binary (not probabilistic)
-        conf = 0.5
-        feats = None
-        
-        # Generate AI-powered explanation for LLM predictions
-        outcome = "plaintiff victory" if pred == "plaintiff_wins" else "defendant victory"
-        reason = (
-            f"Large Language Model analysis suggests {outcome} based on comprehensive text understanding. "
-            f"The model generated: '{gen_text}'. This prediction leverages advanced natural language processing "
-            f"to interpret legal context, relationships, and implications within the case summary. However, "
-            f"LLM predictions are based on training patterns and cannot account for case-specific evidence, "
-            f"legal precedents, procedural nuances, witness testimony, or judicial discretion. This analysis "
-            f"should inform preliminary assessment but must be supplemented with professional legal expertise "
-            f"and thorough case investigation."
-        )
-        return PredictResponse(prediction=pred, confidence=round(conf,4), top_features=feats, reason=reason)
-
-    if model_type == "gemini":
-        # Call Gemini API via REST. Requires GEMINI_API_KEY or GOOGLE_API_KEY env var
-        import os, json as _json, urllib.request, urllib.error
-        g_labels = CONFIG.get("gemini_labels") or ["plaintiff_wins", "defendant_wins"]
-        if isinstance(g_labels, str):
-            g_labels = [p.strip() for p in g_labels.split(",") if p.strip()]
-        model_name = CONFIG.get("gemini_model", "gemini-1.5-flash")
-        api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="GEMINI_API_KEY or GOOGLE_API_KEY not set")
-        
-        # Enhanced prompt for detailed legal analysis with Indian Laws and Acts
-        detailed_analysis_instruction = f"""
+def _gemini_prompt(text: str, g_labels: List[str]) -> str:
+    # Enhanced prompt for detailed legal analysis with Indian Laws and Acts
+    return f"""
 You are an expert Indian legal analyst with comprehensive knowledge of Indian laws, acts, and judicial precedents. Analyze this Case Summary and provide a detailed legal assessment in the following exact format, incorporating relevant Indian legal provisions:
 
 Based on the facts provided, the outcome is [confidence level: overwhelmingly clear/strongly indicated/reasonably supported/suggested].
@@ -912,137 +997,11 @@ Labels to choose from: {', '.join(g_labels)}
 
 Provide the detailed legal analysis following the format above exactly, ensuring comprehensive coverage of Indian legal framework.
 """
-        
-        body = {
-            "contents": [
-                {"parts": [{"text": detailed_analysis_instruction}]}
-            ]
-        }
-        
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
-        data_bytes = _json.dumps(body).encode("utf-8")
-        req = urllib.request.Request(url, data=data_bytes, headers={"Content-Type": "application/json"}, method="POST")
-        
-        try:
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                resp_data = resp.read()
-            payload = _json.loads(resp_data.decode("utf-8"))
-        except urllib.error.HTTPError as e:
-            detail = e.read().decode("utf-8", errors="ignore")
-            raise HTTPException(status_code=500, detail=f"Gemini HTTPError: {detail}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Gemini request failed: {e}")
-            
-        # Parse response
-        text_out = ""
-        try:
-            candidates = payload.get("candidates") or []
-            if candidates:
-                parts = candidates[0].get("content", {}).get("parts", [])
-                if parts:
-                    text_out = parts[0].get("text", "").strip()
-        except Exception:
-            pass
-        
-        # Extract prediction from the detailed response
-        lower_out = text_out.lower()
-        pred = None
-        for lab in g_labels:
-            if lab.lower() in lower_out:
-                pred = lab
-                break
-        if pred is None:
-            pred = g_labels[0]  # fallback
-        
-        feats = None
-        
-        # Extract confidence from AI's language assessment
-        def extract_confidence_from_response(response_text):
-            """Extract confidence score based on AI's language certainty"""
-            lower_text = response_text.lower()
-            
-            # High confidence indicators (0.85-0.95)
-            high_confidence_terms = [
-                "overwhelmingly clear", "clearly indicates", "strong evidence", 
-                "compelling evidence", "decisive factors", "unambiguous",
-                "substantial evidence", "conclusive", "definitive", "undoubtedly"
-            ]
-            
-            # Medium-high confidence (0.75-0.85)
-            medium_high_terms = [
-                "strongly suggests", "strongly indicates", "likely outcome",
-                "significant evidence", "considerable evidence", "probable",
-                "substantial support", "well-supported", "high likelihood"
-            ]
-            
-            # Medium confidence (0.65-0.75)
-            medium_terms = [
-                "reasonably supported", "moderate evidence", "indicates",
-                "suggests", "reasonable likelihood", "fairly clear",
-                "moderate support", "appears likely", "tends to suggest"
-            ]
-            
-            # Lower confidence (0.55-0.65)
-            low_terms = [
-                "some evidence", "may suggest", "could indicate",
-                "possible", "might", "uncertain", "limited evidence",
-                "unclear", "ambiguous", "difficult to determine"
-            ]
-            
-            # Check for confidence indicators
-            for term in high_confidence_terms:
-                if term in lower_text:
-                    return round(0.85 + (hash(term) % 10) / 100, 2)  # 0.85-0.94
-            
-            for term in medium_high_terms:
-                if term in lower_text:
-                    return round(0.75 + (hash(term) % 10) / 100, 2)  # 0.75-0.84
-            
-            for term in medium_terms:
-                if term in lower_text:
-                    return round(0.65 + (hash(term) % 10) / 100, 2)  # 0.65-0.74
-            
-            for term in low_terms:
-                if term in lower_text:
-                    return round(0.55 + (hash(term) % 10) / 100, 2)  # 0.55-0.64
-            
-            # Default confidence if no specific indicators found
-            return 0.70
-        
-        conf = extract_confidence_from_response(text_out)
-        
-        # Use the full Gemini response as the detailed reasoning
-        if text_out and len(text_out) > 50:
-            # Clean up the response if needed
-            reason = text_out.strip()
-            # Add disclaimer if not already present
-            if "disclaimer" not in reason.lower():
-                reason += "\n\nImportant Legal Disclaimer: This AI analysis represents advanced language understanding but cannot substitute for professional legal counsel. Actual case outcomes depend on evidence quality, witness credibility, legal precedents, procedural factors, and judicial discretion that require human legal expertise."
-        else:
-            reason = (
-                f"Based on Google Gemini AI analysis, the outcome suggests {pred}.\n\n"
-                f"Reasoning:\nThe advanced AI model provided this assessment: '{text_out}'. "
-                f"However, this prediction should be considered alongside professional legal analysis. "
-                f"Legal case outcomes depend on numerous factors including evidence presentation, "
-                f"legal precedents, attorney strategy, witness credibility, and judicial interpretation "
-                f"that no AI can fully capture."
-            )
-        
-        return PredictResponse(prediction=pred, confidence=round(conf,4), top_features=feats, reason=reason)
 
-    if model_type == "hf_api":
-        # Use Hugging Face Inference API for free models like Llama, Gemma, DeepSeek
-        import os, json as _json, urllib.request, urllib.error
-        hf_api_labels = CONFIG.get("hf_api_labels") or ["plaintiff_wins", "defendant_wins"]
-        if isinstance(hf_api_labels, str):
-            hf_api_labels = [p.strip() for p in hf_api_labels.split(",") if p.strip()]
-        model_name = CONFIG.get("hf_api_model", "meta-llama/Llama-3.2-3B-Instruct")
-        api_key = os.getenv("HUGGINGFACEHUB_API_TOKEN") or os.getenv("HF_TOKEN")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="HUGGINGFACEHUB_API_TOKEN or HF_TOKEN not set")
-        
-        # Enhanced prompt for detailed legal analysis
-        detailed_analysis_instruction = f"""You are an expert legal analyst with extensive experience in case outcome prediction. Analyze this case summary and provide a comprehensive legal assessment in the following exact format:
+
+def _hf_api_prompt(text: str, hf_api_labels: List[str]) -> str:
+    # Enhanced prompt for detailed legal analysis
+    return f"""You are an expert legal analyst with extensive experience in case outcome prediction. Analyze this case summary and provide a comprehensive legal assessment in the following exact format:
 
 Based on the facts provided, the outcome is [confidence level: overwhelmingly clear/strongly indicated/reasonably supported/suggested].
 
@@ -1071,146 +1030,1134 @@ Case Summary: {text}
 Available outcomes: {', '.join(hf_api_labels)}
 
 Provide the detailed legal analysis following the format above exactly."""
-        
-        # Prepare the API request
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # For instruction-tuned models, use the chat format
-        if "instruct" in model_name.lower() or "chat" in model_name.lower():
-            payload = {
-                "inputs": detailed_analysis_instruction,
-                "parameters": {
-                    "max_new_tokens": int(CONFIG.get("hf_api_max_tokens", 1000)),
-                    "temperature": 0.1,
-                    "do_sample": True,
-                    "return_full_text": False
-                }
+
+
+def _hf_api_payload(prompt: str, model_name: str) -> dict:
+    # For instruction-tuned models, use the chat format
+    if "instruct" in model_name.lower() or "chat" in model_name.lower():
+        return {
+            "inputs": prompt,
+            "parameters": {
+                "max_new_tokens": int(CONFIG.get("hf_api_max_tokens", 1000)),
+                "temperature": 0.1,
+                "do_sample": True,
+                "return_full_text": False
             }
+        }
+    # For base models, use simpler format
+    return {
+        "inputs": prompt,
+        "parameters": {
+            "max_new_tokens": int(CONFIG.get("hf_api_max_tokens", 1000)),
+            "temperature": 0.1
+        }
+    }
+
+
+def _parse_gemini_text(payload: dict) -> str:
+    text_out = ""
+    try:
+        candidates = payload.get("candidates") or []
+        if candidates:
+            parts = candidates[0].get("content", {}).get("parts", [])
+            if parts:
+                text_out = parts[0].get("text", "").strip()
+    except Exception:
+        pass
+    return text_out
+
+
+def _parse_hf_api_text(response) -> str:
+    text_out = ""
+    try:
+        if isinstance(response, list) and len(response) > 0:
+            if "generated_text" in response[0]:
+                text_out = response[0]["generated_text"].strip()
+            elif "text" in response[0]:
+                text_out = response[0]["text"].strip()
+        elif isinstance(response, dict):
+            if "generated_text" in response:
+                text_out = response["generated_text"].strip()
+            elif "text" in response:
+                text_out = response["text"].strip()
+            elif "error" in response:
+                raise HTTPException(status_code=500, detail=f"HuggingFace API Error: {response['error']}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to parse HuggingFace response: {e}")
+    return text_out
+
+
+def _find_label(text_out: str, labels: List[str]) -> Optional[str]:
+    # Earliest label mention wins, so a streamed prefix already fixes the answer
+    lower_out = text_out.lower()
+    best, best_pos = None, -1
+    for lab in labels:
+        pos = lower_out.find(lab.lower())
+        if pos != -1 and (best_pos == -1 or pos < best_pos):
+            best, best_pos = lab, pos
+    return best
+
+
+def _label_from_text(text_out: str, labels: List[str]) -> str:
+    # Extract prediction from the detailed response: first label mentioned
+    return _find_label(text_out, labels) or labels[0]  # fallback
+
+
+def extract_confidence_from_response(response_text: str) -> float:
+    """Extract confidence score based on AI's language certainty"""
+    # Strongest tier wins: high 0.85-0.94, medium-high 0.75-0.84, medium
+    # 0.65-0.74, low 0.55-0.64; 0.70 when no certainty phrase is present
+    return textmatch.phrase_confidence(response_text)
+
+
+def _remote_reason(provider: str, pred: str, text_out: str, model_name: str) -> str:
+    # Use the full model response as the detailed reasoning
+    if text_out and len(text_out) > 50:
+        reason = text_out.strip()
+        # Add disclaimer if not already present
+        if "disclaimer" not in reason.lower():
+            if provider == "hf_api":
+                reason += f"\n\nImportant Legal Disclaimer: This analysis was generated using {model_name} via HuggingFace API. While this model provides sophisticated legal reasoning, it cannot substitute for professional legal counsel. Actual case outcomes depend on evidence quality, witness credibility, legal precedents, procedural factors, and judicial discretion that require human legal expertise."
+            else:
+                reason += "\n\n" + REMOTE_DISCLAIMER
+        return reason
+    source = "Google Gemini" if provider == "gemini" else model_name
+    assessor = "advanced AI model" if provider == "gemini" else "AI model"
+    return (
+        f"Based on {source} AI analysis, the outcome suggests {pred}.\n\n"
+        f"Reasoning:\nThe {assessor} provided this assessment: '{text_out}'. "
+        f"However, this prediction should be considered alongside professional legal analysis. "
+        f"Legal case outcomes depend on numerous factors including evidence presentation, "
+        f"legal precedents, attorney strategy, witness credibility, and judicial interpretation "
+        f"that no AI can fully capture."
+    )
+
+
+def _remote_request(provider: str, text: str, stream: bool = False) -> Tuple[str, dict, dict, List[str], str]:
+    """Build (url, payload, headers, labels, model_name) for a remote provider call."""
+    metrics.annotate(model=f"{provider}:{CONFIG.get(provider + '_model')}")
+    if provider == "gemini":
+        # Requires GEMINI_API_KEY or GOOGLE_API_KEY env var
+        g_labels = list(CONFIG.get("gemini_labels") or ("plaintiff_wins", "defendant_wins"))
+        model_name = CONFIG.get("gemini_model", "gemini-1.5-flash")
+        api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise HTTPException(status_code=500, detail="GEMINI_API_KEY or GOOGLE_API_KEY not set")
+        body = {"contents": [{"parts": [{"text": _gemini_prompt(text, g_labels)}]}]}
+        base = str(CONFIG.get("gemini_base_url") or "https://generativelanguage.googleapis.com").rstrip("/")
+        if stream:
+            url = f"{base}/v1beta/models/{model_name}:streamGenerateContent?alt=sse&key={api_key}"
         else:
-            # For base models, use simpler format
-            payload = {
-                "inputs": detailed_analysis_instruction,
-                "parameters": {
-                    "max_new_tokens": int(CONFIG.get("hf_api_max_tokens", 1000)),
-                    "temperature": 0.1
-                }
-            }
-        
-        url = f"https://api-inference.huggingface.co/models/{model_name}"
-        data_bytes = _json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(url, data=data_bytes, headers=headers, method="POST")
-        
-        try:
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                resp_data = resp.read()
-            response = _json.loads(resp_data.decode("utf-8"))
-        except urllib.error.HTTPError as e:
-            error_detail = e.read().decode("utf-8", errors="ignore")
-            raise HTTPException(status_code=500, detail=f"HuggingFace API HTTPError: {error_detail}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"HuggingFace API request failed: {e}")
-            
-        # Parse response
-        text_out = ""
+            url = f"{base}/v1beta/models/{model_name}:generateContent?key={api_key}"
+        return url, body, {"Content-Type": "application/json"}, list(g_labels), model_name
+    # Use Hugging Face Inference API for free models like Llama, Gemma, DeepSeek
+    hf_api_labels = list(CONFIG.get("hf_api_labels") or ("plaintiff_wins", "defendant_wins"))
+    model_name = CONFIG.get("hf_api_model", "meta-llama/Llama-3.2-3B-Instruct")
+    api_key = os.getenv("HUGGINGFACEHUB_API_TOKEN") or os.getenv("HF_TOKEN")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="HUGGINGFACEHUB_API_TOKEN or HF_TOKEN not set")
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    payload = _hf_api_payload(_hf_api_prompt(text, hf_api_labels), model_name)
+    if stream:
+        payload["stream"] = True
+    base = str(CONFIG.get("hf_api_base_url") or "https://api-inference.huggingface.co").rstrip("/")
+    return f"{base}/models/{model_name}", payload, headers, list(hf_api_labels), model_name
+
+
+async def _predict_remote(provider: str, text: str) -> PredictResponse:
+    url, payload, headers, labels, model_name = _remote_request(provider, text)
+    name = "Gemini" if provider == "gemini" else "HuggingFace API"
+    client = http_client.get_client(provider, CONFIG)
+    try:
+        with metrics.stage("remote", provider):
+            response = await client.post_json(url, payload, headers=headers)
+    except http_client.CircuitOpenError as e:
+        if str(CONFIG.get("remote_fallback") or "none").lower() == "sklearn":
+            return await run_in_threadpool(_fallback_local, name, text)
+        raise HTTPException(
+            status_code=503,
+            detail=f"{name} temporarily unavailable: {e}",
+            headers={"Retry-After": str(max(1, int(e.retry_after + 0.999)))},
+        )
+    except http_client.RemoteHTTPError as e:
+        metrics.inc("predictor_remote_errors_total", provider=provider, status=str(e.status))
+        raise HTTPException(status_code=500, detail=f"{name} HTTPError: {e.detail}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{name} request failed: {e}")
+
+    with metrics.stage("parse", provider):
+        if provider == "gemini":
+            text_out = _parse_gemini_text(response)
+        else:
+            text_out = _parse_hf_api_text(response)
+        return _remote_response(provider, text_out, labels, model_name)
+
+
+def _remote_response(provider: str, text_out: str, labels: List[str], model_name: str) -> PredictResponse:
+    pred = _label_from_text(text_out, labels)
+    if provider == "gemini":
+        conf = extract_confidence_from_response(text_out)
+    else:
+        conf = 0.8  # Default confidence for HF API (can be adjusted based on language used)
+    reason = _remote_reason(provider, pred, text_out, model_name)
+    return PredictResponse(prediction=pred, confidence=round(conf,4), top_features=None, reason=reason)
+
+
+def _fallback_local(name: str, text: str) -> PredictResponse:
+    # Remote circuit is open: answer from the local sklearn model instead
+    try:
+        _ensure_sklearn_loaded()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"{name} temporarily unavailable and no local fallback: {e}")
+    metrics.annotate(fallback=True)
+    pred, conf, feats, reason = _predict_one(text)
+    note = f"Note: {name} is temporarily unavailable, so this prediction comes from the local statistical model."
+    reason = f"{note}\n\n{reason}" if reason else note
+    return PredictResponse(prediction=pred, confidence=round(conf, 4), top_features=feats, reason=reason)
+
+
+@app.get("/labels")
+async def labels(mode: Optional[str] = None):
+    model_type = _resolve_mode(mode)
+    if model_type == "hf":
         try:
-            if isinstance(response, list) and len(response) > 0:
-                if "generated_text" in response[0]:
-                    text_out = response[0]["generated_text"].strip()
-                elif "text" in response[0]:
-                    text_out = response[0]["text"].strip()
-            elif isinstance(response, dict):
-                if "generated_text" in response:
-                    text_out = response["generated_text"].strip()
-                elif "text" in response:
-                    text_out = response["text"].strip()
-                elif "error" in response:
-                    raise HTTPException(status_code=500, detail=f"HuggingFace API Error: {response['error']}")
+            _hf_model, _ = _ensure_hf_loaded()
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to parse HuggingFace response: {e}")
-        
-        # Extract prediction from the detailed response
-        lower_out = text_out.lower()
-        pred = None
-        for lab in hf_api_labels:
-            if lab.lower() in lower_out:
-                pred = lab
-                break
-        if pred is None:
-            pred = hf_api_labels[0]  # fallback
-        
-        feats = None
-        conf = 0.8  # Default confidence for HF API (can be adjusted based on language used)
-        
-        # Use the full HF response as the detailed reasoning
-        if text_out and len(text_out) > 50:
-            # Clean up the response if needed
-            reason = text_out.strip()
-            # Add disclaimer if not already present
-            if "disclaimer" not in reason.lower():
-                reason += f"\n\nImportant Legal Disclaimer: This analysis was generated using {model_name} via HuggingFace API. While this model provides sophisticated legal reasoning, it cannot substitute for professional legal counsel. Actual case outcomes depend on evidence quality, witness credibility, legal precedents, procedural factors, and judicial discretion that require human legal expertise."
+            raise HTTPException(status_code=500, detail=str(e))
+        return {"labels": [str(_hf_model.config.id2label[i]) for i in range(_hf_model.config.num_labels)]}
+    # Label lists are normalised once, when the config snapshot is parsed
+    if model_type in ("zeroshot", "llm", "gemini", "hf_api"):
+        key = "zsh_labels" if model_type == "zeroshot" else f"{model_type}_labels"
+        return {"labels": list(CONFIG.get(key) or ("plaintiff_wins", "defendant_wins"))}
+    _model, _ = _ensure_sklearn_loaded()
+    return {"labels": list(_model.classes_)}
+
+
+def _predict_hf(text: str, explain: str = "full") -> PredictResponse:
+    try:
+        _hf_model, _hf_tokenizer = _ensure_hf_loaded()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    try:
+        import torch
+    except ImportError as e:
+        raise RuntimeError(
+            "Hugging Face mode requires 'torch'. Install it (CPU-only is fine)."
+        ) from e
+    hf_max_len = int(CONFIG.get("hf_max_len", 512))
+    attribute = explain != "none" and CONFIG.get("hf_attribution", "grad_input") == "grad_input"
+    offsets = word_ids = None
+    with metrics.stage("tokenize", "hf"):
+        inputs = _hf_tokenizer([text], truncation=True, max_length=hf_max_len, return_tensors="pt",
+                               return_offsets_mapping=attribute and _hf_tokenizer.is_fast)
+        if "offset_mapping" in inputs:
+            offsets = inputs.pop("offset_mapping")[0].tolist()
+            word_ids = inputs.word_ids(0)
+    scores = None
+    if attribute:
+        # Same forward pass, plus one backward to the embeddings
+        with metrics.stage("attribute", "hf"):
+            logits, scores = attributions.forward_with_attributions(_hf_model, inputs)
+            probs = torch.softmax(logits, dim=-1).cpu().numpy()
+    else:
+        with torch.no_grad(), metrics.stage("forward", "hf"):
+            logits = _hf_model(**inputs).logits[0]
+            probs = torch.softmax(logits, dim=-1).cpu().numpy()
+    labels = [_hf_model.config.id2label[i] for i in range(len(probs))]
+    idx = int(probs.argmax())
+    pred = labels[idx]
+    conf = float(probs[idx])
+    feats = None
+    if scores is not None:
+        scores = scores.cpu().tolist()
+        if offsets is not None:
+            feats = attributions.top_words(text, offsets, word_ids, scores, k=8)
         else:
-            reason = (
-                f"Based on {model_name} AI analysis, the outcome suggests {pred}.\n\n"
-                f"Reasoning:\nThe AI model provided this assessment: '{text_out}'. "
-                f"However, this prediction should be considered alongside professional legal analysis. "
-                f"Legal case outcomes depend on numerous factors including evidence presentation, "
-                f"legal precedents, attorney strategy, witness credibility, and judicial interpretation "
-                f"that no AI can fully capture."
-            )
-        
-        return PredictResponse(prediction=pred, confidence=round(conf,4), top_features=feats, reason=reason)
+            tokens = _hf_tokenizer.convert_ids_to_tokens(inputs["input_ids"][0].tolist())
+            feats = attributions.top_tokens(tokens, _hf_tokenizer.all_special_tokens, scores, k=8)
+    reason = None
+    if explain == "full":
+        with metrics.stage("explain", "hf"):
+            reason = _reason_hf(pred, probs, labels, text, key_terms=feats)
+    return PredictResponse(prediction=pred, confidence=round(conf,4), top_features=feats, reason=reason)
+
+
+def _predict_hf_batch(texts: List[str]) -> List[Tuple[str, float]]:
+    """(label, confidence) per text from padded forward passes; no explanations."""
+    _hf_model, _hf_tokenizer = _ensure_hf_loaded()
+    import torch
+
+    hf_max_len = int(CONFIG.get("hf_max_len", 512))
+    with torch.no_grad():
+        with metrics.stage("tokenize", "hf"):
+            inputs = _hf_tokenizer(texts, truncation=True, max_length=hf_max_len, padding=True, return_tensors="pt")
+        with metrics.stage("forward", "hf"):
+            probs = torch.softmax(_hf_model(**inputs).logits, dim=-1).cpu().numpy()
+    best = probs.argmax(axis=1)
+    return [(_hf_model.config.id2label[int(i)], float(p[i])) for i, p in zip(best, probs)]
+
+
+def _zeroshot_classify(text: str) -> dict:
+    try:
+        _zs_pipe = _ensure_zeroshot_loaded()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    candidate_labels = list(CONFIG.get("zsh_labels") or ("plaintiff_wins", "defendant_wins"))
+    max_len = int(CONFIG.get("zsh_max_len", 512))
+    with metrics.stage("forward", "zeroshot"):
+        res = _zs_pipe(
+            text,
+            candidate_labels=candidate_labels,
+            multi_label=False,
+            truncation=True,
+            max_length=max_len,
+        )
+    # res: {'sequence': ..., 'labels': [...], 'scores': [...]}
+    if not (res.get('labels') or []) or not (res.get('scores') or []):
+        raise HTTPException(status_code=500, detail="Zero-shot prediction failed")
+    return res
+
+
+def _predict_zeroshot(text: str, explain: str = "full") -> PredictResponse:
+    res = _zeroshot_classify(text)
+    pred = res['labels'][0]
+    conf = float(res['scores'][0])
+    feats = None
+    reason = None
+    if explain == "full":
+        # Three more zero-shot passes: by far the most expensive reason builder
+        with metrics.stage("explain", "zeroshot"):
+            reason = _reason_zeroshot(res, text)
+    return PredictResponse(prediction=pred, confidence=round(conf,4), top_features=feats, reason=reason)
+
+
+def _llm_inputs(text: str):
+    """Load the LLM and return (model, tokenizer, tokenized prompt, labels)."""
+    try:
+        _llm_model, _llm_tokenizer = _ensure_llm_loaded()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    llm_labels = list(CONFIG.get("llm_labels") or ("plaintiff_wins", "defendant_wins"))
+    prompt = (
+        "You are a legal outcome classifier. Given the case summary, choose exactly one label from: "
+        + ", ".join(llm_labels)
+        + "\nReturn only the label.\n\nCase Summary:\n" + text + "\nLabel:" )
+    import torch
+    with metrics.stage("tokenize", "llm"):
+        inputs = _llm_tokenizer(prompt, return_tensors="pt")
+        if torch.cuda.is_available():
+            inputs = {k: v.to(_llm_model.device) for k,v in inputs.items()}
+    return _llm_model, _llm_tokenizer, inputs, llm_labels
+
+
+def _llm_reason(pred: str, gen_text: str) -> str:
+    # Generate AI-powered explanation for LLM predictions
+    outcome = "plaintiff victory" if pred == "plaintiff_wins" else "defendant victory"
+    return (
+        f"Large Language Model analysis suggests {outcome} based on comprehensive text understanding. "
+        f"The model generated: '{gen_text}'. This prediction leverages advanced natural language processing "
+        f"to interpret legal context, relationships, and implications within the case summary. However, "
+        f"LLM predictions are based on training patterns and cannot account for case-specific evidence, "
+        f"legal precedents, procedural nuances, witness testimony, or judicial discretion. This analysis "
+        f"should inform preliminary assessment but must be supplemented with professional legal expertise "
+        f"and thorough case investigation."
+    )
 
-    _ensure_model_loaded()
-    assert _model is not None and _vectorizer is not None
-    pred, conf, feats, reason = _predict_one(text)
+
+def _predict_llm(text: str, explain: str = "full") -> PredictResponse:
+    _llm_model, _llm_tokenizer, inputs, llm_labels = _llm_inputs(text)
+    max_new = int(CONFIG.get("llm_max_new_tokens", 32))
+    try:
+        with metrics.stage("forward", "llm"):
+            output_ids = _llm_model.generate(**inputs, max_new_tokens=max_new, do_sample=False)
+        with metrics.stage("decode", "llm"):
+            gen_text = _llm_tokenizer.decode(output_ids[0][inputs['input_ids'].shape[1]:], skip_special_tokens=True).strip()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"LLM generation failed: {e}")
+    # Parse: find first label mention
+    pred = _label_from_text(gen_text, llm_labels)
+    # Confidence proxy: crude binary (not probabilistic)
+    conf = 0.5
+    feats = None
+    reason = _llm_reason(pred, gen_text) if explain == "full" else None
+    return PredictResponse(prediction=pred, confidence=round(conf,4), top_features=feats, reason=reason)
+
+
+def _predict_sklearn(text: str, explain: str = "full") -> PredictResponse:
+    pred, conf, feats, reason = _predict_one(text, explain)
     return PredictResponse(prediction=pred, confidence=round(conf, 4), top_features=feats, reason=reason)
 
 
+def _resolve_mode(mode: Optional[str]) -> str:
+    if not mode:
+        return (CONFIG.get("model_type") or "sklearn").lower()
+    mode = mode.lower()
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'. Choose one of: {', '.join(MODES)}")
+    return mode
+
+
+async def _admit(model_type: str) -> admission.Ticket:
+    mode = model_type if model_type in admission.DEFAULT_LIMITS else "sklearn"
+    try:
+        return await admission.get_gate(mode, CONFIG).acquire()
+    except admission.Rejected as e:
+        raise HTTPException(
+            status_code=e.status,
+            detail=f"{mode} is overloaded ({e.reason}); retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _resolve_explain(explain: Optional[str]) -> str:
+    level = (explain or CONFIG.get("explain_default") or "full").lower()
+    if level not in prediction_cache.LEVELS:
+        raise HTTPException(status_code=400, detail=f"Unknown explain '{level}'. Choose one of: {', '.join(prediction_cache.LEVELS)}")
+    return level
+
+
+# Config that changes a mode's output; part of the prediction cache key
+_MODE_CONFIG_KEYS = {
+    "sklearn": (),
+    "hf": ("hf_model_dir", "hf_max_len", "hf_attribution"),
+    "zeroshot": ("zsh_model", "zsh_labels", "zsh_max_len"),
+    "llm": ("llm_model", "llm_labels", "llm_max_input", "llm_max_new_tokens"),
+    "gemini": ("gemini_model", "gemini_labels"),
+    "hf_api": ("hf_api_model", "hf_api_labels", "hf_api_max_tokens"),
+}
+
+
+def _cache_key(model_type: str, text: str) -> str:
+    prediction_cache.CACHE.configure(
+        int(CONFIG.get("prediction_cache_size") or 0), float(CONFIG.get("prediction_cache_ttl_s") or 0),
+        float(CONFIG.get("near_dup_threshold") or 0),
+    )
+    return prediction_cache.make_key(model_type, _cache_identity(model_type), text)
+
+
+def _cache_identity(model_type: str) -> list:
+    return [CONFIG.get(k) for k in _MODE_CONFIG_KEYS.get(model_type, ())]
+
+
+def _cache_scope(model_type: str) -> str:
+    # Near-duplicate lookups stay within one mode and mode config
+    return prediction_cache.make_key(model_type, _cache_identity(model_type), "")
+
+
+async def _run_mode(model_type: str, text: str, explain: str) -> PredictResponse:
+    # Local inference runs in the threadpool so the event loop keeps serving
+    if model_type == "hf":
+        return await run_in_threadpool(_predict_hf, text, explain)
+    if model_type == "zeroshot":
+        return await run_in_threadpool(_predict_zeroshot, text, explain)
+    if model_type == "llm":
+        return await run_in_threadpool(_predict_llm, text, explain)
+    if model_type in ("gemini", "hf_api"):
+        # The analysis comes with the answer; explain only trims the response
+        return await _predict_remote(model_type, text)
+    return await run_in_threadpool(_predict_sklearn, text, explain)
+
+
+def _shape(result: dict, explain: str, reason_id: Optional[str] = None) -> dict:
+    # `result` was validated when it was produced; no second PredictResponse pass
+    out = dict(result)
+    if explain == "none":
+        out["top_features"] = None
+    if explain != "full" or reason_id:
+        out["reason"] = None
+    out["reason_id"] = reason_id
+    return out
+
+
+def _fields(fields: Optional[str], model) -> Optional[frozenset]:
+    try:
+        return encoding.parse_fields(fields, model.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _respond(request: Optional[Request], payload: dict, fields: Optional[frozenset] = None):
+    # Encoded after handler_end, so it shows up as the serialize stage
+    return await encoding.respond(request, encoding.select(payload, fields), CONFIG)
+
+
+@app.post("/predict", response_model=PredictResponse)
+async def predict(body: PredictRequest, request: Request = None, background: BackgroundTasks = None,
+                  fields: Optional[str] = None):
+    """`fields=prediction,confidence` returns only those fields (and skips unneeded explanation work)."""
+    text = (body.summary or "").strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Summary must not be empty")
+
+    model_type = _resolve_mode(body.mode)
+    selected = _fields(fields, PredictResponse)
+    explain = encoding.explain_for(_resolve_explain(body.explain), selected)
+    key = _cache_key(model_type, text)
+    # Deferred reasons live in the prediction cache, so they need it enabled
+    defer = body.defer_reason and explain == "full" and prediction_cache.CACHE.max_entries > 0
+    # A deferred reason is built on first fetch, so only features are needed now
+    needed = "features" if defer and model_type not in ("gemini", "hf_api") else explain
+    metrics.annotate(mode=model_type, text_len=len(text), explain=explain)
+    scope = _cache_scope(model_type)
+    cached = prediction_cache.CACHE.get(key, needed)
+    metrics.annotate(cache_hit=cached is not None)
+    if cached is None and prediction_cache.CACHE.near_threshold > 0:
+        cached = await run_in_threadpool(prediction_cache.CACHE.get_near, scope, text, needed)
+        if cached is not None:
+            metrics.annotate(cache_hit="near")
+    if cached is not None:
+        metrics.annotate(handler_end=time.perf_counter())
+        _shadow(background, model_type, needed, text, cached.result, None)
+        # A deferred reason is keyed by the cached text it will explain
+        return await _respond(request, _shape(cached.result, explain, cached.key if defer else None), selected)
+
+    with metrics.stage("queue", model_type):
+        ticket = await _admit(model_type)
+    try:
+        started = time.perf_counter()
+        resp = await _run_mode(model_type, text, needed)
+        result = resp.model_dump(exclude={"reason_id"})
+        _shadow(background, model_type, needed, text, result, (time.perf_counter() - started) * 1000)
+        # Remote answers always carry their analysis
+        level = "full" if model_type in ("gemini", "hf_api") else needed
+        if not (metrics.request_context() or {}).get("fallback"):
+            prediction_cache.CACHE.put(key, model_type, text, result, level, scope)
+        elif defer:
+            defer = False  # not cached, so there is nothing to fetch later
+        payload = _shape(result, explain, key if defer else None)
+    finally:
+        ticket.release()
+        metrics.annotate(handler_end=time.perf_counter())
+    return await _respond(request, payload, selected)
+
+
+@app.get("/predict/reason/{reason_id}", response_model=PredictResponse)
+async def predict_reason(reason_id: str, request: Request, fields: Optional[str] = None):
+    """Full explanation for a reason_id returned by /predict with defer_reason."""
+    entry = prediction_cache.CACHE.peek(reason_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired reason_id; request the prediction again")
+    metrics.annotate(mode=entry.mode, cache_hit=entry.level == "full")
+    if entry.level != "full":
+        with metrics.stage("queue", entry.mode):
+            ticket = await _admit(entry.mode)
+        try:
+            resp = await _run_mode(entry.mode, entry.text, "full")
+        finally:
+            ticket.release()
+        entry = prediction_cache.CACHE.put(reason_id, entry.mode, entry.text, resp.model_dump(exclude={"reason_id"}), "full",
+                                             scope=entry.scope)
+    metrics.annotate(handler_end=time.perf_counter())
+    return await _respond(request, _shape(entry.result, "full"), _fields(fields, PredictResponse))
+
+
 @app.post("/predict/best", response_model=PredictResponse)
-async def predict_best(body: PredictRequest):
+async def predict_best(body: PredictRequest, request: Request, background: BackgroundTasks = None,
+                       fields: Optional[str] = None):
     # Alias so users hitting /predict/best get the same behavior
-    return await predict(body)
+    return await predict(body, request, background, fields)
+
+
+# -------- Shadow evaluation --------
+def _shadow(background: Optional[BackgroundTasks], primary: str, explain: str, text: str, result: dict,
+            primary_ms: Optional[float]) -> None:
+    """Queue a shadow comparison to start once the response has been sent.
+
+    The candidate does the same explanation work as the primary did, so the
+    latencies compare like for like (primary_ms is None for cache hits).
+    """
+    candidate = str(CONFIG.get("shadow_mode") or "").lower()
+    if background is None or not candidate or (candidate == primary and not CONFIG.get("shadow_config")):
+        return
+    if (metrics.request_context() or {}).get("fallback"):
+        return  # the primary answer did not come from the primary mode
+    shadow.SHADOW.configure(float(CONFIG.get("shadow_sample_rate") or 0), int(CONFIG.get("shadow_concurrency") or 1))
+    if shadow.SHADOW.sample_rate > 0:
+        background.add_task(_offer_shadow, primary, candidate, explain, text, result["prediction"],
+                            result["confidence"], primary_ms)
+
+
+async def _offer_shadow(primary: str, candidate: str, explain: str, text: str, label: str, confidence: float,
+                        primary_ms: Optional[float]) -> None:
+    shadow.SHADOW.offer(primary, candidate, text, label, confidence, primary_ms,
+                        lambda t: _shadow_run(candidate, t, explain))
+
+
+async def _shadow_run(candidate: str, text: str, explain: str) -> Tuple[str, float]:
+    # Runs in its own task: the scratch context and overrides stay local to it
+    metrics.begin_request(shadow=True)
+    config_store.pin(CONFIG_STORE.derive(CONFIG.get("shadow_config") or {}, CONFIG.snapshot()))
+    ticket = await _admit_background(candidate)
+    try:
+        resp = await _run_mode(candidate, text, explain)
+    finally:
+        ticket.release()
+    if (metrics.request_context() or {}).get("fallback"):
+        raise RuntimeError("answered by the local fallback")
+    return resp.prediction, resp.confidence
+
+
+@app.get("/shadow")
+async def shadow_stats():
+    """Agreement and latency of the shadow candidate against the primary mode."""
+    return {"candidate": CONFIG.get("shadow_mode") or None, "shadow_config": dict(CONFIG.get("shadow_config") or {}),
+            **shadow.SHADOW.stats()}
+
+
+@app.delete("/shadow")
+async def shadow_reset():
+    shadow.SHADOW.reset()
+    return {"ok": True}
+
+
+# -------- Streaming (server-sent events) --------
+# event: prediction  {"prediction", "confidence"}  as soon as the label is known
+# event: reason      {"text"}                       reasoning, as it is produced
+# event: done        full PredictResponse           authoritative final result
+# event: error       {"detail"}                     failure after the stream started
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _sse_from_response(resp: PredictResponse):
+    yield _sse("prediction", {"prediction": resp.prediction, "confidence": resp.confidence})
+    if resp.reason:
+        sections = resp.reason.split("\n\n")
+        for i, section in enumerate(sections):
+            yield _sse("reason", {"text": section + ("\n\n" if i < len(sections) - 1 else "")})
+    yield _sse("done", resp.model_dump())
+
+
+async def _sse_from_deltas(deltas, labels: List[str], finish):
+    """Relay generated text; `finish(text)` builds the PredictResponse for it."""
+    acc = ""
+    sent = False
+    try:
+        async for delta in deltas:
+            if not delta:
+                continue
+            acc += delta
+            if not sent and _find_label(acc, labels) is not None:
+                early = finish(acc.strip())
+                yield _sse("prediction", {"prediction": early.prediction, "confidence": early.confidence})
+                sent = True
+            yield _sse("reason", {"text": delta})
+    except HTTPException as e:
+        yield _sse("error", {"detail": e.detail})
+        return
+    except Exception as e:
+        yield _sse("error", {"detail": str(e)})
+        return
+    final = finish(acc.strip())
+    if not sent:
+        yield _sse("prediction", {"prediction": final.prediction, "confidence": final.confidence})
+    yield _sse("done", final.model_dump())
+
+
+def _gemini_delta(event) -> str:
+    try:
+        return event["candidates"][0]["content"]["parts"][0].get("text", "")
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
+def _hf_api_delta(event) -> str:
+    if isinstance(event, dict):
+        if event.get("error"):
+            raise HTTPException(status_code=500, detail=f"HuggingFace API Error: {event['error']}")
+        token = event.get("token") or {}
+        if not token.get("special"):
+            return token.get("text") or ""
+    return ""
+
+
+async def _stream_remote(provider: str, text: str):
+    url, payload, headers, labels, model_name = _remote_request(provider, text, stream=True)
+    name = "Gemini" if provider == "gemini" else "HuggingFace API"
+    client = http_client.get_client(provider, CONFIG)
+    if client.breaker.is_open():
+        if str(CONFIG.get("remote_fallback") or "none").lower() == "sklearn":
+            return _sse_from_response(await run_in_threadpool(_fallback_local, name, text))
+        retry_after = client.breaker.retry_after()
+        raise HTTPException(
+            status_code=503,
+            detail=f"{name} temporarily unavailable: circuit open",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+    to_text = _gemini_delta if provider == "gemini" else _hf_api_delta
+
+    async def deltas():
+        try:
+            async for event in client.stream_sse(url, payload, headers=headers):
+                yield to_text(event)
+        except (http_client.RemoteHTTPError, http_client.CircuitOpenError) as e:
+            raise RuntimeError(f"{name} HTTPError: {getattr(e, 'detail', e)}") from e
+
+    return _sse_from_deltas(deltas(), labels, lambda out: _remote_response(provider, out, labels, model_name))
+
+
+async def _stream_llm(text: str, ticket: admission.Ticket):
+    """Events and a stop callable; the generating thread releases `ticket` when it exits.
+
+    A client that disconnects stops generation at the next token instead of
+    at llm_max_new_tokens, and the slot stays held until the model is idle,
+    so the llm concurrency limit counts the work actually running.
+    """
+    import asyncio
+
+    _llm_model, _llm_tokenizer, inputs, llm_labels = await run_in_threadpool(_llm_inputs, text)
+    from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+    max_new = int(CONFIG.get("llm_max_new_tokens", 32))
+    streamer = TextIteratorStreamer(_llm_tokenizer, skip_prompt=True, skip_special_tokens=True)
+    errors: list[Exception] = []
+    cancel = threading.Event()
+    loop = asyncio.get_running_loop()
+
+    class _Cancelled(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return cancel.is_set()
+
+    def _generate():
+        try:
+            _llm_model.generate(**inputs, max_new_tokens=max_new, do_sample=False, streamer=streamer,
+                                stopping_criteria=StoppingCriteriaList([_Cancelled()]))
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+        finally:
+            try:
+                loop.call_soon_threadsafe(ticket.release)  # the gate is not thread-safe
+            except RuntimeError:
+                pass  # loop closed at shutdown
+
+    threading.Thread(target=_generate, daemon=True).start()
+
+    async def deltas():
+        async for piece in iterate_in_threadpool(streamer):
+            yield piece
+        if errors:
+            raise RuntimeError(f"LLM generation failed: {errors[0]}")
+
+    def finish(gen_text: str) -> PredictResponse:
+        pred = _label_from_text(gen_text, llm_labels)
+        return PredictResponse(prediction=pred, confidence=0.5, top_features=None, reason=_llm_reason(pred, gen_text))
+
+    return _sse_from_deltas(deltas(), llm_labels, finish), cancel.set
+
+
+async def _stream_zeroshot(text: str):
+    res = await run_in_threadpool(_zeroshot_classify, text)
+
+    async def events():
+        pred, conf = res['labels'][0], round(float(res['scores'][0]), 4)
+        yield _sse("prediction", {"prediction": pred, "confidence": conf})
+        # The reason needs three more zero-shot passes; the label is already out
+        with metrics.stage("explain", "zeroshot"):
+            reason = await run_in_threadpool(_reason_zeroshot, res, text)
+        async for event in _sse_from_response(PredictResponse(prediction=pred, confidence=conf, reason=reason)):
+            if not event.startswith("event: prediction"):
+                yield event
+
+    return events()
+
+
+async def _release_after(events, release):
+    try:
+        async for event in events:
+            yield event
+    finally:
+        release()
+
+
+@app.post("/predict/stream")
+async def predict_stream(body: PredictRequest):
+    text = (body.summary or "").strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Summary must not be empty")
+
+    model_type = _resolve_mode(body.mode)
+    metrics.annotate(mode=model_type, text_len=len(text))
+    # The slot is held until the stream finishes, not just until it starts
+    with metrics.stage("queue", model_type):
+        ticket = await _admit(model_type)
+    release = ticket.release
+    try:
+        if model_type in ("gemini", "hf_api"):
+            events = await _stream_remote(model_type, text)
+        elif model_type == "llm":
+            # Stopping the stream cancels generation; the ticket goes when the thread does
+            events, release = await _stream_llm(text, ticket)
+        elif model_type == "zeroshot":
+            events = await _stream_zeroshot(text)
+        elif model_type == "hf":
+            events = _sse_from_response(await run_in_threadpool(_predict_hf, text))
+        else:
+            events = _sse_from_response(await run_in_threadpool(_predict_sklearn, text))
+    except BaseException:
+        ticket.release()
+        raise
+    return StreamingResponse(
+        _release_after(events, release),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _predict_batch_items(summaries: List[str], explain: str = "full") -> List[BatchPredictItem]:
+    _model, _vectorizer = _ensure_sklearn_loaded()
+    texts = [(s or "").strip() for s in summaries]
+    rows = [i for i, t in enumerate(texts) if t]
+    # Built from values typed here: model_construct skips re-validating them
+    items = [BatchPredictItem.model_construct(prediction="", confidence=0.0, top_features=None, reason=None)
+             for _ in texts]
+    if not rows:
+        return items
+    # One vectorizer pass and one predict_proba over the whole batch
+    with metrics.stage("vectorize", "sklearn"):
+        X = _vectorizer.transform([texts[i] for i in rows])
+    with metrics.stage("forward", "sklearn"):
+        proba = _model.predict_proba(X)
+    classes = list(_model.classes_)
+    best = proba.argmax(axis=1)
+    with metrics.stage("explain", "sklearn"):
+        for n, i in enumerate(rows):
+            idx = int(best[n])
+            pred, conf = classes[idx], float(proba[n, idx])
+            feats, reason = (None, None)
+            if explain != "none":
+                feats, reason = _explain_sklearn(_model, _vectorizer, X[n], idx, pred, conf, explain)
+            items[i] = BatchPredictItem.model_construct(prediction=str(pred), confidence=round(conf, 4),
+                                                        top_features=feats, reason=reason)
+    return items
 
 
 @app.post("/predict/batch", response_model=BatchPredictResponse)
-async def predict_batch(body: BatchPredictRequest):
-    _ensure_model_loaded()
-    assert _model is not None and _vectorizer is not None
+async def predict_batch(body: BatchPredictRequest, request: Request, fields: Optional[str] = None):
+    """`fields` selects the fields of each item, as for /predict."""
     if not body.summaries:
         raise HTTPException(status_code=400, detail="No summaries provided")
-    items = []
-    for s in body.summaries:
-        s2 = (s or "").strip()
-        if not s2:
-            items.append(BatchPredictItem(prediction="", confidence=0.0, top_features=None, suggestions=None))
+    selected = _fields(fields, BatchPredictItem)
+    explain = encoding.explain_for(_resolve_explain(body.explain), selected)
+    metrics.annotate(mode="sklearn", explain=explain)
+    with metrics.stage("queue", "sklearn"):
+        ticket = await _admit("sklearn")
+    try:
+        items = await run_in_threadpool(_predict_batch_items, body.summaries, explain)
+    finally:
+        ticket.release()
+        metrics.annotate(handler_end=time.perf_counter())
+    return await _respond(request, {"items": [encoding.select(dict(item), selected) for item in items]})
+
+
+# -------- Batch jobs --------
+async def _admit_background(model_type: str) -> admission.Ticket:
+    mode = model_type if model_type in admission.DEFAULT_LIMITS else "sklearn"
+    gate = admission.get_gate(mode, CONFIG)
+    gate.reserve = int(CONFIG.get("jobs_reserved_slots", 1))
+    return await gate.acquire_background()
+
+
+async def _score_job_batch(mode: str, explain: str, texts: List[str]) -> List[dict]:
+    if mode == "sklearn":
+        # One vectorized pass per batch, in a background admission slot
+        ticket = await _admit_background("sklearn")
+        try:
+            items = await run_in_threadpool(_predict_batch_items, texts, explain)
+        finally:
+            ticket.release()
+        return [item.model_dump() for item in items]
+    out: List[dict] = []
+    for text in texts:
+        text = (text or "").strip()
+        if not text:
+            out.append({"prediction": "", "confidence": 0.0, "top_features": None, "reason": None})
             continue
-    p, c, f, r = _predict_one(s2)
-    items.append(BatchPredictItem(prediction=p, confidence=round(c,4), top_features=f, reason=r))
-    return BatchPredictResponse(items=items)
+        ticket = await _admit_background(mode)
+        try:
+            resp = await _run_mode(mode, text, explain)
+            shaped = _shape(resp.model_dump(exclude={"reason_id"}), explain)
+            del shaped["reason_id"]
+            out.append(shaped)
+        except HTTPException as e:
+            out.append({"error": str(e.detail)})
+        finally:
+            ticket.release()
+    return out
+
+
+def _job_items_from_csv(raw: bytes, text_column: str, id_column: Optional[str]) -> List[Tuple[str, str]]:
+    reader = csv.DictReader(raw.decode("utf-8-sig").splitlines())
+    if reader.fieldnames is None or text_column not in reader.fieldnames:
+        raise HTTPException(status_code=400, detail=f"CSV has no '{text_column}' column")
+    if id_column and id_column not in reader.fieldnames:
+        raise HTTPException(status_code=400, detail=f"CSV has no '{id_column}' column")
+    return [(rec[id_column] if id_column else str(i), rec[text_column] or "") for i, rec in enumerate(reader)]
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: Request, mode: Optional[str] = None, explain: Optional[str] = None,
+                     text_column: str = "summary", id_column: Optional[str] = None):
+    """Queue a batch: a JSON JobRequest, or a CSV body (Content-Type: text/csv)."""
+    if "csv" in (request.headers.get("content-type") or ""):
+        items = _job_items_from_csv(await request.body(), text_column, id_column)
+    else:
+        try:
+            body = JobRequest.model_validate(await request.json())
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Expected a JSON job or a CSV body: {e}")
+        if body.ids is not None and len(body.ids) != len(body.summaries):
+            raise HTTPException(status_code=400, detail="ids must match summaries one to one")
+        ids = body.ids or [str(i) for i in range(len(body.summaries))]
+        items = list(zip(ids, body.summaries))
+        mode, explain = body.mode or mode, body.explain or explain
+    if not items:
+        raise HTTPException(status_code=400, detail="No summaries provided")
+    limit = int(CONFIG.get("jobs_max_items") or 0)
+    if limit and len(items) > limit:
+        raise HTTPException(status_code=413, detail=f"A job takes at most {limit} items")
+    model_type = _resolve_mode(mode)
+    explain = _resolve_explain(explain or "none")
+    jobs.JOBS.configure(int(CONFIG.get("jobs_workers", 2)), int(CONFIG.get("jobs_max", 100)))
+    job = jobs.JOBS.submit(model_type, explain, items, _score_job_batch, int(CONFIG.get("jobs_batch_size", 64)))
+    return {**job.summary(), "status_url": f"/jobs/{job.id}", "results_url": f"/jobs/{job.id}/results"}
+
+
+def _get_job(job_id: str) -> jobs.Job:
+    job = jobs.JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id")
+    return job
+
+
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": jobs.JOBS.list(), **jobs.JOBS.stats()}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return _get_job(job_id).summary()
+
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str, start: int = 0):
+    """NDJSON: one line per finished item (completion order) as they arrive, then a summary line."""
+    job = _get_job(job_id)
+
+    async def lines():
+        async for record in jobs.JOBS.stream(job, start):
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    _get_job(job_id)
+    return jobs.JOBS.cancel(job_id).summary()
+
+
+# -------- Similar cases --------
+def _similar_index() -> similar.SimilarityIndex:
+    """The case index for the current vectorizer: the one saved by train_model.py, else built now."""
+    _model, vectorizer = _ensure_sklearn_loaded()
+
+    def load():
+        index = similar.load(vectorizer, similar.INDEX_PATH)
+        if index is None:
+            index = similar.build(vectorizer, _dataset_rows() if DATA_PATH.exists() else [])
+        index.refreshed = 0.0
+        return index
+
+    index = _pooled(f"similar:{similar.fingerprint(vectorizer)}", load)
+    _refresh_similar(index)
+    return index
+
+
+def _refresh_similar(index: similar.SimilarityIndex) -> None:
+    # Labeled feedback from every worker lands in the shared database; fold
+    # in whatever is newer than the last row this index has seen
+    now = time.monotonic()
+    if now - index.refreshed < float(CONFIG.get("similar_refresh_s", 30)) or not FEEDBACK_DB_PATH.exists():
+        return
+    index.refreshed = now
+    cursor = index.feedback_cursor
+    batch: List[Tuple[str, str, str]] = []
+    for row_id, summary, label in feedback_store.labeled_since(FEEDBACK_DB_PATH, cursor):
+        batch.append((summary, label.strip(), "feedback"))
+        cursor = row_id
+        if len(batch) >= 1000:
+            index.add(batch)
+            batch = []
+    index.add(batch)
+    index.feedback_cursor = cursor
+
+
+def _similar(text: str, k: int, min_score: float) -> dict:
+    start = time.perf_counter()
+    with metrics.stage("similar", "sklearn"):
+        index = _similar_index()
+        results = index.search(text, k, min_score)
+    return {"results": results, "corpus_size": len(index), "took_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+@app.post("/similar")
+async def similar_cases(body: SimilarRequest):
+    """Top-k past cases (dataset and labeled feedback) by TF-IDF cosine similarity."""
+    text = (body.summary or "").strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Empty summary")
+    k = max(1, min(int(body.k), 100))
+    try:
+        return await run_in_threadpool(_similar, text, k, float(body.min_score))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/models")
+async def models():
+    # Resident backends with estimated memory, most recently used first
+    return model_pool.POOL.stats()
+
+
+@app.get("/debug/memory")
+async def debug_memory():
+    # This worker's RSS / PSS / USS; USS is what the worker costs on its own
+    return {"worker": procmem.memory_info(), "pool": model_pool.POOL.stats()}
+
+
+@app.get("/debug/cpu")
+async def debug_cpu():
+    # This worker's cores and torch thread pools
+    return cpu.describe(CONFIG)
+
+
+def _collect_runtime() -> List[str]:
+    # Gauges read at scrape time: admission queues, model pool, circuit breakers
+    lines = [
+        "# TYPE predictor_admission_active gauge",
+        "# TYPE predictor_admission_queued gauge",
+        "# TYPE predictor_admission_admitted_total counter",
+        "# TYPE predictor_admission_rejected_total counter",
+    ]
+    for mode, st in admission.snapshot().items():
+        lines.append(metrics.sample("predictor_admission_active", st["active"], mode=mode))
+        lines.append(metrics.sample("predictor_admission_queued", st["queued"], mode=mode))
+        lines.append(metrics.sample("predictor_admission_admitted_total", st["admitted"], mode=mode))
+        lines.append(metrics.sample("predictor_admission_rejected_total", st["rejected_queue_full"], mode=mode, reason="queue_full"))
+        lines.append(metrics.sample("predictor_admission_rejected_total", st["rejected_timeout"], mode=mode, reason="timeout"))
+    pool = model_pool.POOL.stats()
+    lines += [
+        "# TYPE predictor_model_cache_hits_total counter",
+        metrics.sample("predictor_model_cache_hits_total", pool["hits"]),
+        "# TYPE predictor_model_loads_total counter",
+        metrics.sample("predictor_model_loads_total", pool["loads"]),
+        "# TYPE predictor_model_evictions_total counter",
+        metrics.sample("predictor_model_evictions_total", pool["evictions"]),
+        "# TYPE predictor_model_resident_bytes gauge",
+    ]
+    for m in pool["models"]:
+        lines.append(metrics.sample("predictor_model_resident_bytes", int(m["est_mb"] * 2**20), model=m["key"]))
+    lines.append("# TYPE predictor_circuit_open gauge")
+    for provider, state in http_client.breaker_states().items():
+        lines.append(metrics.sample("predictor_circuit_open", int(state != "closed"), provider=provider))
+    lines += ["# TYPE predictor_log_queue_depth gauge", metrics.sample("predictor_log_queue_depth", reqlog.queue_depth())]
+    lines += ["# TYPE predictor_feedback_queue_depth gauge",
+              metrics.sample("predictor_feedback_queue_depth", FEEDBACK_STORE.queue_depth())]
+    lines += ["# TYPE predictor_jobs gauge"]
+    for status, n in sorted(jobs.JOBS.stats()["jobs"].items()):
+        lines.append(metrics.sample("predictor_jobs", n, status=status))
+    cache = prediction_cache.CACHE.stats()
+    lines += [
+        "# TYPE predictor_prediction_cache_hits_total counter",
+        metrics.sample("predictor_prediction_cache_hits_total", cache["hits"]),
+        "# TYPE predictor_prediction_cache_misses_total counter",
+        metrics.sample("predictor_prediction_cache_misses_total", cache["misses"]),
+        "# TYPE predictor_prediction_cache_near_hits_total counter",
+        metrics.sample("predictor_prediction_cache_near_hits_total", cache["near_hits"]),
+        "# TYPE predictor_prediction_cache_entries gauge",
+        metrics.sample("predictor_prediction_cache_entries", cache["entries"]),
+    ]
+    shadows = shadow.SHADOW.stats()
+    lines += ["# TYPE predictor_shadow_samples_total counter"]
+    for pair, stats in sorted(shadows["pairs"].items()):
+        lines.append(metrics.sample("predictor_shadow_samples_total", stats["samples"], pair=pair))
+    lines += ["# TYPE predictor_shadow_agreement gauge"]
+    for pair, stats in sorted(shadows["pairs"].items()):
+        if stats["agreement"] is not None:
+            lines.append(metrics.sample("predictor_shadow_agreement", stats["agreement"], pair=pair))
+    lines += [
+        "# TYPE predictor_shadow_dropped_total counter",
+        metrics.sample("predictor_shadow_dropped_total", shadows["dropped"]),
+    ]
+    return lines
+
+
+metrics.register_collector(_collect_runtime)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    return {"admission": admission.snapshot()}
 
 
 @app.post("/feedback")
 async def feedback(body: FeedbackRequest):
-    # Append feedback as CSV, creating header if file is new
-    FEEDBACK_PATH.parent.mkdir(parents=True, exist_ok=True)
-    new_file = not FEEDBACK_PATH.exists()
-    import csv as _csv
-    with FEEDBACK_PATH.open('a', newline='', encoding='utf-8') as f:
-        writer = _csv.DictWriter(f, fieldnames=["summary","predicted","correct_label","notes"])
-        if new_file:
-            writer.writeheader()
-        writer.writerow({
-            "summary": body.summary,
-            "predicted": body.predicted,
-            "correct_label": body.correct_label or "",
-            "notes": body.notes or "",
-        })
+    # Queued for the batched SQLite writer; nothing touches the disk here
+    FEEDBACK_STORE.flush_s = max(0.001, float(CONFIG.get("feedback_flush_ms", 200)) / 1000)
+    FEEDBACK_STORE.batch = max(1, int(CONFIG.get("feedback_batch", 500)))
+    try:
+        mode = _resolve_mode(body.mode)
+        FEEDBACK_STORE.add(body.summary, body.predicted, body.correct_label or "", body.notes or "",
+                           mode=mode, model=body.model or _model_name(mode))
+    except feedback_store.Full:
+        raise HTTPException(status_code=503, detail="Feedback queue is full; retry shortly", headers={"Retry-After": "1"})
     return {"ok": True}
 
 
+def _model_name(mode: str) -> str:
+    if mode == "sklearn":
+        return str(MODEL_PATH)
+    key = {"hf": "hf_model_dir", "zeroshot": "zsh_model", "llm": "llm_model",
+           "gemini": "gemini_model", "hf_api": "hf_api_model"}.get(mode)
+    return str(CONFIG.get(key) or "") if key else ""
+
+
+@app.get("/feedback/analytics")
+async def feedback_report(mode: Optional[str] = None, top: int = 20):
+    """Per-mode accuracy, confusion per model, correction rate over 1h/24h/7d/30d and
+    the terms most often seen in corrected predictions, from running aggregates."""
+    await run_in_threadpool(FEEDBACK_STORE.flush)
+    return {"modes": await run_in_threadpool(FEEDBACK_STORE.analytics, mode, max(1, min(top, 200)))}
+
+
+@app.get("/feedback/stats")
+async def feedback_stats():
+    return await run_in_threadpool(FEEDBACK_STORE.stats)
+
+
+@app.get("/feedback/export")
+async def feedback_export():
+    """Labeled feedback as a summary,outcome CSV (the train_model.py format)."""
+    await run_in_threadpool(FEEDBACK_STORE.flush)
+    return StreamingResponse(
+        iterate_in_threadpool(feedback_store.export_csv_chunks(FEEDBACK_DB_PATH)),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="feedback_train.csv"'},
+    )
+
+
 # -------- Configuration Endpoints --------
 class ConfigUpdate(BaseModel):
     model_type: Optional[str] = None  # sklearn | hf | zeroshot | llm | gemini | hf_api
@@ -1228,25 +2175,68 @@ class ConfigUpdate(BaseModel):
     hf_api_model: Optional[str] = None
     hf_api_labels: Optional[List[str]] = None
     hf_api_max_tokens: Optional[int] = None
+    gemini_base_url: Optional[str] = None
+    hf_api_base_url: Optional[str] = None
+    gemini_timeout_s: Optional[float] = None
+    hf_api_timeout_s: Optional[float] = None
+    gemini_concurrency: Optional[int] = None
+    hf_api_concurrency: Optional[int] = None
+    http_max_retries: Optional[int] = None
+    http_backoff_s: Optional[float] = None
+    breaker_failures: Optional[int] = None
+    breaker_reset_s: Optional[float] = None
+    remote_fallback: Optional[str] = None
+    admission: Optional[Dict[str, Dict[str, float]]] = None
+    model_pool_max_mb: Optional[float] = None
+    model_idle_timeout_s: Optional[float] = None
+    weights_mmap: Optional[bool] = None
+    torch_threads: Optional[int] = None
+    torch_interop_threads: Optional[int] = None
+    cpu_affinity: Optional[bool] = None
+    request_log: Optional[bool] = None
+    request_log_sample_rate: Optional[float] = None
+    request_log_slow_ms: Optional[float] = None
+    request_log_max_per_s: Optional[float] = None
+    request_log_queue: Optional[int] = None
+    request_log_file: Optional[str] = None
+    prediction_cache_size: Optional[int] = None
+    prediction_cache_ttl_s: Optional[float] = None
+    near_dup_threshold: Optional[float] = None
+    explain_default: Optional[str] = None
+    hf_attribution: Optional[str] = None
+    jobs_workers: Optional[int] = None
+    jobs_max: Optional[int] = None
+    jobs_max_items: Optional[int] = None
+    jobs_batch_size: Optional[int] = None
+    jobs_reserved_slots: Optional[int] = None
+    feedback_flush_ms: Optional[float] = None
+    feedback_batch: Optional[int] = None
+    similar_refresh_s: Optional[float] = None
+    shadow_mode: Optional[str] = None
+    shadow_config: Optional[dict] = None
+    shadow_sample_rate: Optional[float] = None
+    shadow_concurrency: Optional[int] = None
+    config_watch_s: Optional[float] = None
+    compress_min_bytes: Optional[int] = None
+    gzip_level: Optional[int] = None
+    brotli_quality: Optional[int] = None
     debug_errors: Optional[bool] = None
 
 
 @app.get("/config")
 async def get_config():
-    # Reload in case file changed on disk
+    # A stat, not a parse, unless the file changed on disk
     _load_config()
-    return {"config": CONFIG}
+    return {"config": CONFIG_STORE.current().to_dict()}
 
 
 @app.put("/config")
 async def update_config(body: ConfigUpdate):
     data = body.dict(exclude_none=True)
     if not data:
-        return {"ok": True, "config": CONFIG}
-    # Update in-memory config
-    CONFIG.update(data)
-    # Persist
-    _save_config()
+        return {"ok": True, "config": CONFIG.to_dict()}
+    # Publish a new snapshot and persist it (atomic replace of config.json)
+    snapshot = CONFIG.update(data)
     # Reset any loaded models so next request uses new settings
     _reset_models()
-    return {"ok": True, "config": CONFIG}
+    return {"ok": True, "config": snapshot.to_dict()}
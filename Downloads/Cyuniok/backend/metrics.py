@@ -0,0 +1,134 @@
+from __future__ import annotations
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# In-process latency histograms and counters, rendered in the Prometheus text
+# format by GET /metrics. An observation is a lock plus a bisect (about a
+# microsecond), cheap enough to leave on in production.
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+# (metric, labels) -> [bucket counts..., +Inf count], sum
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[Any]] = {}
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+_collectors: List[Callable[[], List[str]]] = []
+
+# Per-request scratch space (mode, stage timings, ...) set up by the HTTP
+# middleware; stages observed inside a request are also summed here.
+_request_ctx: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("request_ctx", default=None)
+
+
+def _key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(metric: str, seconds: float, **labels: str) -> None:
+    key = (metric, _key(labels))
+    idx = bisect_left(BUCKETS, seconds)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+        h[0][idx] += 1
+        h[1] += seconds
+
+
+def inc(metric: str, value: float = 1.0, **labels: str) -> None:
+    key = (metric, _key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def record_stage(stage: str, mode: str, seconds: float) -> None:
+    observe("predictor_stage_seconds", seconds, mode=mode, stage=stage)
+    ctx = _request_ctx.get()
+    if ctx is not None:
+        stages = ctx.setdefault("stages", {})
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str, mode: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, mode, time.perf_counter() - start)
+
+
+def begin_request(**fields: Any) -> Dict[str, Any]:
+    ctx: Dict[str, Any] = dict(fields)
+    _request_ctx.set(ctx)
+    return ctx
+
+
+def request_context() -> Optional[Dict[str, Any]]:
+    return _request_ctx.get()
+
+
+def annotate(**fields: Any) -> None:
+    ctx = _request_ctx.get()
+    if ctx is not None:
+        ctx.update(fields)
+
+
+def register_collector(fn: Callable[[], List[str]]) -> None:
+    """`fn` returns extra exposition lines (gauges read at scrape time)."""
+    _collectors.append(fn)
+
+
+def _fmt_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def sample(metric: str, value: float, **labels: str) -> str:
+    return f"{metric}{_fmt_labels(_key(labels))} {value}"
+
+
+def render() -> str:
+    with _lock:
+        hists = {k: ([*v[0]], v[1]) for k, v in _histograms.items()}
+        counters = dict(_counters)
+    lines: List[str] = []
+    seen_types = set()
+    for (metric, labels), (counts, total) in sorted(hists.items()):
+        if metric not in seen_types:
+            lines.append(f"# TYPE {metric} histogram")
+            seen_types.add(metric)
+        cumulative = 0
+        for bound, n in zip(BUCKETS, counts):
+            cumulative += n
+            lines.append(f"{metric}_bucket{_fmt_labels(labels, (('le', repr(bound)),))} {cumulative}")
+        cumulative += counts[-1]
+        lines.append(f"{metric}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {cumulative}")
+        lines.append(f"{metric}_sum{_fmt_labels(labels)} {total:.6f}")
+        lines.append(f"{metric}_count{_fmt_labels(labels)} {cumulative}")
+    for (metric, labels), value in sorted(counters.items()):
+        if metric not in seen_types:
+            lines.append(f"# TYPE {metric} counter")
+            seen_types.add(metric)
+        lines.append(f"{metric}{_fmt_labels(labels)} {value:g}")
+    for fn in _collectors:
+        try:
+            lines.extend(fn())
+        except Exception as e:  # a broken collector must not break the scrape
+            lines.append(f"# collector {getattr(fn, '__name__', fn)} failed: {e}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Keeps several inference backends resident at once under a RAM budget.
+# Entries are evicted least-recently-used first when the budget is exceeded,
+# and after `idle_timeout_s` without use. A model evicted while a request is
+# still using it stays alive (by reference) until that request finishes.
+# Pinned entries (preloaded in a forking master) are never evicted, so
+# workers keep sharing them instead of reloading private copies.
+
+
+def estimate_bytes(obj: Any) -> int:
+    """Rough resident size of a loaded backend (torch weights or pickled size)."""
+    if obj is None:
+        return 0
+    if isinstance(obj, (tuple, list)):
+        return sum(estimate_bytes(o) for o in obj)
+    if hasattr(obj, "resident_bytes"):  # objects that know their own footprint
+        return int(obj.resident_bytes())
+    model = getattr(obj, "model", None)  # transformers pipelines wrap a model
+    if model is not None and hasattr(model, "parameters"):
+        obj = model
+    if hasattr(obj, "parameters") and hasattr(obj, "buffers"):
+        try:
+            tensors = list(obj.parameters()) + list(obj.buffers())
+            return int(sum(t.numel() * t.element_size() for t in tensors))
+        except Exception:
+            return 0
+    if hasattr(obj, "vocab_size") and not hasattr(obj, "predict"):
+        # Tokenizers: small next to their models; avoid pickling fast tokenizers
+        return 0
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class _Entry:
+    __slots__ = ("key", "value", "est_bytes", "loaded_at", "last_used", "hits", "load_s", "pinned")
+
+    def __init__(self, key: str, value: Any, est_bytes: int, load_s: float):
+        now = time.monotonic()
+        self.key = key
+        self.value = value
+        self.est_bytes = est_bytes
+        self.loaded_at = now
+        self.last_used = now
+        self.hits = 0
+        self.load_s = load_s
+        self.pinned = False
+
+
+class ModelPool:
+    def __init__(self, max_bytes: int = 0, idle_timeout_s: float = 0):
+        self.max_bytes = int(max_bytes)  # 0 = unbounded
+        self.idle_timeout_s = float(idle_timeout_s)  # 0 = never idle out
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def configure(self, max_bytes: int, idle_timeout_s: float) -> None:
+        self.max_bytes = int(max_bytes)
+        self.idle_timeout_s = float(idle_timeout_s)
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the resident backend for `key`, loading it (once) if needed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                entry.hits += 1
+                self.hits += 1
+                return entry.value
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        # Load outside the pool lock so other backends keep serving; the
+        # per-key lock makes concurrent first requests share one load.
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.last_used = time.monotonic()
+                    entry.hits += 1
+                    self.hits += 1
+                    return entry.value
+            start = time.perf_counter()
+            value = loader()
+            load_s = time.perf_counter() - start
+            est = estimate_bytes(value)
+            with self._lock:
+                self._entries[key] = _Entry(key, value, est, load_s)
+                self.loads += 1
+                self._evict_locked(keep=key)
+            return value
+
+    def sweep(self) -> List[str]:
+        """Drop entries idle for longer than idle_timeout_s."""
+        with self._lock:
+            return self._evict_locked(keep=None)
+
+    def pin_all(self) -> List[str]:
+        with self._lock:
+            for e in self._entries.values():
+                e.pinned = True
+            return list(self._entries)
+
+    def values(self) -> List[Any]:
+        with self._lock:
+            return [e.value for e in self._entries.values()]
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.evictions += 1
+
+    def clear(self, keep_pinned: bool = False) -> None:
+        with self._lock:
+            if keep_pinned:
+                self._entries = {k: e for k, e in self._entries.items() if e.pinned}
+            else:
+                self._entries.clear()
+
+    def _evict_locked(self, keep: Optional[str]) -> List[str]:
+        evicted: List[str] = []
+        now = time.monotonic()
+        if self.idle_timeout_s > 0:
+            for key, e in list(self._entries.items()):
+                if key != keep and not e.pinned and now - e.last_used > self.idle_timeout_s:
+                    del self._entries[key]
+                    evicted.append(key)
+        if self.max_bytes > 0:
+            by_age = sorted(self._entries.values(), key=lambda e: e.last_used)
+            total = sum(e.est_bytes for e in by_age)
+            for e in by_age:
+                if total <= self.max_bytes:
+                    break
+                if e.key == keep or e.pinned:
+                    continue
+                del self._entries[e.key]
+                total -= e.est_bytes
+                evicted.append(e.key)
+            if total > self.max_bytes and keep in self._entries:
+                print(f"[WARN] model '{keep}' (~{total / 2**20:.0f} MB) exceeds model_pool_max_mb on its own")
+        self.evictions += len(evicted)
+        for key in evicted:
+            print(f"[POOL] evicted {key}")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            models = [
+                {
+                    "key": e.key,
+                    "est_mb": round(e.est_bytes / 2**20, 2),
+                    "idle_s": round(now - e.last_used, 1),
+                    "age_s": round(now - e.loaded_at, 1),
+                    "hits": e.hits,
+                    "load_s": round(e.load_s, 3),
+                    "pinned": e.pinned,
+                }
+                for e in sorted(self._entries.values(), key=lambda e: e.last_used, reverse=True)
+            ]
+            return {
+                "max_mb": round(self.max_bytes / 2**20, 2) if self.max_bytes else None,
+                "idle_timeout_s": self.idle_timeout_s or None,
+                "resident_mb": round(sum(e.est_bytes for e in self._entries.values()) / 2**20, 2),
+                "models": models,
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+            }
+
+
+POOL = ModelPool()
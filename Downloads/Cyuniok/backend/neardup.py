@@ -0,0 +1,230 @@
+from __future__ import annotations
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+if TYPE_CHECKING:  # imported lazily, on first signature
+    import numpy as np
+
+# Near-duplicate detection: shingling + MinHash + LSH banding.
+#
+# Text is normalised (case, punctuation, whitespace) and cut into overlapping
+# word bigrams, so two summaries that differ only by a name or a few words
+# still share most of their shingles. A MinHash signature of
+# `num_perm` values estimates the Jaccard similarity of two shingle sets as
+# the fraction of positions where the signatures agree. LSH splits the
+# signature into `bands` of `rows` values; texts that agree on a whole band
+# land in the same bucket, so a lookup only compares against the few texts
+# that share a bucket with it instead of against every indexed text.
+# Candidates are then checked against the threshold on the full signature.
+#
+# Used by the prediction cache (near-duplicate hits) and by both trainers
+# (corpus dedup before the train/validation split).
+
+NUM_PERM = 128
+_WORD = re.compile(r"[^\W_]+")
+_MIX = 0x9E3779B97F4A7C15  # odd 64-bit constant that spreads the first word of a pair
+
+
+@lru_cache(maxsize=8)
+def _permutations(num_perm: int, seed: int):
+    # Multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits, a odd.
+    # Wrapping uint64 arithmetic avoids a per-value modulo.
+    import numpy as np
+    rng = np.random.RandomState(seed)
+    a = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def _word_hashes(text: str, vocab: Dict[str, int]) -> List[int]:
+    """crc32 of each word (memoised in `vocab`); a short text is one shingle."""
+    words = _WORD.findall(text.lower())
+    hashes = [vocab[w] if w in vocab else vocab.setdefault(w, zlib.crc32(w.encode("utf-8"))) for w in words]
+    if len(hashes) < 2:
+        hashes += [0] * (2 - len(hashes))
+    return hashes
+
+
+def _shingle_block(block: Sequence[List[int]]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Word-bigram hashes of a block of texts' word hashes, concatenated, and where each text starts.
+
+    The bigrams are formed for the whole block at once.
+    """
+    import numpy as np
+    counts = [len(h) - 1 for h in block]
+    words = np.fromiter((w for h in block for w in h), dtype=np.uint64, count=sum(counts) + len(block))
+    pairs = words[:-1] * np.uint64(_MIX) ^ words[1:]
+    # Drop the pairs that straddle two texts: one after each text's last word
+    ends = np.cumsum(np.array(counts, dtype=np.int64) + 1)[:-1] - 1
+    keep = np.ones(len(pairs), dtype=bool)
+    keep[ends] = False
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    return pairs[keep], offsets
+
+
+def _minhash_block(block: Sequence[List[int]], a: "np.ndarray", b: "np.ndarray", out: "np.ndarray",
+                   max_pairs: int) -> None:
+    import numpy as np
+    hashes, offsets = _shingle_block(block)
+    # The permuted block is (permutations x pairs) uint64, the big temporary:
+    # a text longer than max_pairs is permuted a few permutations at a time
+    step = max(1, (max_pairs * len(a)) // max(1, len(hashes)))
+    for p in range(0, len(a), step):
+        permuted = a[p:p + step] * hashes  # in place from here
+        permuted += b[p:p + step]
+        permuted >>= np.uint64(32)
+        out[:, p:p + step] = np.minimum.reduceat(permuted, offsets, axis=1).T
+
+
+def signatures(texts: Sequence[str], num_perm: int = NUM_PERM, seed: int = 1,
+               max_pairs: int = 1 << 16) -> "np.ndarray":
+    """(len(texts), num_perm) uint32 MinHash signatures of the texts' word bigrams.
+
+    Texts are processed in blocks of about `max_pairs` shingles: the shingles
+    of a whole block are permuted at once and reduced per text, so the
+    temporary stays near num_perm * max_pairs * 8 bytes (64 MB by default)
+    whatever the text lengths.
+    """
+    import numpy as np
+    a, b = _permutations(num_perm, seed)
+    out = np.empty((len(texts), num_perm), dtype=np.uint32)
+    vocab: Dict[str, int] = {}
+    block: List[List[int]] = []
+    start = pairs = 0
+    for i, text in enumerate(texts):
+        hashes = _word_hashes(text, vocab)
+        block.append(hashes)
+        pairs += len(hashes) - 1
+        if pairs >= max_pairs or i == len(texts) - 1:
+            _minhash_block(block, a, b, out[start:start + len(block)], max_pairs)
+            start += len(block)
+            block, pairs = [], 0
+    return out
+
+
+def signature(text: str, num_perm: int = NUM_PERM, seed: int = 1) -> "np.ndarray":
+    return signatures([text], num_perm, seed)[0]
+
+
+def similarity(sig_a: "np.ndarray", sig_b: "np.ndarray") -> float:
+    """Estimated Jaccard similarity of the two texts' shingle sets."""
+    return float((sig_a == sig_b).mean())
+
+
+@lru_cache(maxsize=64)
+def bands_for(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """(bands, rows) minimising the false positive + false negative mass.
+
+    A pair with similarity s collides in some band with probability
+    1 - (1 - s^rows)^bands. False negatives weigh more: a missed duplicate is
+    not recovered, while a false candidate is only a rejected comparison.
+    """
+    steps = 200
+
+    def mass(lo: float, hi: float, f) -> float:
+        width = (hi - lo) / steps
+        return sum(f(lo + (i + 0.5) * width) for i in range(steps)) * width
+
+    best, best_cost = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        fp = mass(0.0, threshold, lambda s: 1 - (1 - s ** rows) ** bands)
+        fn = mass(threshold, 1.0, lambda s: (1 - s ** rows) ** bands)
+        cost = 0.1 * fp + 0.9 * fn
+        if cost < best_cost:
+            best, best_cost = (bands, rows), cost
+    return best
+
+
+class LSHIndex:
+    """Keys indexed by MinHash signature; `capacity` > 0 drops the oldest keys."""
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = NUM_PERM, capacity: int = 0):
+        self.threshold = float(threshold)
+        self.num_perm = num_perm
+        self.bands, self.rows = bands_for(round(self.threshold, 3), num_perm)
+        self.capacity = int(capacity)
+        self._sigs: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(self.bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def _band_keys(self, sig: "np.ndarray") -> List[bytes]:
+        r = self.rows
+        return [sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def add(self, key: Hashable, sig: "np.ndarray") -> None:
+        with self._lock:
+            if key in self._sigs:
+                self._remove_locked(key)
+            self._sigs[key] = sig
+            for buckets, band in zip(self._buckets, self._band_keys(sig)):
+                buckets.setdefault(band, set()).add(key)
+            while self.capacity > 0 and len(self._sigs) > self.capacity:
+                self._remove_locked(next(iter(self._sigs)))
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._sigs:
+                self._remove_locked(key)
+
+    def _remove_locked(self, key: Hashable) -> None:
+        sig = self._sigs.pop(key)
+        for buckets, band in zip(self._buckets, self._band_keys(sig)):
+            members = buckets.get(band)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del buckets[band]
+
+    def query(self, sig: "np.ndarray", threshold: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """(key, similarity) at or above the threshold, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidates: Set[Hashable] = set()
+            for buckets, band in zip(self._buckets, self._band_keys(sig)):
+                members = buckets.get(band)
+                if members:
+                    candidates.update(members)
+            scored = [(key, similarity(sig, self._sigs[key])) for key in candidates]
+        hits = [(key, score) for key, score in scored if score >= threshold]
+        hits.sort(key=lambda kv: -kv[1])
+        return hits
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sigs.clear()
+            self._buckets = [{} for _ in range(self.bands)]
+
+
+def dedupe(texts: Sequence[str], threshold: float = 0.8, num_perm: int = NUM_PERM) -> List[int]:
+    """Indices of the texts to keep: the first of each group of near-duplicates.
+
+    One signature pass and one LSH lookup per text, so the cost is linear in
+    the corpus size plus the (small) number of candidate pairs.
+    """
+    if not texts:
+        return []
+    sigs = signatures(texts, num_perm)
+    index = LSHIndex(threshold, num_perm)
+    kept: List[int] = []
+    for i, sig in enumerate(sigs):
+        if index.query(sig):
+            continue
+        index.add(i, sig)
+        kept.append(i)
+    return kept
+
+
+def dedupe_rows(rows: Sequence[Tuple[str, str]], threshold: float = 0.8) -> List[Tuple[str, str]]:
+    """(summary, outcome) rows without near-duplicate summaries; the first one wins."""
+    if threshold <= 0:
+        return list(rows)
+    kept = dedupe([s for s, _ in rows], threshold)
+    return [rows[i] for i in kept]
@@ -0,0 +1,169 @@
+from __future__ import annotations
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from . import neardup
+
+# LRU + TTL cache of finished predictions, keyed by mode, the config that
+# shapes that mode's output, and the exact input text. Entries remember how
+# much explanation was computed ("none" < "features" < "full") so a cheaper
+# request can be served from a richer entry, and a deferred reason can be
+# filled in later under the same id.
+#
+# With a near-duplicate threshold set, entries are also indexed by MinHash
+# signature (backend.neardup) per scope, i.e. per mode and mode config, so a
+# text that differs from a cached one only by a name or a few words can be
+# served the cached result.
+
+LEVELS = ("none", "features", "full")
+
+
+def level_rank(level: str) -> int:
+    return LEVELS.index(level)
+
+
+def make_key(mode: str, identity: Any, text: str) -> str:
+    raw = json.dumps([mode, identity], sort_keys=True, default=str) + "\x00" + text
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class Entry:
+    __slots__ = ("key", "mode", "text", "result", "level", "created", "scope")
+
+    def __init__(self, key: str, mode: str, text: str, result: Dict[str, Any], level: str,
+                 scope: Optional[str] = None):
+        self.key = key
+        self.mode = mode
+        self.text = text
+        self.result = result
+        self.level = level
+        self.created = time.monotonic()
+        self.scope = scope
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 4096, ttl_s: float = 3600):
+        self.max_entries = int(max_entries)  # 0 = disabled
+        self.ttl_s = float(ttl_s)  # 0 = no expiry
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self.near_threshold = 0.0  # 0 = exact matches only
+        self._near: Dict[str, neardup.LSHIndex] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.near_hits = 0
+
+    def configure(self, max_entries: int, ttl_s: float, near_threshold: float = 0.0) -> None:
+        with self._lock:
+            self.max_entries = int(max_entries)
+            self.ttl_s = float(ttl_s)
+            if float(near_threshold) != self.near_threshold:
+                # Banding depends on the threshold; entries cached from now on are indexed
+                self.near_threshold = float(near_threshold)
+                self._near = {}
+            self._trim_locked()
+
+    def _expired(self, entry: Entry) -> bool:
+        return self.ttl_s > 0 and time.monotonic() - entry.created > self.ttl_s
+
+    def _drop_locked(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        index = self._near.get(entry.scope) if entry.scope else None
+        if index is not None:
+            index.remove(key)
+
+    def get(self, key: str, level: str = "none") -> Optional[Entry]:
+        """Entry for `key` if present, fresh and explained at least to `level`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._drop_locked(key)
+                entry = None
+            if entry is None or level_rank(entry.level) < level_rank(level):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def peek(self, key: str) -> Optional[Entry]:
+        """Like get() at any level, without touching hit/miss counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._drop_locked(key)
+                return None
+            return entry
+
+    def get_near(self, scope: str, text: str, level: str = "none") -> Optional[Entry]:
+        """Most similar entry in `scope` at or above the near-duplicate threshold.
+
+        Meant for exact misses; does not count towards hits/misses.
+        """
+        threshold, index = self.near_threshold, self._near.get(scope)
+        if threshold <= 0 or index is None or not len(index):
+            return None
+        for key, _ in index.query(neardup.signature(text)):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or self._expired(entry) or level_rank(entry.level) < level_rank(level):
+                    continue
+                self._entries.move_to_end(key)
+                self.near_hits += 1
+                return entry
+        return None
+
+    def put(self, key: str, mode: str, text: str, result: Dict[str, Any], level: str,
+            scope: Optional[str] = None) -> Entry:
+        threshold = self.near_threshold
+        if scope is None:
+            # An upgrade (e.g. /predict/reason) keeps the entry's scope, so it
+            # stays findable and eviction still removes it from that index
+            with self._lock:
+                existing = self._entries.get(key)
+                scope = existing.scope if existing is not None else None
+        # Signed outside the lock; only a scoped put is findable by get_near()
+        sig = neardup.signature(text) if scope and threshold > 0 and self.max_entries > 0 else None
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and level_rank(existing.level) > level_rank(level):
+                return existing  # never downgrade a richer entry
+            entry = Entry(key, mode, text, result, level, scope)
+            if self.max_entries > 0:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                if sig is not None and threshold == self.near_threshold:
+                    index = self._near.get(scope)
+                    if index is None:
+                        index = self._near[scope] = neardup.LSHIndex(threshold)
+                    index.add(key, sig)
+                self._trim_locked()
+            return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._near = {}
+
+    def _trim_locked(self) -> None:
+        while len(self._entries) > max(0, self.max_entries):
+            self._drop_locked(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s or None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "near_threshold": self.near_threshold or None,
+                "near_hits": self.near_hits,
+            }
+
+
+CACHE = PredictionCache()
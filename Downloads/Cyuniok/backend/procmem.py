@@ -0,0 +1,32 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+# Per-process memory breakdown from /proc (Linux). USS (private pages) is the
+# number that proves copy-on-write sharing works: it is what each extra
+# worker really costs, while RSS double-counts pages shared with the master.
+
+
+def memory_info(pid: Optional[int] = None) -> Dict[str, object]:
+    pid = pid or os.getpid()
+    out: Dict[str, object] = {"pid": pid}
+    rollup = Path(f"/proc/{pid}/smaps_rollup")
+    try:
+        fields: Dict[str, int] = {}
+        for line in rollup.read_text().splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        out["error"] = "per-process memory breakdown needs Linux /proc"
+        return out
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    out.update({
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+        "uss_mb": round(private / 1024, 1),
+        "shared_mb": round(shared / 1024, 1),
+    })
+    return out
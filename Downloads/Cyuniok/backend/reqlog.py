@@ -0,0 +1,168 @@
+from __future__ import annotations
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from . import metrics
+
+# Structured request logs, one JSON object per line. The request path only
+# decides whether to keep the record (sampling + rate limit) and does a
+# non-blocking put on a bounded queue; a QueueListener thread serializes the
+# record (including any traceback) and writes it to the sink. A slow stdout
+# or log file therefore never stalls the event loop: when the queue is full
+# the record is dropped and counted instead of waiting.
+#
+# Errors and slow requests bypass sampling but not the rate limit, which
+# protects the sink during an error storm.
+
+_logger = logging.getLogger("predictor.requests")
+_logger.propagate = False
+_logger.setLevel(logging.INFO)
+
+_lock = threading.Lock()
+_handler: Optional[logging.Handler] = None
+_listener: Optional[_Listener] = None
+_sink_settings: Optional[tuple] = None
+_pid: Optional[int] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {"ts": round(record.created, 3), "level": record.levelname.lower()}
+        out.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            out["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(out, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            metrics.inc("predictor_log_records_total", outcome="queued")
+        except queue.Full:
+            metrics.inc("predictor_log_records_total", outcome="dropped")
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue is in-process, so skip QueueHandler's eager formatting:
+        # JSON encoding and traceback rendering happen on the listener thread.
+        return record
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Blocking put: the queue may be full, and the thread is draining it
+        self.queue.put(self._sentinel)
+
+
+class _RateLimiter:
+    """Token bucket allowing `rate` records per second with a one-second burst."""
+
+    def __init__(self, rate: float):
+        self.rate = float(rate)
+        self._tokens = self.rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+_limiter = _RateLimiter(0)
+
+
+def _sink(path: str) -> logging.Handler:
+    if path:
+        return logging.FileHandler(path, encoding="utf-8")
+    return logging.StreamHandler(sys.stdout)
+
+
+def _stop_listener() -> None:
+    if _listener is not None and _pid == os.getpid():
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+
+
+def _ensure(config: Dict[str, Any]) -> None:
+    """(Re)start the listener when the sink settings change or after a fork."""
+    global _handler, _listener, _sink_settings, _pid, _limiter
+    rate = float(config.get("request_log_max_per_s") or 0)
+    if _limiter.rate != rate:
+        _limiter = _RateLimiter(rate)
+    settings = (int(config.get("request_log_queue") or 10000), str(config.get("request_log_file") or ""))
+    if settings == _sink_settings and _pid == os.getpid():
+        return
+    with _lock:
+        if settings == _sink_settings and _pid == os.getpid():
+            return
+        _stop_listener()
+        if _handler is not None:
+            _logger.removeHandler(_handler)
+        sink = _sink(settings[1])
+        sink.setFormatter(JsonFormatter())
+        q: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max(1, settings[0]))
+        _handler = _DroppingQueueHandler(q)
+        _listener = _Listener(q, sink)
+        _listener.start()
+        _logger.addHandler(_handler)
+        _sink_settings = settings
+        _pid = os.getpid()
+
+
+def _keep(config: Dict[str, Any], status: int, ms: float, failed: bool) -> bool:
+    slow_ms = float(config.get("request_log_slow_ms") or 0)
+    important = failed or status >= 500 or (slow_ms > 0 and ms >= slow_ms)
+    rate = config.get("request_log_sample_rate")
+    rate = 1.0 if rate is None else float(rate)
+    if not important and rate < 1.0 and random.random() >= rate:
+        metrics.inc("predictor_log_records_total", outcome="sampled_out")
+        return False
+    if not _limiter.allow():
+        metrics.inc("predictor_log_records_total", outcome="rate_limited")
+        return False
+    return True
+
+
+def log_request(config: Dict[str, Any], fields: Dict[str, Any], exc: Optional[BaseException] = None) -> None:
+    """Queue one request record; never blocks and never raises."""
+    try:
+        if config.get("request_log") is False:
+            return
+        _ensure(config)
+        if not _keep(config, int(fields.get("status") or 0), float(fields.get("ms") or 0), exc is not None):
+            return
+        level = logging.ERROR if exc is not None or int(fields.get("status") or 0) >= 500 else logging.INFO
+        exc_info = (type(exc), exc, exc.__traceback__) if exc is not None else None
+        _logger.log(level, "request", extra={"fields": fields}, exc_info=exc_info)
+    except Exception:
+        pass
+
+
+def queue_depth() -> int:
+    return _handler.queue.qsize() if isinstance(_handler, logging.handlers.QueueHandler) else 0
+
+
+def close() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener, _sink_settings
+    with _lock:
+        _stop_listener()
+        _listener = None
+        _sink_settings = None
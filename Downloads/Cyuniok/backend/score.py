@@ -0,0 +1,295 @@
+"""Offline bulk scoring of a CSV with the server's local backends.
+
+    python -m backend.score cases.csv predictions.csv --mode sklearn --workers 4
+    python -m backend.score cases.csv out_parquet/ --format parquet --mode hf
+
+The input is read in chunks of --chunk-size rows and never held in memory as
+a whole. sklearn, zeroshot and llm chunks are spread over a process pool.
+The pool is forked after the model is loaded, so workers share its weights
+copy-on-write. At most two chunks per worker are in flight. hf runs in this
+process on one model, in padded batches of --batch-size sorted by length.
+Results are written in input order as each chunk finishes.
+
+After every chunk a checkpoint (<output>.ckpt.json) records how many input
+rows are done and how far the output got. Re-running the same command
+resumes from there:
+- CSV output is truncated back to the checkpointed size;
+- Parquet output is a directory of part files, one per chunk, and any part
+  newer than the checkpoint is rewritten.
+Parquet needs pyarrow.
+"""
+from __future__ import annotations
+import argparse
+import csv
+import io
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+LOCAL_MODES = ("sklearn", "hf", "zeroshot", "llm")
+POOLED_MODES = ("sklearn", "zeroshot", "llm")
+
+_mode = "sklearn"
+_explain = "none"
+
+
+def _columns(explain: str) -> List[str]:
+    cols = ["id", "prediction", "confidence"]
+    if explain != "none":
+        cols.append("top_features")
+    if explain == "full":
+        cols.append("reason")
+    return cols + ["error"]
+
+
+def _row(row_id: str, pred: str, conf: float, feats: Optional[List[str]], reason: Optional[str],
+         error: str, explain: str) -> List[Any]:
+    out: List[Any] = [row_id, pred, round(float(conf), 4)]
+    if explain != "none":
+        out.append(";".join(feats or []))
+    if explain == "full":
+        out.append(reason or "")
+    return out + [error]
+
+
+def _init_worker(mode: str, explain: str, threads: int) -> None:
+    global _mode, _explain
+    _mode, _explain = mode, explain
+    from backend import main
+    main._ensure_model_loaded(mode)  # no-op when inherited from the parent
+    if threads and "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+
+def score_chunk(rows: List[Tuple[str, str]], mode: Optional[str] = None,
+                explain: Optional[str] = None, batch_size: int = 32) -> List[List[Any]]:
+    """Score (id, text) pairs with one backend; one output row per input row."""
+    from backend import main
+    mode, explain = mode or _mode, explain or _explain
+    texts = [text.strip() for _, text in rows]
+    out: List[List[Any]] = [_row(rid, "", 0.0, None, None, "", explain) for rid, _ in rows]
+    if mode == "sklearn":
+        for i, item in enumerate(main._predict_batch_items(texts, explain)):
+            out[i] = _row(rows[i][0], item.prediction, item.confidence, item.top_features, item.reason, "", explain)
+        return out
+    todo = [i for i, t in enumerate(texts) if t]
+    if mode == "hf" and explain == "none":
+        # Similar lengths together keep padding small
+        todo.sort(key=lambda i: len(texts[i]))
+        for start in range(0, len(todo), max(1, batch_size)):
+            part = todo[start:start + batch_size]
+            try:
+                preds = main._predict_hf_batch([texts[i] for i in part])
+            except Exception as e:
+                for i in part:
+                    out[i][-1] = f"{type(e).__name__}: {e}"
+                continue
+            for i, (pred, conf) in zip(part, preds):
+                out[i] = _row(rows[i][0], pred, conf, None, None, "", explain)
+        return out
+    predict = {"hf": main._predict_hf, "zeroshot": main._predict_zeroshot, "llm": main._predict_llm}[mode]
+    for i in todo:
+        try:
+            r = predict(texts[i], explain)
+            out[i] = _row(rows[i][0], r.prediction, r.confidence, r.top_features, r.reason, "", explain)
+        except Exception as e:  # one bad row must not fail the chunk
+            out[i][-1] = f"{type(e).__name__}: {getattr(e, 'detail', e)}"
+    return out
+
+
+# -------- input --------
+def _chunks(path: Path, text_col: str, id_col: Optional[str], size: int, skip: int,
+            progress: Dict[str, int]) -> Iterator[List[Tuple[str, str]]]:
+    with open(path, "rb") as raw:
+        progress["bytes_total"] = os.fstat(raw.fileno()).st_size
+        reader = csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+        if reader.fieldnames is None or text_col not in reader.fieldnames:
+            raise SystemExit(f"[score] column '{text_col}' not found in {path} (have: {reader.fieldnames})")
+        if id_col and id_col not in reader.fieldnames:
+            raise SystemExit(f"[score] id column '{id_col}' not found in {path}")
+        chunk: List[Tuple[str, str]] = []
+        for n, rec in enumerate(reader):
+            if n < skip:
+                continue
+            chunk.append((rec[id_col] if id_col else str(n), rec[text_col] or ""))
+            if len(chunk) >= size:
+                progress["bytes_read"] = raw.tell()
+                yield chunk
+                chunk = []
+        progress["bytes_read"] = progress["bytes_total"]
+        if chunk:
+            yield chunk
+
+
+# -------- output --------
+class CsvSink:
+    def __init__(self, path: Path, columns: List[str], resume_bytes: Optional[int]):
+        self.path = path
+        fresh = resume_bytes is None or not path.exists()
+        self._f = open(path, "w" if fresh else "r+", encoding="utf-8", newline="")
+        if fresh:
+            csv.writer(self._f).writerow(columns)
+        else:
+            self._f.seek(resume_bytes)
+            self._f.truncate()
+        self._w = csv.writer(self._f)
+
+    def write(self, rows: List[List[Any]]) -> Dict[str, Any]:
+        self._w.writerows(rows)
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        return {"output_bytes": self._f.tell()}
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class ParquetSink:
+    def __init__(self, path: Path, columns: List[str], resume_part: Optional[int]):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError as e:
+            raise SystemExit("[score] Parquet output requires 'pyarrow'. Install it or write CSV.") from e
+        self.path = path
+        self.columns = columns
+        self.part = resume_part or 0
+        path.mkdir(parents=True, exist_ok=True)
+        for stale in path.glob("part-*.parquet"):
+            if int(stale.stem.split("-")[1]) >= self.part:
+                stale.unlink()
+
+    def write(self, rows: List[List[Any]]) -> Dict[str, Any]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.table({c: [r[i] for r in rows] for i, c in enumerate(self.columns)})
+        target = self.path / f"part-{self.part:05d}.parquet"
+        tmp = target.with_suffix(".tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, target)
+        self.part += 1
+        return {"output_part": self.part}
+
+    def close(self) -> None:
+        pass
+
+
+# -------- checkpoint --------
+def _fingerprint(path: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    st = path.stat()
+    return {"input": str(path.resolve()), "size": st.st_size, "mtime": int(st.st_mtime), "mode": args.mode,
+            "explain": args.explain, "text_column": args.text_column, "id_column": args.id_column,
+            "format": args.format}
+
+
+def _load_checkpoint(ckpt: Path, fingerprint: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not ckpt.exists():
+        return None
+    state = json.loads(ckpt.read_text(encoding="utf-8"))
+    if state.get("fingerprint") != fingerprint:
+        raise SystemExit(f"[score] {ckpt} belongs to a different input or settings; remove it or use --restart")
+    return state
+
+
+def _save_checkpoint(ckpt: Path, state: Dict[str, Any]) -> None:
+    tmp = ckpt.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, ckpt)
+
+
+# -------- driver --------
+def _report(done: int, started: float, progress: Dict[str, int], final: bool = False) -> None:
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    total = progress.get("bytes_total") or 0
+    pct = f" {100.0 * progress.get('bytes_read', 0) / total:5.1f}%" if total else ""
+    end = "\n" if final else "\r"
+    print(f"[score] {done} rows{pct}  {done / elapsed:,.0f} rows/s  {elapsed:,.1f}s", end=end, file=sys.stderr, flush=True)
+
+
+def run(args: argparse.Namespace) -> int:
+    from backend import main
+    mode = (args.mode or main.CONFIG.get("model_type") or "sklearn").lower()
+    args.mode = mode
+    if mode not in LOCAL_MODES:
+        print(f"[score] mode '{mode}' calls a remote API; use one of {', '.join(LOCAL_MODES)}", file=sys.stderr)
+        return 2
+    src, dst = Path(args.input), Path(args.output)
+    args.format = args.format or ("parquet" if dst.suffix == ".parquet" or args.output.endswith("/") else "csv")
+    ckpt = Path(str(dst).rstrip("/") + ".ckpt.json")
+    fingerprint = _fingerprint(src, args)
+    if args.restart and ckpt.exists():
+        ckpt.unlink()
+    state = _load_checkpoint(ckpt, fingerprint) or {"fingerprint": fingerprint, "rows_done": 0}
+    resuming = state["rows_done"] > 0
+    columns = _columns(args.explain)
+    if args.format == "parquet":
+        sink: Any = ParquetSink(dst, columns, state.get("output_part") if resuming else None)
+    else:
+        sink = CsvSink(dst, columns, state.get("output_bytes") if resuming else None)
+    if resuming:
+        print(f"[score] resuming after {state['rows_done']} rows", file=sys.stderr)
+
+    main._ensure_model_loaded(mode)  # before forking, so workers share it
+    workers = args.workers if mode in POOLED_MODES else 1
+    progress: Dict[str, int] = {}
+    chunks = _chunks(src, args.text_column, args.id_column, args.chunk_size, state["rows_done"], progress)
+    started = time.perf_counter()
+    done = 0
+
+    def commit(rows: List[List[Any]]) -> None:
+        nonlocal done
+        state.update(sink.write(rows))
+        done += len(rows)
+        state["rows_done"] += len(rows)
+        _save_checkpoint(ckpt, state)
+        _report(done, started, progress)
+
+    try:
+        if workers <= 1:
+            for chunk in chunks:
+                commit(score_chunk(chunk, mode, args.explain, args.batch_size))
+        else:
+            ctx = mp.get_context("fork" if hasattr(os, "fork") else "spawn")
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                                     initargs=(mode, args.explain, threads)) as pool:
+                pending: "deque[Future]" = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(score_chunk, chunk))
+                    # Bounded window: input is read only as fast as results drain
+                    while len(pending) >= 2 * workers:
+                        commit(pending.popleft().result())
+                while pending:
+                    commit(pending.popleft().result())
+    finally:
+        sink.close()
+    _report(done, started, progress, final=True)
+    ckpt.unlink(missing_ok=True)
+    print(f"[score] wrote {state['rows_done']} rows to {dst}", file=sys.stderr)
+    return 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("input", help="CSV with a text column")
+    ap.add_argument("output", help="CSV file, or a directory of Parquet parts with --format parquet")
+    ap.add_argument("--mode", choices=LOCAL_MODES, help="backend (default: model_type from config.json)")
+    ap.add_argument("--explain", choices=("none", "features", "full"), default="none")
+    ap.add_argument("--format", choices=("csv", "parquet"))
+    ap.add_argument("--text-column", default="summary")
+    ap.add_argument("--id-column", help="copied to the output (default: input row number)")
+    ap.add_argument("--chunk-size", type=int, default=1000, help="rows per chunk and per checkpoint")
+    ap.add_argument("--batch-size", type=int, default=32, help="hf: texts per forward pass")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for sklearn/zeroshot/llm")
+    ap.add_argument("--restart", action="store_true", help="ignore an existing checkpoint and start over")
+    return run(ap.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Preload-then-fork server for multi-worker deployments (POSIX only).
+
+    python -m backend.serve --workers 4 --preload sklearn,hf
+
+The master imports backend.main, loads the requested backends into the model
+pool, moves torch weights into shared memory, freezes the GC heap and only
+then forks the uvicorn workers. Workers therefore share the weights
+copy-on-write instead of each loading a private copy; gc.freeze() keeps the
+collector from walking (and dirtying) the inherited objects. Preloaded models
+are pinned in the pool so idle eviction in a worker never drops them.
+
+Compare per-worker USS with `--report` or GET /debug/memory on each worker.
+
+Each worker sizes torch's thread pools to its share of the cores
+(torch_threads / --torch-threads), and with --affinity is pinned to its own
+slice of them; see backend/cpu.py and GET /debug/cpu.
+`python -m benchmarks.autotune` finds a good workers x threads setting.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List
+
+
+def preload(modes: List[str]) -> List[str]:
+    from backend import main
+    for mode in modes:
+        print(f"[serve] preloading {mode}")
+        main._ensure_model_loaded(mode)
+    for value in main.model_pool.POOL.values():
+        for obj in value if isinstance(value, (tuple, list)) else (value,):
+            model = getattr(obj, "model", obj)  # pipelines wrap the model
+            if hasattr(model, "share_memory"):
+                # Tensor storage moves to shared memory: no copy-on-write at all
+                model.share_memory()
+    pinned = main.model_pool.POOL.pin_all()
+    gc.collect()
+    gc.freeze()
+    return pinned
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+    from backend.main import app
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def _spawn(sock: socket.socket, log_level: str, slot: int, workers: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            from backend import cpu, main
+            cpu.set_worker(slot, workers, main.CONFIG)
+            _run_worker(sock, log_level)
+        except BaseException as e:  # noqa
+            print(f"[serve] worker {os.getpid()} crashed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def report(workers: Dict[int, int]) -> None:
+    from backend.procmem import memory_info
+    print("[serve] pid      rss_mb   pss_mb   uss_mb   shared_mb")
+    for pid in [os.getpid(), *workers]:
+        m = memory_info(pid)
+        if "error" in m:
+            print(f"[serve] {pid:<8} {m['error']}")
+            continue
+        role = "master" if pid == os.getpid() else "worker"
+        print(f"[serve] {pid:<8} {m['rss_mb']:>7} {m['pss_mb']:>8} {m['uss_mb']:>8} {m['shared_mb']:>11}  {role}")
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--preload", default="", help="comma-separated modes to load before forking, e.g. sklearn,hf")
+    ap.add_argument("--report", action="store_true", help="print per-process RSS/PSS/USS once workers are up")
+    ap.add_argument("--torch-threads", type=int, help="torch intra-op threads per worker (default: torch_threads)")
+    ap.add_argument("--affinity", action="store_true", help="pin each worker to its own cores (cpu_affinity)")
+    ap.add_argument("--log-level", default="warning")
+    args = ap.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        print("[serve] preload-then-fork needs a POSIX OS; use 'uvicorn --workers N' instead.", file=sys.stderr)
+        return 2
+
+    from backend import main as app_main
+    if args.torch_threads is not None:
+        app_main.CONFIG["torch_threads"] = args.torch_threads
+    if args.affinity:
+        app_main.CONFIG["cpu_affinity"] = True
+
+    sock = _bind(args.host, args.port)
+    modes = [m.strip() for m in args.preload.split(",") if m.strip()]
+    pinned = preload(modes)
+    print(f"[serve] pinned {pinned or 'nothing'}; frozen {gc.get_freeze_count()} objects; forking {args.workers} workers on {args.host}:{args.port}")
+
+    n = max(1, args.workers)
+    workers: Dict[int, int] = {}
+    for i in range(n):
+        workers[_spawn(sock, args.log_level, i, n)] = i
+
+    stopping = False
+
+    def _stop(signum, frame):  # noqa
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    if args.report:
+        time.sleep(2.0)
+        report(workers)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = workers.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"[serve] worker {pid} exited ({status}); restarting")
+            workers[_spawn(sock, args.log_level, slot, n)] = slot
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
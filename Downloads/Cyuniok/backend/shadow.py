@@ -0,0 +1,136 @@
+from __future__ import annotations
+import asyncio
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+# Shadow evaluation: a sample of /predict requests is replayed against a
+# candidate backend after the primary response has gone out, and the two
+# answers are compared. Shadow calls have their own concurrency budget; a
+# sample that arrives while the budget is used up is dropped, not queued, so
+# a slow candidate can never build a backlog or hold up real traffic.
+#
+# Per (primary, candidate) pair we keep agreement counts, a label confusion
+# table, recent latencies of both sides and the last few disagreements.
+
+Runner = Callable[[str], Awaitable[Tuple[str, float]]]
+
+LATENCY_WINDOW = 1000
+RECENT_DISAGREEMENTS = 20
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+
+class Pair:
+    def __init__(self):
+        self.samples = 0
+        self.agreed = 0
+        self.errors = 0
+        self.confusion: Counter = Counter()
+        self.primary_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.candidate_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.confidence_delta = 0.0
+        self.disagreements: Deque[Dict[str, Any]] = deque(maxlen=RECENT_DISAGREEMENTS)
+
+    def summary(self) -> Dict[str, Any]:
+        compared = self.samples - self.errors
+        confusion: Dict[str, Dict[str, int]] = {}
+        for (primary, candidate), n in sorted(self.confusion.items()):
+            confusion.setdefault(primary, {})[candidate] = n
+        p50_p, p50_c = _percentile(self.primary_ms, 0.5), _percentile(self.candidate_ms, 0.5)
+        return {
+            "samples": self.samples,
+            "errors": self.errors,
+            "agreement": round(self.agreed / compared, 4) if compared else None,
+            "mean_confidence_delta": round(self.confidence_delta / compared, 4) if compared else None,
+            "confusion": confusion,
+            "latency_ms": {
+                "primary": {"p50": p50_p, "p95": _percentile(self.primary_ms, 0.95), "n": len(self.primary_ms)},
+                "candidate": {"p50": p50_c, "p95": _percentile(self.candidate_ms, 0.95), "n": len(self.candidate_ms)},
+                "p50_ratio": round(p50_c / p50_p, 3) if p50_p and p50_c else None,
+            },
+            "recent_disagreements": list(self.disagreements),
+        }
+
+
+class ShadowEvaluator:
+    def __init__(self, sample_rate: float = 0.0, concurrency: int = 1):
+        self.sample_rate = float(sample_rate)
+        self.concurrency = max(1, int(concurrency))
+        self.in_flight = 0
+        self.dropped = 0
+        self._pairs: Dict[Tuple[str, str], Pair] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def configure(self, sample_rate: float, concurrency: int) -> None:
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.concurrency = max(1, int(concurrency))
+
+    def offer(self, primary: str, candidate: str, text: str, label: str, confidence: float,
+              primary_ms: Optional[float], runner: Runner) -> bool:
+        """Start a shadow call for this request if it is sampled and the budget allows."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        if self.in_flight >= self.concurrency:
+            self.dropped += 1
+            return False
+        self.in_flight += 1
+        task = asyncio.get_running_loop().create_task(
+            self._run(primary, candidate, text, label, confidence, primary_ms, runner)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, primary: str, candidate: str, text: str, label: str, confidence: float,
+                   primary_ms: Optional[float], runner: Runner) -> None:
+        pair = self._pairs.setdefault((primary, candidate), Pair())
+        try:
+            start = time.perf_counter()
+            try:
+                shadow_label, shadow_conf = await runner(text)
+            except Exception as e:
+                pair.samples += 1
+                pair.errors += 1
+                print(f"[shadow] {candidate} failed: {getattr(e, 'detail', e)}")
+                return
+            pair.candidate_ms.append((time.perf_counter() - start) * 1000)
+            if primary_ms is not None:
+                pair.primary_ms.append(primary_ms)
+            pair.samples += 1
+            pair.confusion[(label, shadow_label)] += 1
+            pair.confidence_delta += float(shadow_conf) - float(confidence)
+            if shadow_label == label:
+                pair.agreed += 1
+            else:
+                pair.disagreements.append({"summary": text[:200], "primary": label, "candidate": shadow_label,
+                                           "primary_confidence": confidence, "candidate_confidence": shadow_conf})
+        finally:
+            self.in_flight -= 1
+
+    async def drain(self) -> None:
+        """Wait for the shadow calls in flight (tests, shutdown)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def reset(self) -> None:
+        self._pairs = {}
+        self.dropped = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "dropped": self.dropped,
+            "pairs": {f"{p}->{c}": pair.summary() for (p, c), pair in self._pairs.items()},
+        }
+
+
+SHADOW = ShadowEvaluator()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+import hashlib
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:  # imported lazily with the sklearn backend
+    import numpy as np
+    from scipy import sparse
+
+# Similar-case retrieval over the sklearn TF-IDF space. Case vectors are
+# L2-normalised, so cosine similarity is a dot product. They are held as a
+# CSC matrix, whose columns are the postings lists of an inverted index:
+# for each term, the ids of the cases that contain it and their weights.
+# A query only touches the postings of its own terms (term-at-a-time
+# accumulation), so cost grows with how many cases share the query's words
+# rather than with the corpus size.
+#
+# New cases (feedback) go into a small row-wise delta that is scanned the
+# same way and merged into the main matrix once it reaches 10% of it.
+# Persisted by train_model.py next to the vectorizer; the saved index is
+# only used with the vectorizer it was built from (idf fingerprint).
+
+INDEX_PATH = Path("models/similar_index.joblib")
+
+
+def fingerprint(vectorizer) -> str:
+    import numpy as np
+    idf = np.ascontiguousarray(getattr(vectorizer, "idf_", np.zeros(0)))
+    return hashlib.sha1(idf.tobytes()).hexdigest()
+
+
+class SimilarityIndex:
+    def __init__(self, vectorizer, min_delta: int = 1000):
+        from scipy import sparse
+        self.vectorizer = vectorizer
+        self.fingerprint = fingerprint(vectorizer)
+        self.n_features = len(vectorizer.vocabulary_)
+        self.docs: List[Tuple[str, str, str]] = []  # (summary, outcome, source)
+        self._by_text: Dict[str, int] = {}
+        self._base = sparse.csc_matrix((0, self.n_features))
+        self._delta_rows: List[Any] = []
+        self._delta: Optional[Any] = None  # CSR of rows not yet merged
+        self.min_delta = min_delta
+        self.feedback_cursor = 0  # last feedback row id folded in
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, rows: Iterable[Tuple[str, str, str]]) -> int:
+        """Index (summary, outcome, source) rows; a known summary just takes the new outcome."""
+        with self._lock:
+            fresh: List[str] = []
+            for summary, outcome, source in rows:
+                summary = summary.strip()
+                if not summary:
+                    continue
+                known = self._by_text.get(summary)
+                if known is not None:
+                    self.docs[known] = (summary, outcome, self.docs[known][2])
+                    continue
+                self._by_text[summary] = len(self.docs)
+                self.docs.append((summary, outcome, source))
+                fresh.append(summary)
+            if fresh:
+                self._delta_rows.append(self.vectorizer.transform(fresh).tocsr())
+                self._merge_locked()
+            return len(fresh)
+
+    def _merge_locked(self) -> None:
+        from scipy import sparse
+        delta = sparse.vstack(self._delta_rows, format="csr") if self._delta_rows else None
+        self._delta_rows = [delta] if delta is not None else []
+        self._delta = delta
+        if delta is not None and delta.shape[0] >= max(self.min_delta, self._base.shape[0] // 10):
+            # Rebuild the postings; amortised over the rows that triggered it
+            self._base = sparse.vstack([self._base.tocsr(), delta], format="csr").tocsc()
+            self._base.sort_indices()
+            self._delta_rows, self._delta = [], None
+
+    def search(self, text: str, k: int = 5, min_score: float = 0.0) -> List[Dict[str, Any]]:
+        import numpy as np
+        q = self.vectorizer.transform([text]).tocsr()
+        if q.nnz == 0:
+            return []
+        with self._lock:
+            base, delta, docs = self._base, self._delta, self.docs
+        ids: List[np.ndarray] = []
+        weights: List[np.ndarray] = []
+        indptr, indices, data = base.indptr, base.indices, base.data
+        for term, qw in zip(q.indices, q.data):
+            start, end = indptr[term], indptr[term + 1]
+            if start != end:
+                ids.append(indices[start:end])
+                weights.append(data[start:end] * qw)
+        if delta is not None and delta.nnz:
+            # The delta is small: a row-wise dot product is cheapest
+            scores = (delta @ q.T).toarray().ravel()
+            hit = np.flatnonzero(scores)
+            ids.append(hit + base.shape[0])
+            weights.append(scores[hit])
+        if not ids:
+            return []
+        flat_ids, flat_w = np.concatenate(ids), np.concatenate(weights)
+        n_docs = base.shape[0] + (delta.shape[0] if delta is not None else 0)
+        if len(flat_ids) * 8 < n_docs:
+            # Few postings touched: accumulate over the candidates only
+            cand, inverse = np.unique(flat_ids, return_inverse=True)
+            scores = np.bincount(inverse, weights=flat_w)
+        else:
+            # Common terms: a dense accumulator is cheaper than sorting the postings
+            scores = np.bincount(flat_ids, weights=flat_w, minlength=n_docs)
+            cand = np.flatnonzero(scores)
+            scores = scores[cand]
+        k = min(max(1, int(k)), len(cand))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        out = []
+        for i in top:
+            score = float(scores[i])
+            if score <= min_score:
+                break
+            summary, outcome, source = docs[int(cand[i])]
+            out.append({"summary": summary, "outcome": outcome, "source": source, "score": round(score, 4)})
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            delta = self._delta.shape[0] if self._delta is not None else 0
+            return {"cases": len(self.docs), "merged": self._base.shape[0], "pending_merge": delta,
+                    "postings": int(self._base.nnz), "terms": self.n_features,
+                    "feedback_cursor": self.feedback_cursor}
+
+    def resident_bytes(self) -> int:
+        """Matrix arrays plus case text, for the model pool's memory budget."""
+        with self._lock:
+            mats = [m for m in (self._base, self._delta) if m is not None]
+            arrays = sum(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes for m in mats)
+            return arrays + sum(len(s) + len(o) + 120 for s, o, _ in self.docs)
+
+    # -- persistence --
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            self._merge_locked()
+            from scipy import sparse
+            matrix = self._base if self._delta is None else sparse.vstack([self._base.tocsr(), self._delta]).tocsc()
+            return {"fingerprint": self.fingerprint, "docs": list(self.docs), "matrix": matrix,
+                    "feedback_cursor": self.feedback_cursor}
+
+    @classmethod
+    def from_state(cls, vectorizer, state: Dict[str, Any]) -> "SimilarityIndex":
+        index = cls(vectorizer)
+        if state.get("fingerprint") != index.fingerprint:
+            raise ValueError("index was built with a different vectorizer")
+        index.docs = [tuple(d) for d in state["docs"]]
+        index._by_text = {d[0]: i for i, d in enumerate(index.docs)}
+        index._base = state["matrix"].tocsc()
+        index._base.sort_indices()
+        index.feedback_cursor = int(state.get("feedback_cursor") or 0)
+        return index
+
+
+def build(vectorizer, rows: Iterable[Tuple[str, str]], source: str = "dataset") -> SimilarityIndex:
+    index = SimilarityIndex(vectorizer)
+    index.add((s, o, source) for s, o in rows)
+    with index._lock:
+        index.min_delta, saved = 0, index.min_delta
+        index._merge_locked()  # start with everything in the postings
+        index.min_delta = saved
+    return index
+
+
+def save(index: SimilarityIndex, path: Path = INDEX_PATH) -> None:
+    import joblib
+    path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(index.state(), path)
+
+
+def load(vectorizer, path: Path = INDEX_PATH) -> Optional[SimilarityIndex]:
+    """The saved index if it matches `vectorizer`, else None."""
+    import joblib
+    if not path.exists():
+        return None
+    try:
+        return SimilarityIndex.from_state(vectorizer, joblib.load(path))
+    except Exception as e:
+        print(f"[similar] ignoring {path}: {e}")
+        return None
@@ -0,0 +1,233 @@
+"""Teacher labelling: label unlabeled case text with a remote provider.
+
+    python -m backend.teacher unlabeled.csv data/teacher_labels.csv --teacher gemini
+    TEACHER_DATA=data/teacher_labels.csv python train_model.py
+
+The teacher (gemini or hf_api, configured as for /predict) is called through
+the shared HTTP client. The client's retries and circuit breaker apply, and
+--concurrency caps the requests in flight. Every answer is cached in a SQLite
+file (--cache, default data/teacher_cache.db), keyed by provider, model and
+the full request. Re-labelling the same text, in this run or a later one,
+costs no call.
+
+Input is read in chunks of --chunk-size rows. Output rows are written in
+input order, one chunk at a time, with a checkpoint (<output>.ckpt.json)
+after each chunk. Re-running the same command resumes after the last
+finished chunk. If the teacher fails (5xx or 429 after the client's
+retries, open circuit, missing API key), the run stops before writing the
+current chunk, so no row is stored with a transient error. Resuming later
+repeats only the calls that were not cached. Rows whose answer is rejected
+(other 4xx) or cannot be parsed get an error instead.
+
+The output CSV has id, summary, outcome, confidence, teacher and error
+columns. load_labels() reads it back for train_model.py and train_hf.py,
+which add it to the gold data when TEACHER_DATA is set.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import score
+
+TEACHERS = ("gemini", "hf_api")
+CACHE_PATH = Path("data/teacher_cache.db")
+COLUMNS = ["id", "summary", "outcome", "confidence", "teacher", "error"]
+
+
+class TeacherUnavailable(RuntimeError):
+    pass
+
+
+class ResponseCache:
+    """Raw teacher answers by request; safe to share between runs and processes."""
+
+    def __init__(self, path: Path = CACHE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=10.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, provider TEXT NOT NULL,"
+            " model TEXT NOT NULL, text_out TEXT NOT NULL, created REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(provider: str, model_name: str, payload: Any) -> str:
+        raw = json.dumps([provider, model_name, payload], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text_out FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, provider: str, model_name: str, text_out: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, text_out, created) VALUES (?, ?, ?, ?, ?)",
+                (key, provider, model_name, text_out, time.time()),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+async def label(provider: str, text: str, cache: ResponseCache) -> Tuple[str, float, str]:
+    """(label, confidence, model name) from the teacher, or from the cache."""
+    from fastapi import HTTPException
+    from backend import http_client, main
+    try:
+        url, payload, headers, labels, model_name = main._remote_request(provider, text)
+    except HTTPException as e:  # missing API key: no row can succeed
+        raise TeacherUnavailable(str(e.detail)) from e
+    key = ResponseCache.key(provider, model_name, payload)
+    text_out = cache.get(key)
+    if text_out is None:
+        client = http_client.get_client(provider, main.CONFIG)
+        try:
+            response = await client.post_json(url, payload, headers=headers)
+        except http_client.CircuitOpenError as e:
+            raise TeacherUnavailable(str(e)) from e
+        except http_client.RemoteHTTPError as e:
+            if e.status == 0 or e.status == 429 or e.status >= 500:
+                # Upstream trouble, not this row's fault: stop rather than store an error
+                raise TeacherUnavailable(str(e)) from e
+            raise
+        if provider == "gemini":
+            text_out = main._parse_gemini_text(response)
+        else:
+            text_out = main._parse_hf_api_text(response)
+        cache.put(key, provider, model_name, text_out)
+    r = main._remote_response(provider, text_out, labels, model_name)
+    return r.prediction, r.confidence, f"{provider}:{model_name}"
+
+
+async def label_chunk(rows: List[Tuple[str, str]], provider: str, cache: ResponseCache) -> List[List[Any]]:
+    """One output row per (id, text); the HTTP client bounds concurrency."""
+
+    async def one(row_id: str, text: str) -> List[Any]:
+        text = text.strip()
+        if not text:
+            return [row_id, text, "", "", "", "empty text"]
+        try:
+            pred, conf, teacher = await label(provider, text, cache)
+        except TeacherUnavailable:
+            raise
+        except Exception as e:  # one bad answer must not fail the chunk
+            return [row_id, text, "", "", "", f"{type(e).__name__}: {e}"]
+        return [row_id, text, pred, round(float(conf), 4), teacher, ""]
+
+    return list(await asyncio.gather(*(one(rid, text) for rid, text in rows)))
+
+
+def load_labels(path: Path, min_confidence: float = 0.0) -> List[Tuple[str, str]]:
+    """(summary, outcome) rows of a teacher output at or above `min_confidence`."""
+    rows: List[Tuple[str, str]] = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for rec in csv.DictReader(f):
+            summary, outcome = (rec.get("summary") or "").strip(), (rec.get("outcome") or "").strip()
+            if not summary or not outcome or rec.get("error"):
+                continue
+            try:
+                conf = float(rec.get("confidence") or 0)
+            except ValueError:
+                continue
+            if conf >= min_confidence:
+                rows.append((summary, outcome))
+    return rows
+
+
+def _fingerprint(path: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    from backend import main
+    st = path.stat()
+    return {"input": str(path.resolve()), "size": st.st_size, "mtime": int(st.st_mtime),
+            "teacher": args.teacher, "model": main.CONFIG.get(f"{args.teacher}_model"),
+            "labels": list(main.CONFIG.get(f"{args.teacher}_labels") or ()),
+            "text_column": args.text_column, "id_column": args.id_column}
+
+
+async def _run(args: argparse.Namespace, src: Path, ckpt: Path, state: Dict[str, Any],
+               sink: score.CsvSink, cache: ResponseCache) -> Counter:
+    progress: Dict[str, int] = {}
+    chunks = score._chunks(src, args.text_column, args.id_column, args.chunk_size, state["rows_done"], progress)
+    started = time.perf_counter()
+    done, outcomes = 0, Counter()
+    for chunk in chunks:
+        rows = await label_chunk(chunk, args.teacher, cache)
+        state.update(sink.write(rows))
+        state["rows_done"] += len(rows)
+        score._save_checkpoint(ckpt, state)
+        done += len(rows)
+        outcomes.update(r[2] or "error" for r in rows)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"[teacher] {done} rows  {done / elapsed:,.1f} rows/s  cache hits {cache.hits}",
+              end="\r", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return outcomes
+
+
+def run(args: argparse.Namespace) -> int:
+    from backend import main
+    src, dst = Path(args.input), Path(args.output)
+    if args.concurrency:
+        main.CONFIG[f"{args.teacher}_concurrency"] = args.concurrency
+    ckpt = Path(str(dst) + ".ckpt.json")
+    fingerprint = _fingerprint(src, args)
+    if args.restart and ckpt.exists():
+        ckpt.unlink()
+    state = score._load_checkpoint(ckpt, fingerprint) or {"fingerprint": fingerprint, "rows_done": 0}
+    resuming = state["rows_done"] > 0
+    if resuming:
+        print(f"[teacher] resuming after {state['rows_done']} rows", file=sys.stderr)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    sink = score.CsvSink(dst, COLUMNS, state.get("output_bytes") if resuming else None)
+    cache = ResponseCache(Path(args.cache))
+    try:
+        outcomes = asyncio.run(_run(args, src, ckpt, state, sink, cache))
+    except TeacherUnavailable as e:
+        print(f"\n[teacher] {args.teacher} unavailable: {e}; re-run to resume after {state['rows_done']} rows",
+              file=sys.stderr)
+        return 1
+    finally:
+        sink.close()
+        cache.close()
+    ckpt.unlink(missing_ok=True)
+    summary = ", ".join(f"{k}={v}" for k, v in sorted(outcomes.items()))
+    print(f"[teacher] wrote {state['rows_done']} rows to {dst} ({summary})", file=sys.stderr)
+    return 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("input", help="CSV with a text column")
+    ap.add_argument("output", help="labelled CSV (summary, outcome, confidence, ...)")
+    ap.add_argument("--teacher", choices=TEACHERS, default="gemini")
+    ap.add_argument("--concurrency", type=int, help="requests in flight (default: <teacher>_concurrency)")
+    ap.add_argument("--cache", default=str(CACHE_PATH), help="SQLite response cache")
+    ap.add_argument("--text-column", default="summary")
+    ap.add_argument("--id-column", help="copied to the output (default: input row number)")
+    ap.add_argument("--chunk-size", type=int, default=200, help="rows per chunk and per checkpoint")
+    ap.add_argument("--restart", action="store_true", help="ignore an existing checkpoint and start over")
+    return run(ap.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Recommend workers x torch threads for the configured model at a latency SLO.
+
+    python -m benchmarks.autotune --mode hf --slo-p95-ms 250
+    python -m benchmarks.autotune --mode zeroshot --workers 1,2,4 --threads 1,2,4 --affinity
+    python -m benchmarks.autotune --mode hf --tiny --quick      # smoke test with the tiny model
+
+Each combination starts backend.serve with that many workers (the mode
+preloaded before the fork) and torch_threads per worker. It then drives
+/predict with --concurrency closed-loop clients for --seconds. Combinations
+that need more threads than there are cores (workers x threads > cores) are
+skipped unless --oversubscribe is given. The recommendation is the
+combination with the highest throughput whose p95 meets the SLO (of those
+within 5% of it, the one using fewer cores), or the lowest p95 if none does.
+It is printed as the serve flags and config keys to use. Results go to
+benchmarks/results/autotune-<timestamp>.json.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import load, tiny_models
+from .common import RESULTS_DIR, environment, load_texts
+
+LOCAL_TORCH_MODES = ("hf", "zeroshot", "llm")
+TIE_TOLERANCE = 0.05
+
+
+def _ints(value: str) -> List[int]:
+    return sorted({int(v) for v in value.split(",") if v.strip()})
+
+
+def grid(workers: List[int], threads: List[int], cores: int, oversubscribe: bool = False) -> List[Dict[str, int]]:
+    """(workers, threads) combinations to try, smallest footprint first."""
+    combos = [{"workers": w, "threads": t} for w in workers for t in threads
+              if w > 0 and t > 0 and (oversubscribe or w * t <= cores)]
+    return sorted(combos, key=lambda c: (c["workers"] * c["threads"], c["workers"]))
+
+
+def recommend(results: List[Dict[str, Any]], slo_p95_ms: float) -> Optional[Dict[str, Any]]:
+    """Best throughput within the SLO; if nothing meets it, the lowest p95."""
+    ok = [r for r in results if "latency_ms" in r and r.get("ok")]
+    if not ok:
+        return None
+    within = [r for r in ok if r["latency_ms"]["p95"] <= slo_p95_ms]
+    if within:
+        # Within TIE_TOLERANCE of the best is noise: take the smallest footprint of those
+        top = max(r["throughput_rps"] for r in within)
+        close = [r for r in within if r["throughput_rps"] >= top * (1 - TIE_TOLERANCE)]
+        best = min(close, key=lambda r: (r["workers"] * r["threads"], r["latency_ms"]["p95"]))
+        return {**best, "meets_slo": True}
+    return {**min(ok, key=lambda r: r["latency_ms"]["p95"]), "meets_slo": False}
+
+
+def _base_config(path: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _concurrency(mode: str, config: Dict[str, Any], workers: int, wanted: int) -> int:
+    # Each worker has its own admission gate; stay within what they accept so
+    # the run measures capacity rather than load shedding
+    from backend.admission import DEFAULT_LIMITS
+    limits = dict(DEFAULT_LIMITS.get(mode) or DEFAULT_LIMITS["sklearn"])
+    limits.update(((config.get("admission") or {}).get(mode)) or {})
+    return max(1, min(wanted, workers * int(limits["concurrency"] + limits["queue"])))
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    base = _base_config(Path(args.config))
+    mode = (args.mode or base.get("model_type") or "sklearn").lower()
+    if mode not in LOCAL_TORCH_MODES:
+        print(f"[autotune] {mode} does not run torch locally; only the worker count matters", file=sys.stderr)
+    texts = load_texts()
+    pool = texts["short"] + texts["medium"]
+    # The driver cycles a few texts: with the prediction cache on, every request
+    # after warm-up would be a cache hit and torch would never run
+    overrides: Dict[str, Any] = {"model_type": mode, "request_log_file": os.devnull,
+                                 "cpu_affinity": bool(args.affinity), "torch_interop_threads": 1,
+                                 "prediction_cache_size": 0, "near_dup_threshold": 0}
+    if args.tiny:
+        tiny = tiny_models.build([t for ts in texts.values() for t in ts])
+        if tiny is None:
+            raise SystemExit("[autotune] --tiny needs torch and transformers")
+        overrides.update(tiny)
+
+    combos = grid(_ints(args.workers), _ints(args.threads), cores, args.oversubscribe)
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for combo in combos:
+            config = {**base, **overrides, "torch_threads": combo["threads"]}
+            config_path = Path(tmp) / "config.json"
+            config_path.write_text(json.dumps(config, indent=2), encoding="utf-8")
+            serve_args = ["--workers", str(combo["workers"]), "--preload", mode, "--log-level", "warning"]
+            c = _concurrency(mode, config, combo["workers"], args.concurrency)
+            entry: Dict[str, Any] = dict(combo)
+            try:
+                with load.Server(str(config_path), {}, serve_args) as server:
+                    entry.update(asyncio.run(load._drive(
+                        server.url, "/predict", lambda n: {"summary": pool[n % len(pool)], "mode": mode},
+                        c, args.seconds, warmup=2 * combo["workers"],
+                    )))
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+            results.append(entry)
+            print(f"[autotune] workers={combo['workers']} threads={combo['threads']}: {load._summary(entry)}")
+
+    best = recommend(results, args.slo_p95_ms)
+    return {"env": environment(), "mode": mode, "cores": cores, "slo_p95_ms": args.slo_p95_ms,
+            "settings": vars(args), "results": results, "recommendation": best}
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mode", help="backend to tune (default: model_type of --config)")
+    ap.add_argument("--config", default=os.getenv("CONFIG_PATH", "config.json"), help="base config")
+    ap.add_argument("--workers", default="1,2,4", help="worker counts to try")
+    ap.add_argument("--threads", default="1,2,4,8", help="torch threads per worker to try")
+    ap.add_argument("--slo-p95-ms", type=float, default=500.0, help="latency SLO on p95")
+    ap.add_argument("--seconds", type=float, default=15.0, help="load time per combination")
+    ap.add_argument("--concurrency", type=int, default=16, help="closed-loop clients")
+    ap.add_argument("--affinity", action="store_true", help="pin workers to their own cores")
+    ap.add_argument("--oversubscribe", action="store_true", help="also try workers x threads > cores")
+    ap.add_argument("--tiny", action="store_true", help="use the tiny benchmark models")
+    ap.add_argument("--quick", action="store_true", help="short runs, for smoke testing")
+    ap.add_argument("--out", help="output JSON path (default: benchmarks/results/autotune-...)")
+    args = ap.parse_args(argv)
+    if args.quick:
+        args.seconds = 1.0
+
+    result = run(args)
+    best = result["recommendation"]
+    if best is None:
+        print("[autotune] no combination completed; see the errors above", file=sys.stderr)
+    else:
+        verdict = "meets" if best["meets_slo"] else "MISSES"
+        print(f"[autotune] recommended: workers={best['workers']} torch_threads={best['threads']} "
+              f"({best['throughput_rps']} req/s, p95={best['latency_ms']['p95']}ms {verdict} the "
+              f"{args.slo_p95_ms}ms SLO)")
+        flags = " --affinity" if args.affinity else ""
+        print(f"[autotune]   python -m backend.serve --workers {best['workers']} --preload {result['mode']} "
+              f"--torch-threads {best['threads']}{flags}")
+        print(f"[autotune]   or config: {{\"torch_threads\": {best['threads']}, "
+              f"\"cpu_affinity\": {json.dumps(bool(args.affinity))}}}")
+    out = Path(args.out) if args.out else RESULTS_DIR / f"autotune-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"[autotune] wrote {out}")
+    return 0 if best is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
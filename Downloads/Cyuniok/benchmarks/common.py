@@ -0,0 +1,93 @@
+from __future__ import annotations
+import csv
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentiles(samples_s: List[float], scale: float = 1000.0) -> Dict[str, float]:
+    """p50/p95/p99/mean/max of `samples_s` (seconds), in ms by default."""
+    if not samples_s:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    ordered = sorted(samples_s)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "p50": round(pick(0.50) * scale, 4),
+        "p95": round(pick(0.95) * scale, 4),
+        "p99": round(pick(0.99) * scale, 4),
+        "mean": round(sum(ordered) / len(ordered) * scale, 4),
+        "max": round(ordered[-1] * scale, 4),
+    }
+
+
+def bench(fn: Callable[[], Any], seconds: float = 2.0, min_calls: int = 20, warmup: int = 3) -> Dict[str, Any]:
+    """Time `fn()` call by call for about `seconds` (and at least `min_calls` calls)."""
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    deadline = time.perf_counter() + seconds
+    while len(samples) < min_calls or time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    total = sum(samples)
+    out: Dict[str, Any] = {"calls": len(samples), "ops_per_s": round(len(samples) / total, 2) if total else None}
+    out["latency_us"] = percentiles(samples, scale=1e6)
+    return out
+
+
+def rss_mb(pid: int | None = None) -> Dict[str, Any]:
+    from backend.procmem import memory_info
+    info = memory_info(pid)
+    if "error" in info and pid is None:
+        import resource
+        # Peak RSS only; ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        info = {"pid": os.getpid(), "peak_rss_mb": round(peak / (2**20 if sys.platform == "darwin" else 1024), 1)}
+    return info
+
+
+def load_texts() -> Dict[str, List[str]]:
+    """Short (one sentence), medium (~5) and long (~40) case summaries from the dataset."""
+    with open(ROOT / "data" / "case_data.csv", newline="", encoding="utf-8") as f:
+        rows = [r["summary"] for r in csv.DictReader(f) if r.get("summary")]
+    n = len(rows)
+    return {
+        "short": rows,
+        "medium": [" ".join(rows[(i + j) % n] for j in range(5)) for i in range(n)],
+        "long": [" ".join(rows[(i + j) % n] for j in range(40)) for i in range(n)],
+    }
+
+
+def environment() -> Dict[str, Any]:
+    from importlib import metadata
+    versions = {}
+    for dist in ("fastapi", "pydantic", "scikit-learn", "numpy", "torch", "transformers", "httpx", "uvicorn"):
+        try:
+            versions[dist] = metadata.version(dist)
+        except metadata.PackageNotFoundError:
+            versions[dist] = None
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--", "backend"], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip())
+    except Exception:
+        sha, dirty = "", False
+    return {
+        "commit": sha + ("-dirty" if dirty else ""),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
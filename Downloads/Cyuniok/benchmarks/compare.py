@@ -0,0 +1,69 @@
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare OLD.json NEW.json [--threshold 10] [--fail]
+
+Lists every benchmark present in both files with the relative change in
+p50/p99 latency and throughput. Regressions beyond --threshold percent are
+marked; --fail turns them into a non-zero exit code for CI.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _metrics(entry: Dict[str, Any]) -> Optional[Tuple[float, float, float]]:
+    """(p50, p99, throughput) of a micro or load entry."""
+    if "latency_us" in entry:
+        lat = entry["latency_us"]
+        return lat["p50"], lat["p99"], entry.get("ops_per_s") or 0.0
+    if "latency_ms" in entry:
+        lat = entry["latency_ms"]
+        return lat["p50"], lat["p99"], entry.get("throughput_rps") or 0.0
+    return None
+
+
+def _pct(old: float, new: float) -> float:
+    return 0.0 if not old else 100.0 * (new - old) / old
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> Tuple[List[str], int]:
+    lines = [f"{'benchmark':<48} {'p50':>9} {'p99':>9} {'thrpt':>9}"]
+    regressions = 0
+    for suite in ("micro", "load"):
+        for name, entry in (new.get(suite) or {}).items():
+            before = (old.get(suite) or {}).get(name)
+            if not isinstance(entry, dict) or not isinstance(before, dict):
+                continue
+            a, b = _metrics(before), _metrics(entry)
+            if a is None or b is None:
+                continue
+            d50, d99, dtp = _pct(a[0], b[0]), _pct(a[1], b[1]), _pct(a[2], b[2])
+            bad = d50 > threshold or dtp < -threshold
+            regressions += bad
+            lines.append(f"{suite + ' ' + name:<48} {d50:>+8.1f}% {d99:>+8.1f}% {dtp:>+8.1f}%{'  REGRESSION' if bad else ''}")
+    return lines, regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("old")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    ap.add_argument("--fail", action="store_true", help="exit 1 when any benchmark regressed")
+    args = ap.parse_args(argv)
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"old: {old.get('env', {}).get('commit')}  new: {new.get('env', {}).get('commit')}")
+    lines, regressions = compare(old, new, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"{regressions} regression(s) beyond {args.threshold:g}%")
+    return 1 if regressions and args.fail else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from .common import ROOT, percentiles, rss_mb
+
+# End-to-end load generator: starts the API with uvicorn in a separate
+# process (its own GIL, its own RSS) and drives /predict and /predict/batch
+# with a fixed number of closed-loop clients for a fixed duration.
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    def __init__(self, config_path: str, env: Dict[str, str], serve_args: List[str] | None = None):
+        # serve_args: run backend.serve (preload-then-fork workers) with these flags instead of uvicorn
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.config_path = config_path
+        self.env = env
+        self.serve_args = serve_args
+        self.proc: subprocess.Popen | None = None
+        self.cold_start_s = 0.0
+
+    def __enter__(self) -> "Server":
+        env = {**os.environ, **self.env, "CONFIG_PATH": self.config_path}
+        if self.serve_args is None:
+            cmd = [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+                   "--port", str(self.port), "--log-level", "warning"]
+        else:
+            cmd = [sys.executable, "-m", "backend.serve", "--host", "127.0.0.1", "--port", str(self.port),
+                   *self.serve_args]
+        start = time.perf_counter()
+        self.proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+        deadline = start + 120
+        while time.perf_counter() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"server exited with {self.proc.returncode}")
+            try:
+                if httpx.get(self.url + "/", timeout=1.0).status_code == 200:
+                    self.cold_start_s = time.perf_counter() - start
+                    return self
+            except httpx.HTTPError:
+                time.sleep(0.05)
+        raise RuntimeError("server did not come up within 120s")
+
+    def __exit__(self, *exc) -> None:
+        if self.proc is not None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+async def _drive(url: str, path: str, make_body: Callable[[int], dict], concurrency: int,
+                 seconds: float, warmup: int) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120.0) as client:
+        for i in range(warmup):  # loads the backend before the clock starts
+            await client.post(path, json=make_body(i))
+        latencies: List[float] = []
+        statuses: Counter = Counter()
+        stop = time.perf_counter() + seconds
+
+        async def worker(i: int) -> None:
+            n = i
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.post(path, json=make_body(n))
+                    statuses[str(r.status_code)] += 1
+                    if r.status_code == 200:
+                        latencies.append(time.perf_counter() - t0)
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                n += concurrency
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests": sum(statuses.values()),
+        "ok": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": percentiles(latencies),
+        "status": dict(statuses),
+    }
+
+
+def run(server: Server, texts: Dict[str, List[str]], modes: List[str], concurrency: int,
+        seconds: float, batch_size: int = 32) -> Dict[str, Any]:
+    from backend.admission import DEFAULT_LIMITS
+
+    pool = texts["short"] + texts["medium"]
+    results: Dict[str, Any] = {"cold_start_s": round(server.cold_start_s, 3), "rss_idle": rss_mb(server.proc.pid)}
+    for mode in modes:
+        # Stay within what the admission gate accepts, so the run measures
+        # capacity rather than how fast requests are shed
+        limits = DEFAULT_LIMITS.get(mode, DEFAULT_LIMITS["sklearn"])
+        c = max(1, min(concurrency, int(limits["concurrency"] + limits["queue"])))
+        name = f"/predict[{mode}]"
+        try:
+            results[name] = asyncio.run(_drive(
+                server.url, "/predict", lambda n, m=mode: {"summary": pool[n % len(pool)], "mode": m},
+                c, seconds, warmup=2,
+            ))
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        results[name]["rss"] = rss_mb(server.proc.pid)
+        print(f"[bench] load {name}: {_summary(results[name])}")
+
+    # Cache hits: the same texts again with the prediction cache on
+    name = "/predict[sklearn,cache_hit]"
+    httpx.put(server.url + "/config", json={"prediction_cache_size": 4096}, timeout=30.0).raise_for_status()
+    try:
+        results[name] = asyncio.run(_drive(
+            server.url, "/predict", lambda n: {"summary": pool[n % len(pool)], "mode": "sklearn"},
+            concurrency, seconds, warmup=len(pool),
+        ))
+    finally:
+        httpx.put(server.url + "/config", json={"prediction_cache_size": 0}, timeout=30.0)
+    results[name]["rss"] = rss_mb(server.proc.pid)
+    print(f"[bench] load {name}: {_summary(results[name])}")
+
+    name = f"/predict/batch[{batch_size}]"
+    batch = [pool[i % len(pool)] for i in range(batch_size)]
+    results[name] = asyncio.run(_drive(
+        server.url, "/predict/batch", lambda n: {"summaries": batch}, max(1, concurrency // 4), seconds, warmup=2,
+    ))
+    results[name]["items_per_s"] = round(results[name]["throughput_rps"] * batch_size, 2)
+    results[name]["rss"] = rss_mb(server.proc.pid)
+    print(f"[bench] load {name}: {_summary(results[name])}")
+    return results
+
+
+def _summary(r: Dict[str, Any]) -> str:
+    if "latency_ms" not in r:
+        return str(r)
+    lat = r["latency_ms"]
+    return f"{r['throughput_rps']} req/s p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms status={r['status']}"
@@ -0,0 +1,105 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+from .common import bench
+from .mock_servers import ANSWER
+
+# In-process microbenchmarks of the hot functions in backend/main.py. Each
+# entry is timed call by call; see common.bench for the loop.
+
+NO_MATCH = (
+    "After reviewing the record the panel reached its view on the claim. "
+    "The parties' positions were weighed against the contract and the statute. "
+) * 6
+
+
+def run(main, texts: Dict[str, List[str]], tiny: Optional[Dict[str, str]], seconds: float) -> Dict[str, Any]:
+    import numpy as np
+
+    results: Dict[str, Any] = {}
+
+    def case(name: str, fn) -> None:
+        try:
+            results[name] = bench(fn, seconds=seconds)
+        except Exception as e:  # keep going; one broken backend must not hide the rest
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"[bench] micro {name}: {_summary(results[name])}")
+
+    model, vectorizer = main._ensure_sklearn_loaded()
+    batch = (texts["medium"] * 4)[:32]
+    for size in ("short", "medium", "long"):
+        text = texts[size][0]
+        case(f"vectorizer.transform[{size}]", lambda t=text: vectorizer.transform([t]))
+    case("vectorizer.transform[batch32]", lambda: vectorizer.transform(batch))
+    for size in ("short", "medium", "long"):
+        text = texts[size][0]
+        case(f"_predict_one[{size}]", lambda t=text: main._predict_one(t))
+
+    case("extract_confidence_from_response[match]", lambda: main.extract_confidence_from_response(ANSWER))
+    case("extract_confidence_from_response[no_match]", lambda: main.extract_confidence_from_response(NO_MATCH))
+    gemini_body = {"candidates": [{"content": {"parts": [{"text": ANSWER}]}}]}
+    labels = ["plaintiff_wins", "defendant_wins"]
+    case("gemini_parse+label", lambda: main._label_from_text(main._parse_gemini_text(gemini_body), labels))
+
+    _encoding_cases(main, case, results, texts)
+
+    probs = np.array([0.27, 0.73])
+    hf_labels = ["defendant_wins", "plaintiff_wins"]
+    case("_reason_hf[medium]", lambda: main._reason_hf("plaintiff_wins", probs, hf_labels, texts["medium"][0]))
+
+    if tiny is None:
+        for name in ("_predict_hf", "_reason_zeroshot", "_predict_zeroshot", "_predict_llm"):
+            results[name] = {"skipped": "torch/transformers not installed"}
+        return results
+    text = texts["medium"][0]
+    # explain=none is plain inference; features adds the gradient x input pass
+    for size in ("medium", "long"):
+        t = texts[size][0]
+        case(f"_predict_hf[{size}]", lambda t=t: main._predict_hf(t))
+        case(f"_predict_hf[{size},explain=none]", lambda t=t: main._predict_hf(t, explain="none"))
+        case(f"_predict_hf[{size},explain=features]", lambda t=t: main._predict_hf(t, explain="features"))
+    for size in ("medium", "long"):
+        base = results.get(f"_predict_hf[{size},explain=none]", {}).get("latency_us")
+        attr = results.get(f"_predict_hf[{size},explain=features]", {}).get("latency_us")
+        if base and attr:
+            results[f"hf_attribution_overhead[{size}]"] = {"p50_ratio": round(attr["p50"] / base["p50"], 2)}
+    res = main._zeroshot_classify(text)
+    case("_reason_zeroshot[medium]", lambda: main._reason_zeroshot(res, text))
+    case("_predict_zeroshot[medium]", lambda: main._predict_zeroshot(text))
+    case("_predict_llm[short]", lambda: main._predict_llm(texts["short"][0]))
+    return results
+
+
+def _encoding_cases(main, case, results: Dict[str, Any], texts: Dict[str, List[str]]) -> None:
+    """Response encoding: the FastAPI default path against backend.encoding, with bytes on the wire."""
+    import gzip
+    import json
+    from fastapi.encoders import jsonable_encoder
+    from backend import encoding
+
+    remote = {"prediction": "plaintiff_wins", "confidence": 0.82, "top_features": None, "reason": ANSWER * 16,
+              "reason_id": None}
+    items = [dict(item) for item in main._predict_batch_items((texts["medium"] * 8)[:256], "full")]
+    for name, payload, model in (("predict[remote_reason]", remote, main.PredictResponse),
+                                 ("batch[256,full]", {"items": items}, main.BatchPredictResponse)):
+        # What response_model does: validate, jsonable_encoder, json.dumps
+        def default_path(p=payload, m=model):
+            return json.dumps(jsonable_encoder(m(**p)), ensure_ascii=False, separators=(",", ":")).encode()
+
+        body = encoding.dumps(payload)
+        case(f"encode_default[{name}]", default_path)
+        case(f"encode_fast[{name}]", lambda p=payload: encoding.dumps(p))
+        case(f"encode_fast+gzip[{name}]", lambda b=body: encoding.compress(b, "gzip", main.CONFIG))
+        sizes = {"json": len(body), "gzip": len(encoding.compress(body, "gzip", main.CONFIG))}
+        if encoding.brotli is not None:
+            case(f"encode_fast+br[{name}]", lambda b=body: encoding.compress(b, "br", main.CONFIG))
+            sizes["br"] = len(encoding.compress(body, "br", main.CONFIG))
+        results[f"response_bytes[{name}]"] = sizes
+        print(f"[bench] micro response_bytes[{name}]: {sizes}")
+
+
+def _summary(r: Dict[str, Any]) -> str:
+    if "latency_us" not in r:
+        return str(r)
+    lat = r["latency_us"]
+    return f"{r['ops_per_s']}/s p50={lat['p50']}us p99={lat['p99']}us"
@@ -0,0 +1,84 @@
+from __future__ import annotations
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# One local HTTP server standing in for both remote providers, so the gemini
+# and hf_api modes can be benchmarked offline. Paths containing
+# "generateContent" get a Gemini-shaped body, everything else the HF
+# Inference API shape; streaming requests get server-sent events.
+
+ANSWER = (
+    "plaintiff_wins\n\nThe record clearly indicates a breach of the delivery terms. "
+    "The defendant's defenses appear weak and the damages are well-supported by the invoices."
+)
+
+
+class MockProviders:
+    def __init__(self, latency_s: float = 0.05, answer: str = ANSWER, chunks: int = 8):
+        self.latency_s = latency_s
+        self.answer = answer
+        self.chunks = chunks
+        self.hits = 0
+        self._lock = threading.Lock()
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"null") if length else None
+                with mock._lock:
+                    mock.hits += 1
+                gemini = "generateContent" in self.path
+                if "streamGenerateContent" in self.path or (isinstance(payload, dict) and payload.get("stream")):
+                    return self._stream(gemini)
+                if mock.latency_s:
+                    time.sleep(mock.latency_s)
+                if gemini:
+                    body = {"candidates": [{"content": {"parts": [{"text": mock.answer}]}}]}
+                else:
+                    body = [{"generated_text": mock.answer}]
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, gemini: bool):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = mock.answer.split(" ")
+                step = max(1, len(words) // mock.chunks)
+                for i in range(0, len(words), step):
+                    piece = " ".join(words[i:i + step]) + " "
+                    if gemini:
+                        event = {"candidates": [{"content": {"parts": [{"text": piece}]}}]}
+                    else:
+                        event = {"token": {"text": piece}}
+                    time.sleep(mock.latency_s / mock.chunks)
+                    chunk = f"data: {json.dumps(event)}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "MockProviders":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
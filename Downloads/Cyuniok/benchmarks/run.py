@@ -0,0 +1,101 @@
+"""Offline benchmark suite for the predictor API.
+
+    python -m benchmarks.run                      # startup + micro + load, all modes
+    python -m benchmarks.run --suite micro --quick
+    python -m benchmarks.compare benchmarks/results/A.json benchmarks/results/B.json
+
+Remote providers (gemini, hf_api) are served by a local mock with fixed
+latency; hf, zeroshot and llm use tiny randomly initialised models built
+into benchmarks/.cache (skipped when torch/transformers are missing).
+Results go to benchmarks/results/<timestamp>-<commit>.json.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from . import load, micro, startup, tiny_models
+from .common import RESULTS_DIR, environment, load_texts, rss_mb
+from .mock_servers import MockProviders
+
+ALL_MODES = ["sklearn", "gemini", "hf_api", "hf", "zeroshot", "llm"]
+LOCAL_TORCH_MODES = {"hf", "zeroshot", "llm"}
+
+
+def _bench_config(mock_url: str, tiny: Dict[str, str] | None) -> Dict[str, Any]:
+    config: Dict[str, Any] = {
+        "model_type": "sklearn",
+        "gemini_base_url": mock_url,
+        "hf_api_base_url": mock_url,
+        "http_max_retries": 0,
+        "request_log_file": os.devnull,  # keep the logging cost, drop the output
+        # The load suite cycles a few texts; with the cache on it would measure
+        # cache hits. load.run has a separate cache-hit scenario.
+        "prediction_cache_size": 0,
+        "near_dup_threshold": 0,
+    }
+    config.update(tiny or {})
+    return config
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--suite", default="startup,micro,load", help="comma-separated: startup, micro, load")
+    ap.add_argument("--modes", default=",".join(ALL_MODES), help="modes for the load suite")
+    ap.add_argument("--seconds", type=float, default=2.0, help="time per microbenchmark")
+    ap.add_argument("--load-seconds", type=float, default=10.0, help="time per load scenario")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--remote-latency-ms", type=float, default=50.0, help="mock provider latency")
+    ap.add_argument("--no-tiny", action="store_true", help="skip the tiny torch models")
+    ap.add_argument("--quick", action="store_true", help="short runs, for smoke testing")
+    ap.add_argument("--out", help="output JSON path (default: benchmarks/results/...)")
+    args = ap.parse_args(argv)
+    if args.quick:
+        args.seconds, args.load_seconds = 0.2, 1.0
+
+    suites = {s.strip() for s in args.suite.split(",") if s.strip()}
+    texts = load_texts()
+    tiny = None if args.no_tiny else tiny_models.build([t for ts in texts.values() for t in ts])
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    if tiny is None:
+        modes = [m for m in modes if m not in LOCAL_TORCH_MODES]
+    env = environment()
+    result: Dict[str, Any] = {
+        "env": env,
+        "settings": {**vars(args), "modes": modes, "tiny_models": tiny is not None},
+        "text_chars": {k: sum(len(t) for t in v) // len(v) for k, v in texts.items()},
+    }
+
+    with MockProviders(latency_s=args.remote_latency_ms / 1000) as mock, tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "config.json"
+        config_path.write_text(json.dumps(_bench_config(mock.url, tiny), indent=2), encoding="utf-8")
+        secrets = {"GEMINI_API_KEY": "bench", "HF_TOKEN": "bench", "FEEDBACK_PATH": str(Path(tmp) / "feedback.csv")}
+
+        if "startup" in suites:
+            result["startup"] = startup.run(str(config_path), runs=1 if args.quick else 5)
+
+        if "micro" in suites:
+            # backend.main reads CONFIG_PATH at import time
+            os.environ.update(secrets, CONFIG_PATH=str(config_path))
+            from backend import main as app_main
+            result["micro"] = micro.run(app_main, texts, tiny, args.seconds)
+            result["micro_rss"] = rss_mb()
+
+        if "load" in suites:
+            with load.Server(str(config_path), secrets) as server:
+                result["load"] = load.run(server, texts, modes, args.concurrency, args.load_seconds)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{env['commit'] or 'nogit'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"[bench] wrote {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+from __future__ import annotations
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+from .common import ROOT
+
+# Cold-start report: what `import backend.main` costs (python -X importtime,
+# median of a few fresh interpreters) and what the first sklearn request
+# pays once the deferred imports and the model load happen.
+
+HEAVY = ("sklearn", "scipy", "joblib", "numpy", "torch", "transformers", "httpx")
+
+
+def _importtime(env: Dict[str, str]) -> List[Dict[str, Any]]:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.main"],
+                          cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cum_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        rows.append({"module": parts[2].strip(), "depth": (len(parts[2]) - len(parts[2].lstrip())) // 2,
+                     "self_ms": self_us / 1000, "cumulative_ms": cum_us / 1000})
+    return rows
+
+
+def _first_load_s(env: Dict[str, str]) -> float:
+    code = ("import time, backend.main as m; t = time.perf_counter(); m._ensure_sklearn_loaded(); "
+            "print(time.perf_counter() - t)")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def run(config_path: str, runs: int = 3, top: int = 15) -> Dict[str, Any]:
+    env = {**os.environ, "CONFIG_PATH": config_path}
+    samples = [_importtime(env) for _ in range(max(1, runs))]
+    totals = [next((r["cumulative_ms"] for r in rows if r["module"] == "backend.main"), 0.0) for rows in samples]
+    last = samples[-1]
+    direct = [r for r in last if r["depth"] == 1 and r["module"] != "backend.main"]
+    loaded = {r["module"].split(".")[0] for r in last}
+    result = {
+        "import_backend_main_ms": round(statistics.median(totals), 1),
+        "import_runs_ms": [round(t, 1) for t in totals],
+        "heavy_modules_loaded": [m for m in HEAVY if m in loaded],
+        "top_imports": [
+            {"module": r["module"], "cumulative_ms": round(r["cumulative_ms"], 1), "self_ms": round(r["self_ms"], 1)}
+            for r in sorted(direct, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+        ],
+        "first_sklearn_load_s": round(_first_load_s(env), 3),
+    }
+    print(f"[bench] startup import backend.main: {result['import_backend_main_ms']} ms "
+          f"(heavy: {result['heavy_modules_loaded'] or 'none'}); first sklearn load {result['first_sklearn_load_s']} s")
+    return result
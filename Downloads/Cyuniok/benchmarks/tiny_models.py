@@ -0,0 +1,70 @@
+from __future__ import annotations
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .common import CACHE_DIR
+
+# Randomly initialised, few-layer stand-ins for the hf, zeroshot and llm
+# backends, built once into benchmarks/.cache from the dataset vocabulary.
+# Their predictions are meaningless; what they preserve is the code path
+# (tokenize -> forward -> explain/decode) so overhead outside the model shows
+# up in the numbers without downloading multi-GB checkpoints.
+
+HIDDEN = 64
+LAYERS = 2
+_VERSION = "1"
+
+
+def _vocab(texts: List[str], size: int = 4000) -> List[str]:
+    words = Counter(w for t in texts for w in re.findall(r"[a-z]+|[0-9]+|[^\sa-z0-9]", t.lower()))
+    special = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    return special + [w for w, _ in words.most_common(size)]
+
+
+def build(texts: List[str], cache_dir: Path = CACHE_DIR) -> Optional[Dict[str, str]]:
+    """Return config overrides pointing at the tiny models, or None without torch."""
+    try:
+        import torch
+        from transformers import (
+            BertConfig, BertForSequenceClassification, BertTokenizerFast,
+            GPT2Config, GPT2LMHeadModel,
+        )
+    except ImportError:
+        return None
+    root = cache_dir / f"tiny-v{_VERSION}"
+    paths = {"hf_model_dir": root / "hf", "zsh_model": root / "nli", "llm_model": root / "llm"}
+    overrides = {k: str(v) for k, v in paths.items()}
+    if (root / "READY").exists():
+        return overrides
+
+    root.mkdir(parents=True, exist_ok=True)
+    vocab = _vocab(texts)
+    vocab_file = root / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab) + "\n", encoding="utf-8")
+    tokenizer = BertTokenizerFast(vocab_file=str(vocab_file), do_lower_case=True)
+    torch.manual_seed(0)
+
+    def bert(id2label: Dict[int, str]) -> BertForSequenceClassification:
+        return BertForSequenceClassification(BertConfig(
+            vocab_size=len(vocab), hidden_size=HIDDEN, num_hidden_layers=LAYERS,
+            num_attention_heads=2, intermediate_size=HIDDEN * 2, max_position_embeddings=512,
+            num_labels=len(id2label), id2label=id2label, label2id={v: k for k, v in id2label.items()},
+        ))
+
+    for key, model in (
+        ("hf_model_dir", bert({0: "defendant_wins", 1: "plaintiff_wins"})),
+        # Zero-shot pipelines need an NLI head with an "entailment" label
+        ("zsh_model", bert({0: "contradiction", 1: "neutral", 2: "entailment"})),
+        ("llm_model", GPT2LMHeadModel(GPT2Config(
+            vocab_size=len(vocab), n_positions=4096, n_embd=HIDDEN, n_layer=LAYERS, n_head=2,
+            bos_token_id=tokenizer.cls_token_id, eos_token_id=tokenizer.sep_token_id,
+            pad_token_id=tokenizer.pad_token_id,
+        ))),
+    ):
+        model.eval()
+        model.save_pretrained(paths[key])
+        tokenizer.save_pretrained(paths[key])
+    (root / "READY").write_text("ok", encoding="utf-8")
+    return overrides
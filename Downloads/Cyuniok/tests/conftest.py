@@ -0,0 +1,103 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubServer:
+    """Local stand-in for the Gemini / HF Inference APIs.
+
+    `plan` is consumed first (one (status, body, delay) per request); after
+    that every request sleeps `latency` seconds and fails with 503 at
+    `error_rate`, otherwise returns `body`. Streaming requests (Gemini's
+    streamGenerateContent or an HF payload with "stream": true) get
+    `sse_events` back as chunked server-sent events, `latency` apart.
+    """
+
+    def __init__(self):
+        self.plan = []
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.body = [{"generated_text": "plaintiff_wins"}]
+        self.sse_events = []
+        self.hits = 0
+        self.connections = set()
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                payload = json.loads(raw or b"null")
+                with stub._lock:
+                    stub.hits += 1
+                    stub.connections.add(self.client_address)
+                    stub.requests.append((self.path, payload))
+                    step = stub.plan.pop(0) if stub.plan else None
+                streaming = "stream" in self.path or (isinstance(payload, dict) and payload.get("stream"))
+                if step is None and streaming and stub.sse_events:
+                    return self._send_sse()
+                if step is not None:
+                    status, body, delay = step
+                else:
+                    status = 503 if random.random() < stub.error_rate else 200
+                    body, delay = (stub.body if status == 200 else {"error": "overloaded"}), stub.latency
+                if delay:
+                    time.sleep(delay)
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_sse(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in stub.sse_events:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    chunk = f"data: {json.dumps(event)}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def fresh_prediction_cache():
+    # Repeated texts across tests would otherwise be served from the cache
+    from backend import prediction_cache
+    prediction_cache.CACHE.clear()
+    yield
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import admission
+from backend import main
+from backend.main import app
+
+client = TestClient(app)
+
+
+def test_gate_queues_then_sheds():
+    async def run():
+        gate = admission.AdmissionGate("llm", concurrency=1, queue=1, timeout_s=5)
+        first = await gate.acquire()
+        waiter = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        assert gate.active == 1 and gate.queued == 1
+        # Queue is full: the third caller is rejected immediately
+        with pytest.raises(admission.Rejected) as exc:
+            await gate.acquire()
+        assert exc.value.status == 429 and exc.value.retry_after >= 1
+        first.release()
+        second = await waiter
+        assert gate.active == 1 and gate.queued == 0
+        second.release()
+        second.release()  # idempotent
+        assert gate.active == 0
+        return gate.stats()
+
+    stats = asyncio.run(run())
+    assert stats["admitted"] == 2 and stats["rejected_queue_full"] == 1
+
+
+def test_gate_queue_deadline():
+    async def run():
+        gate = admission.AdmissionGate("zeroshot", concurrency=1, queue=4, timeout_s=0.05)
+        held = await gate.acquire()
+        with pytest.raises(admission.Rejected) as exc:
+            await gate.acquire()
+        assert exc.value.status == 503
+        held.release()
+        # The timed-out waiter does not swallow the freed slot
+        again = await gate.acquire()
+        again.release()
+        return gate
+
+    gate = asyncio.run(run())
+    assert gate.rejected_timeout == 1 and gate.active == 0
+
+
+def test_predict_sheds_with_retry_after(monkeypatch):
+    monkeypatch.setitem(main.CONFIG, "model_type", "sklearn")
+    monkeypatch.setitem(main.CONFIG, "admission", {"sklearn": {"concurrency": 1, "queue": 0, "timeout_s": 1}})
+    monkeypatch.setattr(admission, "_gates", {})
+    gate = admission.get_gate("sklearn", main.CONFIG)
+    gate.active = 1  # simulate an inference already in flight
+    r = client.post('/predict', json={'summary': 'Breach of contract.'})
+    assert r.status_code == 429
+    assert int(r.headers['retry-after']) >= 1
+    gate.active = 0
+    r = client.post('/predict', json={'summary': 'Breach of contract.'})
+    assert r.status_code == 200
+    stats = client.get('/metrics/admission').json()['admission']['sklearn']
+    assert stats['rejected_queue_full'] == 1 and stats['admitted'] == 1 and stats['active'] == 0
+
+
+def test_batch_scores_every_item():
+    r = client.post('/predict/batch', json={'summaries': ['Breach of contract.', '', 'Motion to dismiss granted.']})
+    assert r.status_code == 200
+    items = r.json()['items']
+    assert len(items) == 3
+    assert items[0]['prediction'] and items[2]['prediction'] and items[1]['prediction'] == ''
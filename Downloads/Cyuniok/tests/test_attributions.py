@@ -0,0 +1,35 @@
+import pytest
+
+from backend import attributions
+
+
+def test_top_words_merges_pieces_and_repeats():
+    text = "Negligence, negligence and damages."
+    # [CLS] neg ##ligence , neg ##ligence and damage ##s . [SEP]
+    offsets = [(0, 0), (0, 3), (3, 10), (10, 11), (12, 15), (15, 22), (23, 26), (27, 33), (33, 34), (34, 35), (0, 0)]
+    word_ids = [None, 0, 0, 1, 2, 2, 3, 4, 4, 5, None]
+    scores = [9.0, 0.2, 0.1, 5.0, 0.1, 0.1, -0.5, 0.3, 0.1, 4.0, 9.0]
+    # special tokens and punctuation are ignored; "and" pulls the other way
+    assert attributions.top_words(text, offsets, word_ids, scores, k=8) == ["Negligence", "damages"]
+    assert attributions.top_words(text, offsets, word_ids, scores, k=1) == ["Negligence"]
+
+
+def test_top_tokens_fallback():
+    tokens = ["<s>", "Ġbreach", "Ġof", "Ġcontract", "</s>"]
+    assert attributions.top_tokens(tokens, ["<s>", "</s>"], [3.0, 0.9, -0.1, 0.5, 3.0], k=2) == ["breach", "contract"]
+
+
+def test_gradient_x_input_on_a_tiny_model():
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    torch.manual_seed(0)
+    model = transformers.BertForSequenceClassification(transformers.BertConfig(
+        vocab_size=50, hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32, num_labels=2,
+    )).eval()
+    inputs = {"input_ids": torch.tensor([[2, 7, 9, 11, 3]]), "attention_mask": torch.ones(1, 5, dtype=torch.long)}
+    logits, scores = attributions.forward_with_attributions(model, inputs)
+    with torch.no_grad():
+        plain = model(**inputs).logits[0]
+    assert torch.allclose(logits, plain, atol=1e-5)  # same forward, nothing changed
+    assert scores.shape == (5,)
+    assert all(p.grad is None for p in model.parameters())
@@ -0,0 +1,42 @@
+from benchmarks.common import bench, percentiles
+from benchmarks.compare import compare
+
+
+def test_percentiles():
+    samples = [i / 1000 for i in range(1, 101)]  # 1..100 ms
+    p = percentiles(samples)
+    assert p["p50"] == 51.0 and p["p95"] == 96.0 and p["p99"] == 100.0 and p["max"] == 100.0
+    assert percentiles([])["p99"] == 0.0
+
+
+def test_bench_reports_latency():
+    r = bench(lambda: sum(range(100)), seconds=0.01, min_calls=5)
+    assert r["calls"] >= 5 and r["ops_per_s"] > 0
+    assert r["latency_us"]["p50"] <= r["latency_us"]["p99"]
+
+
+def test_compare_flags_regressions():
+    old = {"micro": {"f": {"calls": 10, "ops_per_s": 100.0, "latency_us": {"p50": 10.0, "p99": 20.0}}},
+           "load": {"/predict[sklearn]": {"throughput_rps": 50.0, "latency_ms": {"p50": 5.0, "p99": 9.0}}}}
+    new = {"micro": {"f": {"calls": 10, "ops_per_s": 80.0, "latency_us": {"p50": 12.5, "p99": 20.0}}},
+           "load": {"/predict[sklearn]": {"throughput_rps": 51.0, "latency_ms": {"p50": 5.1, "p99": 9.0}}}}
+    lines, regressions = compare(old, new, threshold=10)
+    assert regressions == 1
+    assert any("micro f" in line and "REGRESSION" in line for line in lines)
+
+
+def test_autotune_grid_and_recommendation():
+    from benchmarks.autotune import grid, recommend
+    assert grid([1, 2, 4], [1, 2], cores=4) == [
+        {"workers": 1, "threads": 1}, {"workers": 1, "threads": 2}, {"workers": 2, "threads": 1},
+        {"workers": 2, "threads": 2}, {"workers": 4, "threads": 1}]
+    assert len(grid([1, 2, 4], [1, 2], cores=4, oversubscribe=True)) == 6
+
+    def r(w, t, rps, p95):
+        return {"workers": w, "threads": t, "ok": 10, "throughput_rps": rps, "latency_ms": {"p95": p95}}
+
+    results = [r(1, 4, 100.0, 80.0), r(2, 2, 160.0, 150.0), r(4, 1, 158.0, 120.0), r(4, 2, 300.0, 900.0)]
+    best = recommend(results, slo_p95_ms=200)
+    assert (best["workers"], best["threads"], best["meets_slo"]) == (4, 1, True)  # 158 ~ 160, fewer cores
+    assert recommend([r(4, 2, 300.0, 900.0), r(1, 1, 50.0, 400.0)], 200)["threads"] == 1
+    assert recommend([{"workers": 1, "threads": 1, "error": "boom"}], 200) is None
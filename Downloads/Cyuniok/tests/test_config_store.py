@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from backend import config_store
+
+DEFAULTS = {"model_type": "sklearn", "zsh_labels": ["plaintiff_wins", "defendant_wins"], "hf_max_len": 512,
+            "weights_mmap": False, "shadow_config": {}, "near_dup_threshold": 0.0, "config_watch_s": 0.05}
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    # Make sure the stamp moves even on coarse-mtime filesystems
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_parse_normalises_and_validates(capsys):
+    snap = config_store.parse({"zsh_labels": " a, b ,,c", "hf_max_len": "256", "weights_mmap": "yes",
+                               "near_dup_threshold": "oops", "shadow_config": {"hf_model_dir": "x"}}, DEFAULTS)
+    assert snap["zsh_labels"] == ("a", "b", "c")
+    assert snap["hf_max_len"] == 256 and snap["weights_mmap"] is True
+    assert snap["near_dup_threshold"] == 0.0 and "near_dup_threshold" in capsys.readouterr().out
+    with pytest.raises(TypeError):
+        snap["shadow_config"]["hf_model_dir"] = "y"  # frozen
+    assert snap.to_dict()["zsh_labels"] == ["a", "b", "c"]
+    assert json.loads(json.dumps(snap.to_dict()))["shadow_config"] == {"hf_model_dir": "x"}
+
+
+def test_load_only_reparses_on_change(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    store = config_store.ConfigStore(path, DEFAULTS)
+    assert store.load() is False and json.loads(path.read_text())["model_type"] == "sklearn"  # defaults written
+    _write(path, {"model_type": "hf"})
+    assert store.load() is True and store.current()["model_type"] == "hf"
+    calls = []
+    monkeypatch.setattr(config_store, "parse", lambda *a, **k: calls.append(a))
+    assert store.load() is False and calls == []
+    monkeypatch.undo()
+    path.write_text("{not json", encoding="utf-8")
+    assert store.load() is False and store.current()["model_type"] == "hf"  # last good snapshot kept
+
+
+def test_update_persists_atomically_and_view_reads_pinned(tmp_path):
+    path = tmp_path / "config.json"
+    store = config_store.ConfigStore(path, DEFAULTS)
+    view = config_store.ConfigView(store)
+    old = config_store.pin(store.current())
+    try:
+        store.update({"model_type": "gemini"})
+        assert view["model_type"] == "sklearn" and view.snapshot() is old  # the pinned request is unaffected
+        assert store.current()["model_type"] == "gemini"
+        assert json.loads(path.read_text())["model_type"] == "gemini" and not (tmp_path / "config.json.tmp").exists()
+        view["model_type"] = "hf"  # the writer sees its own change
+        assert view["model_type"] == "hf" and json.loads(path.read_text())["model_type"] == "gemini"
+    finally:
+        config_store.pin(None)
+
+
+def test_watcher_swaps_in_file_edits(tmp_path):
+    path = tmp_path / "config.json"
+    store = config_store.ConfigStore(path, DEFAULTS)
+    store.load()
+    seen, stop = set(), threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            snap = store.current()
+            seen.add((snap["model_type"], snap["hf_max_len"]))
+
+    t = threading.Thread(target=reader)
+    t.start()
+    store.start_watcher()
+    try:
+        _write(path, {"model_type": "hf", "hf_max_len": 128})
+        deadline = time.monotonic() + 5
+        while store.current()["model_type"] != "hf" and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        store.stop_watcher()
+        stop.set()
+        t.join()
+    assert store.current()["hf_max_len"] == 128
+    assert seen <= {("sklearn", 512), ("hf", 128)}  # never half of an update
+
+
+def test_overrides_survive_reloads_and_stay_out_of_the_file(tmp_path):
+    path = tmp_path / "config.json"
+    store = config_store.ConfigStore(path, DEFAULTS)
+    store.load()
+    view = config_store.ConfigView(store)
+    view["hf_max_len"] = 128  # e.g. a CLI flag
+    _write(path, {"model_type": "hf"})  # an unrelated edit
+    assert store.load() is True
+    assert store.current()["hf_max_len"] == 128 and store.current()["model_type"] == "hf"
+    store.update({"weights_mmap": True})  # PUT /config
+    on_disk = json.loads(path.read_text())
+    assert on_disk["hf_max_len"] == 512 and on_disk["weights_mmap"] is True and on_disk["model_type"] == "hf"
+    assert store.current()["hf_max_len"] == 128
+    store.update({"hf_max_len": 256})  # an explicit API change replaces the override
+    assert store.current()["hf_max_len"] == 256 and json.loads(path.read_text())["hf_max_len"] == 256
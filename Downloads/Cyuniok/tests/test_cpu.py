@@ -0,0 +1,22 @@
+from backend import cpu
+
+
+def test_core_slices_cover_the_cores_once():
+    cores = list(range(10))
+    slices = [cpu.core_slice(cores, i, 3) for i in range(3)]
+    assert slices == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert [cpu.core_slice([0, 1], i, 4) for i in range(4)] == [[0], [1], [0], [1]]
+
+
+def test_intra_threads_share_the_cores(monkeypatch):
+    monkeypatch.setattr(cpu, "available_cores", lambda: list(range(8)))
+    monkeypatch.setitem(cpu._worker, "workers", 4)
+    monkeypatch.setitem(cpu._worker, "pinned", False)
+    assert cpu.intra_threads({"torch_threads": 0}) == 2
+    assert cpu.intra_threads({"torch_threads": 3}) == 3
+    monkeypatch.setitem(cpu._worker, "pinned", True)  # the mask is already this worker's share
+    assert cpu.intra_threads({}) == 8
+    monkeypatch.setitem(cpu._worker, "workers", None)
+    monkeypatch.setenv("WEB_CONCURRENCY", "16")
+    monkeypatch.setitem(cpu._worker, "pinned", False)
+    assert cpu.intra_threads({}) == 1
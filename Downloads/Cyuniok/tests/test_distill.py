@@ -0,0 +1,38 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("datasets")
+
+import train_hf  # noqa: E402
+
+
+def _teacher(layers=6):
+    torch.manual_seed(0)
+    return transformers.BertForSequenceClassification(transformers.BertConfig(
+        vocab_size=50, hidden_size=16, num_hidden_layers=layers, num_attention_heads=2, intermediate_size=32,
+        num_labels=2, id2label={0: "defendant_wins", 1: "plaintiff_wins"},
+        label2id={"defendant_wins": 0, "plaintiff_wins": 1},
+    )).eval()
+
+
+def test_student_layers_are_evenly_spaced():
+    assert train_hf.student_layers(12, 4) == [2, 5, 8, 11]
+    assert train_hf.student_layers(12, 6) == [1, 3, 5, 7, 9, 11]
+    assert train_hf.student_layers(4, 8) == [0, 1, 2, 3]
+
+
+def test_student_starts_from_teacher_layers():
+    teacher = _teacher()
+    student = train_hf.make_student(teacher, 2)
+    assert student.config.num_hidden_layers == 2 and student.config.id2label == teacher.config.id2label
+    t, s = teacher.state_dict(), student.state_dict()
+    key = "bert.encoder.layer.{}.attention.self.query.weight"
+    assert torch.equal(s[key.format(0)], t[key.format(2)])
+    assert torch.equal(s[key.format(1)], t[key.format(5)])
+    assert torch.equal(s["classifier.weight"], t["classifier.weight"])
+
+
+def test_narrow_student_is_fresh():
+    student = train_hf.make_student(_teacher(), 2, hidden_size=64)
+    assert student.config.hidden_size == 64 and student.config.num_attention_heads == 1
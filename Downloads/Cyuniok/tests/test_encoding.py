@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend import encoding, main
+
+TEXT = "The tenant proved breach of contract and damages for unpaid rent."
+
+
+def test_negotiate_and_dumps(monkeypatch):
+    monkeypatch.setattr(encoding, "brotli", None)
+    assert encoding.negotiate("gzip, deflate") == "gzip"
+    assert encoding.negotiate("gzip;q=0, deflate") is None
+    assert encoding.negotiate("*") == "gzip"
+    assert encoding.negotiate("") is None
+    monkeypatch.setattr(encoding, "brotli", object())
+    assert encoding.negotiate("gzip, br") == "br"
+    assert encoding.negotiate("gzip, br;q=0.5") == "gzip"
+    assert json.loads(encoding.dumps({"p": np.float64(0.5), "s": "ü"})) == {"p": 0.5, "s": "ü"}
+
+
+def test_explain_for_fields():
+    assert encoding.explain_for("full", None) == "full"
+    assert encoding.explain_for("full", frozenset({"prediction"})) == "none"
+    assert encoding.explain_for("full", frozenset({"top_features"})) == "features"
+    assert encoding.explain_for("features", frozenset({"reason"})) == "features"
+
+
+def test_predict_field_selection():
+    client = TestClient(main.app)
+    r = client.post('/predict?fields=prediction,confidence', json={'summary': TEXT, 'mode': 'sklearn'})
+    assert r.status_code == 200 and set(r.json()) == {"prediction", "confidence"}
+    r = client.post('/predict?fields=prediction,bogus', json={'summary': TEXT, 'mode': 'sklearn'})
+    assert r.status_code == 400 and "bogus" in r.json()["detail"]
+    r = client.post('/predict/batch?fields=prediction', json={'summaries': [TEXT, ""], 'explain': 'full'})
+    assert r.status_code == 200 and r.json() == {"items": [{"prediction": r.json()["items"][0]["prediction"]},
+                                                          {"prediction": ""}]}
+
+
+def test_responses_are_compressed_when_negotiated(monkeypatch):
+    client = TestClient(main.app)
+    monkeypatch.setitem(main.CONFIG, "compress_min_bytes", 1)
+    monkeypatch.setattr(encoding, "brotli", None)
+    body = {'summaries': [TEXT] * 50, 'explain': 'full'}
+    plain = client.post('/predict/batch', json=body, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    packed = client.post('/predict/batch', json=body, headers={"Accept-Encoding": "gzip"})
+    assert packed.headers["content-encoding"] == "gzip" and packed.headers["vary"] == "Accept-Encoding"
+    assert packed.json() == plain.json()  # the client decodes it transparently
+    assert int(packed.headers["content-length"]) < len(plain.content) / 3
+    monkeypatch.setitem(main.CONFIG, "compress_min_bytes", 0)
+    assert "content-encoding" not in client.post('/predict/batch', json=body,
+                                                 headers={"Accept-Encoding": "gzip"}).headers
@@ -0,0 +1,48 @@
+from fastapi.testclient import TestClient
+
+from backend import main, prediction_cache
+
+client = TestClient(main.app)
+TEXT = "The tenant proved breach of contract and damages for unpaid rent."
+
+
+def _predict(**extra):
+    return client.post('/predict', json={'summary': TEXT, 'mode': 'sklearn', **extra})
+
+
+def test_explain_levels():
+    none = _predict(explain="none").json()
+    assert none["top_features"] is None and none["reason"] is None
+    features = _predict(explain="features").json()
+    assert features["top_features"] and features["reason"] is None
+    full = _predict(explain="full").json()
+    assert full["top_features"] and full["reason"]
+    # every level agrees on the label
+    assert none["prediction"] == features["prediction"] == full["prediction"]
+    assert _predict(explain="verbose").status_code == 400
+
+
+def test_repeat_requests_hit_the_cache():
+    _predict(explain="full")
+    hits = prediction_cache.CACHE.stats()["hits"]
+    # a cheaper level is served from the richer entry
+    assert _predict(explain="features").status_code == 200
+    assert prediction_cache.CACHE.stats()["hits"] == hits + 1
+    assert "predictor_prediction_cache_hits_total" in client.get('/metrics').text
+
+
+def test_deferred_reason():
+    body = _predict(explain="full", defer_reason=True).json()
+    assert body["top_features"] and body["reason"] is None and body["reason_id"]
+    reason = client.get(f'/predict/reason/{body["reason_id"]}').json()
+    assert reason["reason"] and reason["prediction"] == body["prediction"]
+    assert client.get('/predict/reason/0123456789abcdef').status_code == 404
+
+
+def test_batch_label_only():
+    r = client.post('/predict/batch', json={'summaries': [TEXT, '', 'Claim dismissed for lack of jurisdiction.'], 'explain': 'none'})
+    assert r.status_code == 200
+    items = r.json()["items"]
+    assert items[1]["prediction"] == ""
+    assert all(i["top_features"] is None and i["reason"] is None for i in items)
+    assert items[0]["prediction"] == _predict(explain="none").json()["prediction"]
@@ -0,0 +1,102 @@
+import multiprocessing as mp
+import threading
+
+from fastapi.testclient import TestClient
+
+import train_model
+from backend import feedback_store, main
+
+client = TestClient(main.app)
+
+
+def _hammer(db, worker, n):
+    store = feedback_store.FeedbackStore(db, flush_ms=5, batch=50)
+    for i in range(n):
+        store.add(f"case {worker}-{i}", "plaintiff_wins", "defendant_wins" if i % 2 else "")
+    store.close()
+
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    db = tmp_path / "feedback.db"
+    threads = [threading.Thread(target=_hammer, args=(db, f"t{w}", 200)) for w in range(4)]
+    procs = [mp.get_context("fork").Process(target=_hammer, args=(db, f"p{w}", 200)) for w in range(3)]
+    for t in procs + threads:  # fork before this process has writer threads of its own
+        t.start()
+    for t in threads + procs:
+        t.join()
+    assert all(p.exitcode == 0 for p in procs)
+    stats = feedback_store.FeedbackStore(db).stats()
+    assert stats["rows"] == 7 * 200 and stats["labeled"] == 7 * 100
+
+
+def test_export_is_training_csv(tmp_path):
+    legacy = tmp_path / "feedback.csv"
+    legacy.write_text("summary,predicted,correct_label,notes\nOld case.,plaintiff_wins,defendant_wins,\n")
+    store = feedback_store.FeedbackStore(tmp_path / "feedback.db", legacy_csv=legacy)
+    store.add("Breach of contract.", "defendant_wins", "plaintiff_wins")
+    store.add("Breach of contract.", "plaintiff_wins", "defendant_wins")  # latest label wins
+    store.add("Unlabeled.", "plaintiff_wins")
+    store.close()
+    out = tmp_path / "train.csv"
+    assert feedback_store.export_csv(tmp_path / "feedback.db", out) == 2
+    assert train_model.load_data(out) == [("Old case.", "defendant_wins"), ("Breach of contract.", "defendant_wins")]
+    # the legacy CSV is imported only once
+    feedback_store.FeedbackStore(tmp_path / "feedback.db", legacy_csv=legacy).add("x", "y")
+    assert feedback_store.FeedbackStore(tmp_path / "feedback.db").stats()["rows"] == 4
+
+
+def test_feedback_endpoints(tmp_path, monkeypatch):
+    db = tmp_path / "feedback.db"
+    store = feedback_store.FeedbackStore(db)
+    monkeypatch.setattr(main, "FEEDBACK_STORE", store)
+    monkeypatch.setattr(main, "FEEDBACK_DB_PATH", db)
+    r = client.post('/feedback', json={'summary': 'Tenant wins.', 'predicted': 'defendant_wins', 'correct_label': 'plaintiff_wins'})
+    assert r.json() == {"ok": True}
+    export = client.get('/feedback/export')
+    assert export.status_code == 200
+    assert export.text.splitlines() == ["summary,outcome", "Tenant wins.,plaintiff_wins"]
+    assert client.get('/feedback/stats').json()["rows"] == 1
+    store.close()
+
+
+def test_full_queue_is_rejected(tmp_path, monkeypatch):
+    store = feedback_store.FeedbackStore(tmp_path / "feedback.db", flush_ms=60000, batch=10**6, max_queue=1)
+    monkeypatch.setattr(main, "FEEDBACK_STORE", store)
+    body = {'summary': 's', 'predicted': 'p'}
+    assert client.post('/feedback', json=body).status_code == 200
+    r = client.post('/feedback', json=body)
+    assert r.status_code == 503 and r.headers["retry-after"] == "1"
+    store.close()
+    assert store.stats()["rows"] == 1  # close() flushes what was queued
+
+
+def test_incremental_analytics_match_a_rebuild(tmp_path, monkeypatch):
+    from backend import feedback_analytics
+
+    db = tmp_path / "feedback.db"
+    store = feedback_store.FeedbackStore(db, flush_ms=5, batch=2)
+    store.add("Lease breach and unpaid rent.", "defendant_wins", "plaintiff_wins", mode="sklearn", model="m1")
+    store.add("Unpaid rent again.", "defendant_wins", "plaintiff_wins", mode="sklearn", model="m1")
+    store.add("Dismissed on limitations.", "defendant_wins", "", mode="sklearn", model="m1")  # confirmed
+    store.add("Negligence verdict.", "plaintiff_wins", "plaintiff_wins", mode="hf", model="models/hf")
+    store.flush()
+    report = store.analytics()
+    m1 = report["sklearn"]["models"]["m1"]
+    assert m1["total"] == 3 and m1["accuracy"] == round(1 / 3, 4)
+    assert m1["confusion"] == {"plaintiff_wins": {"defendant_wins": 2}, "defendant_wins": {"defendant_wins": 1}}
+    assert report["sklearn"]["correction_rate"]["1h"] == {"total": 3, "corrected": 2, "rate": round(2 / 3, 4)}
+    assert report["sklearn"]["misclassified_terms"][:2] == [{"term": "rent", "count": 2}, {"term": "unpaid", "count": 2}]
+    assert report["hf"]["models"]["models/hf"]["accuracy"] == 1.0
+    assert list(store.analytics(mode="hf")) == ["hf"]
+    store.close()
+
+    conn = feedback_store.connect(db)
+    conn.execute("BEGIN IMMEDIATE")
+    feedback_analytics.rebuild(conn)
+    conn.execute("COMMIT")
+    assert feedback_analytics.report(conn) == report
+    conn.close()
+
+    monkeypatch.setattr(main, "FEEDBACK_STORE", feedback_store.FeedbackStore(db))
+    r = client.get('/feedback/analytics?mode=sklearn&top=1')
+    assert r.json()["modes"]["sklearn"]["misclassified_terms"] == [{"term": "rent", "count": 2}]
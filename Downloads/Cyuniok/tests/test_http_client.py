@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import http_client
+from backend import main
+from backend.main import app
+
+client = TestClient(app)
+
+GEMINI_OK = {"candidates": [{"content": {"parts": [{"text": "The outcome is overwhelmingly clear.\n\ndefendant_wins\n\nReasoning: the claim is time-barred."}]}}]}
+
+
+def _provider(**kw):
+    kw.setdefault("backoff_base", 0.01)
+    kw.setdefault("backoff_max", 0.05)
+    return http_client.ProviderClient("stub", **kw)
+
+
+def test_retries_on_503_then_succeeds(stub_server):
+    stub_server.plan = [(503, {"error": "busy"}, 0), (429, {"error": "slow down"}, 0), (200, {"ok": 1}, 0)]
+    c = _provider(max_retries=2)
+    out = asyncio.run(c.post_json(stub_server.url + "/x", {"a": 1}))
+    assert out == {"ok": 1}
+    assert stub_server.hits == 3
+    assert c.breaker.state == "closed"
+
+
+def test_keepalive_reuses_connection(stub_server):
+    c = _provider()
+
+    async def run():
+        for _ in range(5):
+            await c.post_json(stub_server.url + "/x", {})
+        await c.aclose()
+
+    asyncio.run(run())
+    assert stub_server.hits == 5
+    assert len(stub_server.connections) == 1
+
+
+def test_breaker_opens_and_fails_fast(stub_server):
+    stub_server.error_rate = 1.0
+    c = _provider(max_retries=0, breaker=http_client.CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(http_client.RemoteHTTPError):
+                await c.post_json(stub_server.url + "/x", {})
+        with pytest.raises(http_client.CircuitOpenError):
+            await c.post_json(stub_server.url + "/x", {})
+
+    asyncio.run(run())
+    assert c.breaker.state == "open"
+    assert stub_server.hits == 2
+
+
+def test_half_open_trial_closes_breaker(stub_server):
+    br = http_client.CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    br.record_failure()
+    assert br.state == "open"
+    c = _provider(breaker=br)
+    assert asyncio.run(c.post_json(stub_server.url + "/x", {})) is not None
+    assert br.state == "closed"
+
+
+@pytest.fixture
+def gemini_mode(monkeypatch, stub_server):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(http_client, "_clients", {})
+    monkeypatch.setattr(http_client, "_client_settings", {})
+    for k, v in {
+        "model_type": "gemini",
+        "gemini_base_url": stub_server.url,
+        "http_max_retries": 0,
+        "breaker_failures": 1,
+        "breaker_reset_s": 60,
+    }.items():
+        monkeypatch.setitem(main.CONFIG, k, v)
+    return stub_server
+
+
+def test_predict_gemini_via_stub(gemini_mode):
+    gemini_mode.body = GEMINI_OK
+    r = client.post('/predict', json={'summary': 'Suit filed after limitation period expired.'})
+    assert r.status_code == 200
+    assert r.json()['prediction'] == 'defendant_wins'
+    path, body = gemini_mode.requests[0]
+    assert path.startswith('/v1beta/models/') and 'key=test-key' in path
+    assert 'Suit filed' in body['contents'][0]['parts'][0]['text']
+
+
+def test_predict_gemini_open_circuit(gemini_mode, monkeypatch):
+    gemini_mode.error_rate = 1.0
+    r = client.post('/predict', json={'summary': 'Breach of contract claim.'})
+    assert r.status_code == 500
+    # Breaker is now open: no upstream call, local fallback answers
+    r = client.post('/predict', json={'summary': 'Breach of contract claim.'})
+    assert r.status_code == 200
+    assert 'temporarily unavailable' in r.json()['reason']
+    assert gemini_mode.hits == 1
+    # Fail fast instead when fallback is disabled
+    monkeypatch.setitem(main.CONFIG, "remote_fallback", "none")
+    r = client.post('/predict', json={'summary': 'Breach of contract claim.'})
+    assert r.status_code == 503
+    assert int(r.headers['retry-after']) >= 1
+
+
+def test_replaced_clients_are_closed(stub_server, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(http_client, "_clients", {})
+    monkeypatch.setattr(http_client, "_client_settings", {})
+
+    async def run():
+        c = http_client.get_client("gemini", {})
+        await c.post_json(stub_server.url + "/x", {})
+        old = c._client
+        # A config edit changes the settings: the old pool is closed, not left to the GC
+        c2 = http_client.get_client("gemini", {"gemini_timeout_s": 5})
+        assert c2 is not c
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert old.is_closed
+        await c2.aclose()
+
+    asyncio.run(run())
+
+    # Called from another loop, the old client is closed on the loop it belongs to
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        c = _provider()
+        asyncio.run_coroutine_threadsafe(c.post_json(stub_server.url + "/x", {}), loop).result(5)
+        old = c._client
+
+        async def rebind():
+            await c.post_json(stub_server.url + "/x", {})
+            await c.aclose()
+
+        asyncio.run(rebind())
+        for fut in list(http_client._retiring):
+            fut.result(5)
+        assert old.is_closed
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
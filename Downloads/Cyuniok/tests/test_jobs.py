@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from backend import admission, main
+
+TEXTS = ["Breach of contract and damages.", "Dismissed for lack of jurisdiction.", "", "Negligence found by the jury."]
+
+
+def _ndjson(r):
+    return [json.loads(line) for line in r.text.splitlines() if line.strip()]
+
+
+def test_job_streams_all_results(monkeypatch):
+    monkeypatch.setitem(main.CONFIG, "jobs_batch_size", 2)
+    with TestClient(main.app) as client:
+        r = client.post('/jobs', json={'summaries': TEXTS * 5, 'mode': 'sklearn'})
+        assert r.status_code == 202
+        job_id = r.json()["id"]
+        records = _ndjson(client.get(f'/jobs/{job_id}/results'))
+        *items, last = records
+        assert last["done"] and last["status"] == "completed" and last["completed"] == 20
+        assert sorted(i["index"] for i in items) == list(range(20))
+        expected = main._predict_batch_items(TEXTS * 5, "none")
+        assert all(i["prediction"] == expected[i["index"]].prediction for i in items)
+        assert all(i["reason"] is None for i in items)
+        # reconnecting with an offset only replays the tail
+        assert len(_ndjson(client.get(f'/jobs/{job_id}/results?start=18'))) == 3
+        status = client.get(f'/jobs/{job_id}').json()
+        assert status["items_per_s"] > 0 and status["failed"] == 0
+
+
+def test_csv_job_and_errors():
+    with TestClient(main.app) as client:
+        body = "case,summary\nA,Breach of contract.\nB,Claim dismissed.\n"
+        r = client.post('/jobs?mode=sklearn&id_column=case', content=body, headers={'Content-Type': 'text/csv'})
+        assert r.status_code == 202
+        items = _ndjson(client.get(r.json()["results_url"]))[:-1]
+        assert sorted(i["id"] for i in items) == ["A", "B"]
+        bad = client.post('/jobs?text_column=text', content=body, headers={'Content-Type': 'text/csv'})
+        assert bad.status_code == 400
+        assert client.get('/jobs/nope').status_code == 404
+        assert client.delete('/jobs/nope').status_code == 404
+
+
+def test_background_lane_yields_to_interactive():
+    async def run():
+        gate = admission.AdmissionGate("hf", concurrency=2, queue=4, timeout_s=5)
+        bg = await gate.acquire_background()
+        # one slot is reserved for interactive traffic
+        second_bg = asyncio.ensure_future(gate.acquire_background())
+        await asyncio.sleep(0)
+        assert not second_bg.done() and gate.background_queued == 1
+        interactive = await gate.acquire()
+        waiter = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        bg.release()  # the freed slot goes to the interactive waiter
+        held = await asyncio.wait_for(waiter, 1)
+        assert not second_bg.done()
+        interactive.release()
+        assert not second_bg.done()  # still only the reserved slot is free
+        held.release()
+        (await asyncio.wait_for(second_bg, 1)).release()
+        assert gate.active == 0 and gate.background_active == 0
+        return gate.stats()
+
+    stats = asyncio.run(run())
+    assert stats["background_admitted"] == 2 and stats["admitted"] == 2
+
+
+def test_cancel_stops_a_running_job():
+    from backend import jobs
+
+    async def run():
+        manager = jobs.JobManager(workers=1)
+
+        async def slow(mode, explain, texts):
+            await asyncio.sleep(0.05)
+            return [{"prediction": "x", "confidence": 1.0} for _ in texts]
+
+        job = manager.submit("sklearn", "none", [(str(i), "t") for i in range(100)], slow, batch_size=1)
+        await asyncio.sleep(0.12)
+        manager.cancel(job.id)
+        done = len(job.results)
+        await asyncio.sleep(0.1)
+        records = [r async for r in manager.stream(job)]
+        return job, done, records
+
+    job, done, records = asyncio.run(run())
+    assert job.status == "cancelled" and 0 < done < 100
+    assert len(job.results) == done and records[-1]["status"] == "cancelled"
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_import_does_not_load_ml_libraries():
+    code = ("import sys, backend.main; "
+            "print(','.join(m for m in ('sklearn', 'joblib', 'scipy', 'torch', 'transformers', 'httpx') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == ""
+
+
+def test_debug_deps_reads_metadata_only():
+    r = TestClient(app).get('/debug/deps')
+    assert r.status_code == 200
+    body = r.json()
+    assert body["scikit_learn"] and "torch" in body and "transformers" in body
+    assert "torch" not in body["loaded"] and "transformers" not in body["loaded"]
@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+
+from backend import metrics
+from backend.main import app
+
+client = TestClient(app)
+
+
+def test_histogram_exposition():
+    metrics.reset()
+    metrics.observe("t_seconds", 0.003, mode="hf", stage="forward")
+    metrics.observe("t_seconds", 2.0, mode="hf", stage="forward")
+    text = metrics.render()
+    assert '# TYPE t_seconds histogram' in text
+    assert 't_seconds_bucket{mode="hf",stage="forward",le="0.005"} 1' in text
+    assert 't_seconds_bucket{mode="hf",stage="forward",le="+Inf"} 2' in text
+    assert 't_seconds_count{mode="hf",stage="forward"} 2' in text
+
+
+def test_predict_records_stages():
+    metrics.reset()
+    r = client.post('/predict', json={'summary': 'Breach of contract and damages.', 'mode': 'sklearn'})
+    assert r.status_code == 200
+    text = client.get('/metrics').text
+    for stage in ("queue", "vectorize", "forward", "explain", "serialize"):
+        assert f'predictor_stage_seconds_count{{mode="sklearn",stage="{stage}"}} 1' in text
+    assert 'predictor_request_seconds_count{mode="sklearn",route="/predict"} 1' in text
+    assert 'predictor_requests_total{route="/predict",status="200"} 1' in text
+    assert 'predictor_admission_admitted_total{mode="sklearn"}' in text
+    assert 'predictor_model_cache_hits_total' in text
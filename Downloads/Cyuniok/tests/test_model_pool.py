@@ -0,0 +1,60 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from backend import main, model_pool
+from backend.main import app
+
+client = TestClient(app)
+
+MB = 2**20
+
+
+def test_lru_eviction_under_budget():
+    pool = model_pool.ModelPool(max_bytes=int(2.5 * MB))
+    loads = []
+
+    def loader(name):
+        def load():
+            loads.append(name)
+            return b"x" * MB
+        return load
+
+    pool.get("a", loader("a"))
+    pool.get("b", loader("b"))
+    pool.get("a", loader("a"))  # a is now most recently used
+    pool.get("c", loader("c"))  # over budget: b goes
+    assert [m["key"] for m in pool.stats()["models"]] == ["c", "a"]
+    assert loads == ["a", "b", "c"]
+    assert pool.stats()["evictions"] == 1
+    pool.get("b", loader("b"))
+    assert loads[-1] == "b"
+
+
+def test_idle_sweep():
+    pool = model_pool.ModelPool(idle_timeout_s=0.01)
+    pool.get("hf:models/hf", lambda: object())
+    time.sleep(0.02)
+    assert pool.sweep() == ["hf:models/hf"]
+    assert pool.stats()["models"] == []
+
+
+def test_per_request_mode_override(monkeypatch):
+    monkeypatch.setitem(main.CONFIG, "model_type", "gemini")
+    r = client.post('/predict', json={'summary': 'Breach of contract.', 'mode': 'sklearn'})
+    assert r.status_code == 200
+    keys = [m['key'] for m in client.get('/models').json()['models']]
+    assert 'sklearn' in keys
+    r = client.post('/predict', json={'summary': 'Breach of contract.', 'mode': 'nope'})
+    assert r.status_code == 400
+
+
+def test_config_change_keeps_pinned_models(monkeypatch, tmp_path):
+    pool = model_pool.ModelPool()
+    monkeypatch.setattr(model_pool, "POOL", pool)
+    monkeypatch.setattr(main.CONFIG_STORE, "path", tmp_path / "config.json")
+    pool.get("hf:models/hf", lambda: "preloaded")
+    pool.pin_all()
+    pool.get("zeroshot:x", lambda: "lazy")
+    assert client.put('/config', json={"gzip_level": 6}).status_code == 200
+    assert [m["key"] for m in pool.stats()["models"]] == ["hf:models/hf"]
@@ -0,0 +1,95 @@
+import random
+
+from fastapi.testclient import TestClient
+
+from backend import main, neardup, prediction_cache
+
+BASE = ("The tenant {name} sued the landlord for failing to repair the heating over two winters, "
+        "and the court awarded damages for breach of the lease and the cost of alternative housing.")
+OTHER = "The employer dismissed the worker after she reported safety violations to the regulator."
+
+
+def test_signature_similarity():
+    a, b, c, d = neardup.signatures([BASE.format(name="John Smith"), BASE.format(name="Maria Garcia"),
+                                     OTHER, "  " + BASE.format(name="john smith").upper()])
+    assert neardup.similarity(a, b) > 0.7
+    assert neardup.similarity(a, c) < 0.2
+    # case, punctuation and whitespace do not matter
+    assert neardup.similarity(a, d) == 1.0
+
+
+def test_lsh_index_query_remove_and_capacity():
+    texts = [BASE.format(name="John Smith"), OTHER, BASE.format(name="Maria Garcia")]
+    sigs = neardup.signatures(texts)
+    index = neardup.LSHIndex(threshold=0.7, capacity=2)
+    index.add("a", sigs[0])
+    index.add("b", sigs[1])
+    assert [k for k, _ in index.query(sigs[2])] == ["a"]
+    index.remove("a")
+    assert index.query(sigs[2]) == []
+    index.add("a", sigs[0])
+    index.add("c", sigs[2])  # over capacity: "b", the oldest, goes
+    assert len(index) == 2 and index.query(sigs[1]) == []
+
+
+def test_dedupe_keeps_first_of_each_group():
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(2000)]
+    unique = [" ".join(rng.choice(words) for _ in range(30)) for _ in range(300)]
+    # every fifth text reappears with one word changed and different casing
+    noisy = [t.upper().replace(t.split()[3].upper(), "CHANGED", 1) for t in unique[::5]]
+    kept = neardup.dedupe(unique + noisy, threshold=0.8)
+    assert kept == list(range(len(unique)))
+    rows = [(BASE.format(name="John Smith"), "tenant_wins"), (OTHER, "employee_wins"),
+            (BASE.format(name="Maria Garcia"), "landlord_wins")]
+    assert neardup.dedupe_rows(rows, 0.7) == rows[:2]
+    assert neardup.dedupe_rows(rows, 0) == rows
+
+
+def test_prediction_cache_near_lookup():
+    cache = prediction_cache.PredictionCache(max_entries=2, ttl_s=0)
+    cache.configure(2, 0, near_threshold=0.7)
+    text = BASE.format(name="John Smith")
+    cache.put("k1", "sklearn", text, {"prediction": "x"}, "features", scope="s")
+    near = BASE.format(name="Maria Garcia")
+    assert cache.get_near("s", near, "features").key == "k1"
+    assert cache.get_near("s", near, "full") is None  # not explained enough
+    assert cache.get_near("other", near) is None  # scopes do not mix
+    cache.put("k2", "sklearn", OTHER, {}, "none", scope="s")
+    cache.put("k3", "sklearn", "Claim dismissed for lack of jurisdiction.", {}, "none", scope="s")
+    assert cache.get_near("s", near) is None  # k1 evicted from the index too
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_predict_serves_near_duplicates(monkeypatch):
+    client = TestClient(main.app)
+    monkeypatch.setitem(main.CONFIG, "near_dup_threshold", 0.7)
+    first = client.post('/predict', json={'summary': BASE.format(name="John Smith"), 'mode': 'sklearn'})
+    assert first.status_code == 200
+    near_hits = prediction_cache.CACHE.stats()["near_hits"]
+    again = client.post('/predict', json={'summary': BASE.format(name="Maria Garcia"), 'mode': 'sklearn'})
+    assert again.json() == first.json()
+    assert prediction_cache.CACHE.stats()["near_hits"] == near_hits + 1
+    monkeypatch.setitem(main.CONFIG, "near_dup_threshold", 0.0)
+    client.post('/predict', json={'summary': BASE.format(name="Ann Lee"), 'mode': 'sklearn'})
+    assert prediction_cache.CACHE.stats()["near_hits"] == near_hits + 1
+
+
+def test_signatures_do_not_depend_on_block_size():
+    rng = random.Random(1)
+    texts = [" ".join(f"w{rng.randrange(500)}" for _ in range(rng.randrange(1, 60))) for _ in range(40)]
+    whole = neardup.signatures(texts)
+    # tiny blocks, and texts longer than a block (permuted a few permutations at a time)
+    assert (neardup.signatures(texts, max_pairs=50) == whole).all()
+    assert (neardup.signatures(texts, max_pairs=5) == whole).all()
+
+
+def test_upgrade_keeps_the_entry_scope():
+    cache = prediction_cache.PredictionCache(max_entries=1, ttl_s=0)
+    cache.configure(1, 0, near_threshold=0.7)
+    text = BASE.format(name="John Smith")
+    cache.put("k1", "sklearn", text, {"prediction": "x"}, "none", scope="s")
+    assert cache.put("k1", "sklearn", text, {"prediction": "x", "reason": "r"}, "full").scope == "s"
+    assert cache.get_near("s", BASE.format(name="Maria Garcia"), "full").key == "k1"
+    cache.put("k2", "sklearn", OTHER, {}, "none", scope="s")  # evicts k1
+    assert len(cache._near["s"]) == 1  # k1 left the index with it
@@ -0,0 +1,42 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+
+client = TestClient(app)
+
+
+def _spin_until(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_profile_requires_token(monkeypatch):
+    monkeypatch.delenv("DEBUG_TOKEN", raising=False)
+    assert client.get('/debug/profile?seconds=0.1').status_code == 403
+    monkeypatch.setenv("DEBUG_TOKEN", "secret")
+    assert client.get('/debug/profile?seconds=0.1', headers={"X-Debug-Token": "wrong"}).status_code == 401
+
+
+def test_profile_samples_busy_thread(monkeypatch):
+    monkeypatch.setenv("DEBUG_TOKEN", "secret")
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin_until, args=(stop,), name="busy worker")
+    worker.start()
+    try:
+        r = client.get('/debug/profile?seconds=0.3&interval_ms=5&heap=true',
+                       headers={"Authorization": "Bearer secret"})
+    finally:
+        stop.set()
+        worker.join()
+    assert r.status_code == 200
+    body = r.json()
+    assert body["samples"] > 0
+    busy = [line for line in body["collapsed"].splitlines() if line.startswith("busy_worker;")]
+    assert busy and all("test_profiler.py:_spin_until" in line for line in busy)
+    assert any(f["function"] == "test_profiler.py:_spin_until" for f in body["top_functions"])
+    assert body["heap"] is not None and "top" in body["heap"]
+
+    r = client.get('/debug/profile?seconds=0.1&format=collapsed', headers={"X-Debug-Token": "secret"})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,51 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend import main, metrics, reqlog
+
+client = TestClient(main.app)
+
+
+def _records(path):
+    reqlog.close()  # flushes the background writer
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def test_request_log_is_structured(tmp_path, monkeypatch):
+    log_file = tmp_path / "requests.log"
+    monkeypatch.setitem(main.CONFIG, "request_log_file", str(log_file))
+    r = client.post('/predict', json={'summary': 'Breach of contract and damages.', 'mode': 'sklearn'})
+    assert r.status_code == 200
+    records = [rec for rec in _records(log_file) if rec["path"] == "/predict"]
+    assert len(records) == 1
+    rec = records[0]
+    assert rec["status"] == 200 and rec["route"] == "/predict"
+    assert rec["mode"] == "sklearn" and rec["model"] == "sklearn"
+    assert rec["text_len"] == len('Breach of contract and damages.')
+    assert {"queue", "vectorize", "forward"} <= set(rec["stages_ms"])
+
+
+def test_sampling_keeps_errors(tmp_path, monkeypatch):
+    log_file = tmp_path / "requests.log"
+    monkeypatch.setitem(main.CONFIG, "request_log_file", str(log_file))
+    monkeypatch.setitem(main.CONFIG, "request_log_sample_rate", 0.0)
+    for _ in range(5):
+        reqlog.log_request(main.CONFIG, {"path": "/ok", "status": 200, "ms": 1.0})
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError as e:
+        reqlog.log_request(main.CONFIG, {"path": "/fail", "status": 500, "ms": 1.0}, exc=e)
+    records = _records(log_file)
+    assert [rec["path"] for rec in records] == ["/fail"]
+    assert records[0]["level"] == "error" and "RuntimeError: boom" in records[0]["traceback"]
+
+
+def test_rate_limit(tmp_path, monkeypatch):
+    monkeypatch.setitem(main.CONFIG, "request_log_file", str(tmp_path / "requests.log"))
+    monkeypatch.setitem(main.CONFIG, "request_log_max_per_s", 3)
+    metrics.reset()
+    for _ in range(10):
+        reqlog.log_request(main.CONFIG, {"path": "/x", "status": 200, "ms": 1.0})
+    assert len(_records(tmp_path / "requests.log")) == 3
+    assert 'predictor_log_records_total{outcome="rate_limited"} 7' in metrics.render()
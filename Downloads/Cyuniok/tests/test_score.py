@@ -0,0 +1,62 @@
+import csv
+
+import pytest
+
+from backend import main, score
+
+TEXTS = [
+    "The plaintiff alleges breach of contract and unpaid invoices.",
+    "Defendant moves to dismiss for lack of jurisdiction.",
+    "",
+    "Jury finds negligence and awards damages to the plaintiff.",
+    "Summary judgment granted for defendant on limitations.",
+]
+
+
+@pytest.fixture
+def cases(tmp_path):
+    path = tmp_path / "cases.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["case_id", "summary"])
+        for i, t in enumerate(TEXTS * 3):
+            w.writerow([f"c{i}", t])
+    return path
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_scores_match_the_batch_endpoint(cases, tmp_path):
+    out = tmp_path / "out.csv"
+    assert score.main([str(cases), str(out), "--mode", "sklearn", "--id-column", "case_id",
+                       "--chunk-size", "4", "--workers", "2"]) == 0
+    rows = _read(out)
+    expected = main._predict_batch_items(TEXTS * 3, "none")
+    assert [r["id"] for r in rows] == [f"c{i}" for i in range(15)]
+    assert [r["prediction"] for r in rows] == [e.prediction for e in expected]
+    assert not (tmp_path / "out.csv.ckpt.json").exists()
+
+
+def test_resume_after_interruption(cases, tmp_path, monkeypatch):
+    full = tmp_path / "full.csv"
+    score.main([str(cases), str(full), "--mode", "sklearn", "--chunk-size", "4", "--workers", "1"])
+
+    out = tmp_path / "out.csv"
+    real, calls = score.score_chunk, []
+
+    def flaky(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(score, "score_chunk", flaky)
+    with pytest.raises(KeyboardInterrupt):
+        score.main([str(cases), str(out), "--mode", "sklearn", "--chunk-size", "4", "--workers", "1"])
+    assert len(_read(out)) == 8
+    monkeypatch.setattr(score, "score_chunk", real)
+    score.main([str(cases), str(out), "--mode", "sklearn", "--chunk-size", "4", "--workers", "1"])
+    assert out.read_text() == full.read_text()
@@ -0,0 +1,35 @@
+import gc
+import sys
+
+import joblib
+import numpy as np
+import pytest
+
+from backend import main, model_pool, procmem, serve
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs /proc")
+def test_memory_info_reports_uss():
+    m = procmem.memory_info()
+    assert m["rss_mb"] > 0 and 0 < m["uss_mb"] <= m["rss_mb"]
+
+
+def test_preload_pins_and_freezes(monkeypatch):
+    monkeypatch.setattr(model_pool, "POOL", model_pool.ModelPool(idle_timeout_s=0.001))
+    try:
+        assert serve.preload(["sklearn"]) == ["sklearn"]
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+    # Pinned models survive idle sweeps in the workers
+    assert model_pool.POOL.sweep() == []
+
+
+def test_weights_mmap(tmp_path, monkeypatch):
+    arr = np.arange(10000, dtype=np.float64)
+    joblib.dump({"coef": arr}, tmp_path / "m.pkl")
+    loaded = joblib.load(tmp_path / "m.pkl", mmap_mode="r")
+    assert isinstance(loaded["coef"], np.memmap)
+    monkeypatch.setitem(main.CONFIG, "weights_mmap", True)
+    mdl, vec = main._load_sklearn()
+    assert mdl.predict_proba(vec.transform(["breach of contract"])).shape[0] == 1
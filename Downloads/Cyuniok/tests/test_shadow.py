@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from backend import config_store, main, shadow
+
+TEXT = "The tenant proved breach of contract and damages for unpaid rent."
+
+
+def _wait_for(client, samples, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        pairs = client.get('/shadow').json()["pairs"]
+        if sum(p["samples"] for p in pairs.values()) >= samples:
+            return pairs
+        time.sleep(0.02)
+    raise AssertionError("shadow samples did not arrive")
+
+
+def test_shadow_records_agreement_after_responding(monkeypatch):
+    shadow.SHADOW.reset()
+    for k, v in {"shadow_mode": "sklearn", "shadow_config": {"weights_mmap": False},
+                 "shadow_sample_rate": 1.0, "shadow_concurrency": 4}.items():
+        monkeypatch.setitem(main.CONFIG, k, v)
+    with TestClient(main.app) as client:
+        first = client.post('/predict', json={'summary': TEXT, 'mode': 'sklearn'})
+        assert first.status_code == 200
+        pairs = _wait_for(client, 1)
+        client.post('/predict', json={'summary': TEXT, 'mode': 'sklearn'})  # cache hit: compared, not timed
+        pairs = _wait_for(client, 2)
+        stats = pairs["sklearn->sklearn"]
+        assert stats["agreement"] == 1.0 and stats["errors"] == 0
+        assert stats["latency_ms"]["primary"]["n"] == 1 and stats["latency_ms"]["candidate"]["n"] == 2
+        assert 'predictor_shadow_agreement{pair="sklearn->sklearn"} 1.0' in client.get('/metrics').text
+        assert client.delete('/shadow').json() == {"ok": True}
+        assert client.get('/shadow').json()["pairs"] == {}
+
+
+def test_candidate_failure_does_not_touch_the_response(monkeypatch):
+    shadow.SHADOW.reset()
+    monkeypatch.setitem(main.CONFIG, "shadow_mode", "sklearn")
+    monkeypatch.setitem(main.CONFIG, "shadow_config", {"weights_mmap": False})
+    monkeypatch.setitem(main.CONFIG, "shadow_sample_rate", 1.0)
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("candidate down")
+
+    monkeypatch.setattr(main, "_shadow_run", broken)
+    with TestClient(main.app) as client:
+        assert client.post('/predict', json={'summary': TEXT, 'mode': 'sklearn'}).status_code == 200
+        stats = _wait_for(client, 1)["sklearn->sklearn"]
+        assert stats["errors"] == 1 and stats["agreement"] is None
+
+
+def test_budget_drops_instead_of_queueing():
+    ev = shadow.ShadowEvaluator(sample_rate=1.0, concurrency=1)
+    seen = []
+
+    async def slow(text):
+        await asyncio.sleep(0.05)
+        seen.append(text)
+        return "plaintiff_wins", 0.9
+
+    async def run():
+        assert ev.offer("sklearn", "hf", "a", "plaintiff_wins", 0.8, 1.0, slow)
+        assert not ev.offer("sklearn", "hf", "b", "plaintiff_wins", 0.8, 1.0, slow)
+        await ev.drain()
+
+    asyncio.run(run())
+    assert seen == ["a"] and ev.dropped == 1 and ev.in_flight == 0
+    stats = ev.stats()["pairs"]["sklearn->hf"]
+    assert stats["agreement"] == 1.0 and stats["mean_confidence_delta"] == 0.1
+
+
+def test_overrides_apply_only_inside_the_shadow_task(monkeypatch):
+    monkeypatch.setitem(main.CONFIG, "hf_model_dir", "models/hf")
+
+    async def run():
+        async def inside():
+            config_store.pin(main.CONFIG_STORE.derive({"hf_model_dir": "models/hf_student"}))
+            return main.CONFIG.get("hf_model_dir"), main.CONFIG["hf_model_dir"]
+
+        shadowed = await asyncio.get_running_loop().create_task(inside())
+        return shadowed, main.CONFIG.get("hf_model_dir")
+
+    shadowed, primary = asyncio.run(run())
+    assert shadowed == ("models/hf_student", "models/hf_student") and primary == "models/hf"
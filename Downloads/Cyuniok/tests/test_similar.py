@@ -0,0 +1,60 @@
+from fastapi.testclient import TestClient
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from backend import feedback_store, main, similar
+
+client = TestClient(main.app)
+
+CASES = [
+    ("Landlord failed to repair heating; tenant withheld rent.", "plaintiff_wins"),
+    ("Employer fired the worker without notice; wrongful termination claim.", "plaintiff_wins"),
+    ("Claim dismissed because the statute of limitations expired.", "defendant_wins"),
+    ("Tenant sued landlord over mold and unsafe heating.", "plaintiff_wins"),
+]
+
+
+def _brute(vec, docs, text):
+    X = vec.transform([d for d, _ in docs])
+    scores = (X @ vec.transform([text]).T).toarray().ravel()
+    return [docs[i][0] for i in scores.argsort()[::-1] if scores[i] > 0]
+
+
+def test_index_matches_brute_force_and_grows(tmp_path):
+    vec = TfidfVectorizer().fit([c for c, _ in CASES])
+    index = similar.build(vec, CASES)
+    query = "tenant heating repair landlord"
+    assert [r["summary"] for r in index.search(query, k=10)] == _brute(vec, CASES, query)
+    # incremental adds go through the delta and are searchable right away
+    extra = ("Heating broke and the landlord ignored the tenant.", "plaintiff_wins")
+    assert index.add([(*extra, "feedback")]) == 1
+    assert index.stats()["pending_merge"] == 1
+    hits = index.search(query, k=10)
+    assert [r["summary"] for r in hits] == _brute(vec, CASES + [extra], query)
+    assert {r["source"] for r in hits} == {"dataset", "feedback"}
+    # a known summary only updates its outcome
+    assert index.add([(CASES[2][0], "plaintiff_wins", "feedback")]) == 0 and len(index) == 5
+    # round trip through the saved form, and refuse a different vectorizer
+    similar.save(index, tmp_path / "index.joblib")
+    loaded = similar.load(vec, tmp_path / "index.joblib")
+    assert loaded.search(query, k=10) == hits
+    assert similar.load(TfidfVectorizer().fit(["other words"]), tmp_path / "index.joblib") is None
+
+
+def test_similar_endpoint_includes_feedback(tmp_path, monkeypatch):
+    db = tmp_path / "feedback.db"
+    store = feedback_store.FeedbackStore(db)
+    store.add("The defendant failed to deliver the goods; breach of contract.", "defendant_wins", "plaintiff_wins")
+    store.close()
+    monkeypatch.setattr(main, "FEEDBACK_DB_PATH", db)
+    monkeypatch.setattr(similar, "INDEX_PATH", tmp_path / "missing.joblib")  # build from the dataset
+    monkeypatch.setitem(main.CONFIG, "similar_refresh_s", 0)
+    main.model_pool.POOL.clear()
+    r = client.post('/similar', json={'summary': 'breach of contract, goods never delivered', 'k': 3})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["corpus_size"] >= 2 and 1 <= len(body["results"]) <= 3
+    assert "feedback" in {x["source"] for x in body["results"]}
+    scores = [x["score"] for x in body["results"]]
+    assert scores == sorted(scores, reverse=True)
+    assert client.post('/similar', json={'summary': '  '}).status_code == 400
+    main.model_pool.POOL.clear()
@@ -0,0 +1,139 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import http_client
+from backend import main
+from backend.main import app
+
+client = TestClient(app)
+
+
+def _events(resp):
+    out = []
+    for block in resp.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+@pytest.fixture
+def remote(monkeypatch, stub_server):
+    monkeypatch.setenv("GEMINI_API_KEY", "k")
+    monkeypatch.setenv("HF_TOKEN", "k")
+    monkeypatch.setattr(http_client, "_clients", {})
+    monkeypatch.setattr(http_client, "_client_settings", {})
+    monkeypatch.setitem(main.CONFIG, "gemini_base_url", stub_server.url)
+    monkeypatch.setitem(main.CONFIG, "hf_api_base_url", stub_server.url)
+    return stub_server
+
+
+def test_stream_sklearn_sections(monkeypatch):
+    monkeypatch.setitem(main.CONFIG, "model_type", "sklearn")
+    r = client.post('/predict/stream', json={'summary': 'The plaintiff alleges breach of contract.'})
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('text/event-stream')
+    events = _events(r)
+    assert events[0][0] == 'prediction' and events[-1][0] == 'done'
+    reason = "".join(d["text"] for e, d in events if e == "reason")
+    assert reason == events[-1][1]["reason"]
+    assert events[0][1]["prediction"] == events[-1][1]["prediction"]
+
+
+def test_stream_gemini_label_before_reasoning_ends(monkeypatch, remote):
+    monkeypatch.setitem(main.CONFIG, "model_type", "gemini")
+    chunks = ["Based on the facts provided, the outcome is strongly indicated.\n\n", "defend", "ant_wins\n\n",
+              "Reasoning: the limitation period had expired.", " A plaintiff_wins finding is unlikely."]
+    remote.sse_events = [{"candidates": [{"content": {"parts": [{"text": c}]}}]} for c in chunks]
+    r = client.post('/predict/stream', json={'summary': 'Suit filed after limitation.'})
+    events = _events(r)
+    kinds = [e for e, _ in events]
+    first_pred = kinds.index('prediction')
+    assert events[first_pred][1]['prediction'] == 'defendant_wins'
+    # Label is announced before the remaining reasoning chunks arrive
+    assert kinds[first_pred + 1:].count('reason') >= 2
+    assert events[-1][0] == 'done' and events[-1][1]['prediction'] == 'defendant_wins'
+    path, _ = remote.requests[0]
+    assert ':streamGenerateContent?alt=sse' in path
+
+
+def test_stream_hf_api_tokens(monkeypatch, remote):
+    monkeypatch.setitem(main.CONFIG, "model_type", "hf_api")
+    tokens = ["plaintiff", "_wins", " because", " the", " contract", " was", " breached", "</s>"]
+    remote.sse_events = [{"token": {"text": t, "special": t == "</s>"}} for t in tokens]
+    r = client.post('/predict/stream', json={'summary': 'Breach of contract.'})
+    events = _events(r)
+    assert events[-1][1]['prediction'] == 'plaintiff_wins'
+    reason = "".join(d["text"] for e, d in events if e == "reason")
+    assert reason == "plaintiff_wins because the contract was breached"
+    assert remote.requests[0][1]['stream'] is True
+
+
+def test_stream_remote_error_event(monkeypatch, remote):
+    monkeypatch.setitem(main.CONFIG, "model_type", "hf_api")
+    monkeypatch.setitem(main.CONFIG, "http_max_retries", 0)
+    remote.plan = [(400, {"error": "bad model"}, 0)]
+    r = client.post('/predict/stream', json={'summary': 'Breach of contract.'})
+    events = _events(r)
+    assert events == [('error', {'detail': events[0][1]['detail']})]
+    assert 'bad model' in events[0][1]['detail']
+
+
+def test_stream_llm_disconnect_stops_generation_before_freeing_the_slot(monkeypatch):
+    import asyncio
+    import queue
+    import sys
+    import threading
+    import types
+
+    class Streamer:
+        def __init__(self, *a, **k):
+            self.q = queue.Queue()
+
+        def put(self, piece):
+            self.q.put(piece)
+
+        def end(self):
+            self.q.put(None)
+
+        def __iter__(self):
+            return iter(self.q.get, None)
+
+    class Model:
+        steps = 0
+        stopped = threading.Event()
+
+        def generate(self, max_new_tokens, streamer, stopping_criteria, **kwargs):
+            for _ in range(max_new_tokens):
+                if any(c(None, None) for c in stopping_criteria):
+                    break
+                Model.steps += 1
+                streamer.put("plaintiff_wins ")
+                time.sleep(0.01)
+            streamer.end()
+            Model.stopped.wait(1)  # still busy after the stop request
+
+    fake = types.SimpleNamespace(StoppingCriteria=object, StoppingCriteriaList=list, TextIteratorStreamer=Streamer)
+    monkeypatch.setitem(sys.modules, "transformers", fake)
+    monkeypatch.setattr(main, "_llm_inputs", lambda text: (Model(), None, {}, ["plaintiff_wins", "defendant_wins"]))
+    monkeypatch.setitem(main.CONFIG, "llm_max_new_tokens", 10_000)
+
+    async def run():
+        gate = main.admission.AdmissionGate("llm", 1, 0, 1.0)
+        events, release = await main._stream_llm("Breach of contract.", await gate.acquire())
+        stream = main._release_after(events, release)
+        assert (await stream.__anext__()).startswith("event: prediction")
+        await stream.aclose()  # the client went away
+        await asyncio.sleep(0.1)
+        assert gate.active == 1  # generation has not returned yet
+        Model.stopped.set()
+        for _ in range(100):
+            if gate.active == 0:
+                break
+            await asyncio.sleep(0.01)
+        return gate.active
+
+    assert asyncio.run(run()) == 0
+    assert Model.steps < 100
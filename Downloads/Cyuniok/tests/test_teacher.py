@@ -0,0 +1,74 @@
+import csv
+
+import pytest
+
+from backend import http_client, main, teacher
+
+TEXTS = [
+    "The plaintiff alleges breach of contract and unpaid invoices.",
+    "",
+    "Jury finds negligence and awards damages to the plaintiff.",
+    "The plaintiff alleges breach of contract and unpaid invoices.",
+    "Summary judgment granted for defendant on limitations.",
+]
+
+
+@pytest.fixture
+def hf_teacher(monkeypatch, stub_server, tmp_path):
+    monkeypatch.setenv("HF_TOKEN", "test-token")
+    monkeypatch.setattr(http_client, "_clients", {})
+    monkeypatch.setattr(http_client, "_client_settings", {})
+    for k, v in {"hf_api_base_url": stub_server.url, "http_max_retries": 0,
+                 "breaker_failures": 1, "breaker_reset_s": 60}.items():
+        monkeypatch.setitem(main.CONFIG, k, v)
+    src = tmp_path / "unlabeled.csv"
+    with open(src, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["summary"])
+        w.writerows([t] for t in TEXTS)
+    return stub_server, src
+
+
+def _argv(src, out, tmp_path, *extra):
+    return [str(src), str(out), "--teacher", "hf_api", "--cache", str(tmp_path / "cache.db"),
+            "--chunk-size", "2", *extra]
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_labels_and_caches_teacher_answers(hf_teacher, tmp_path):
+    stub, src = hf_teacher
+    out = tmp_path / "labels.csv"
+    assert teacher.main(_argv(src, out, tmp_path)) == 0
+    rows = _read(out)
+    assert [r["id"] for r in rows] == ["0", "1", "2", "3", "4"]
+    assert rows[1]["error"] == "empty text" and not rows[1]["outcome"]
+    assert {r["outcome"] for r in rows if not r["error"]} == {"plaintiff_wins"}
+    assert rows[0]["teacher"].startswith("hf_api:")
+    # the repeated text is answered once the first answer is cached (different chunk)
+    assert stub.hits == 3
+    # a second run is served entirely from the response cache
+    assert teacher.main(_argv(src, tmp_path / "again.csv", tmp_path)) == 0
+    assert stub.hits == 3
+    assert _read(tmp_path / "again.csv") == rows
+    assert teacher.load_labels(out) == [(TEXTS[i], "plaintiff_wins") for i in (0, 2, 3, 4)]
+    assert teacher.load_labels(out, min_confidence=0.9) == []
+
+
+def test_stops_when_teacher_is_down_and_resumes(hf_teacher, tmp_path):
+    stub, src = hf_teacher
+    out = tmp_path / "labels.csv"
+    stub.plan = [(200, [{"generated_text": "defendant_wins"}], 0), (503, {"error": "down"}, 0)]
+    # first chunk succeeds; the 503 stops the run before the second is written
+    assert teacher.main(_argv(src, out, tmp_path)) == 1
+    assert len(_read(out)) == 2
+    assert (tmp_path / "labels.csv.ckpt.json").exists()
+    http_client._clients.clear()  # upstream is back
+    http_client._client_settings.clear()
+    assert teacher.main(_argv(src, out, tmp_path)) == 0
+    rows = _read(out)
+    assert len(rows) == 5 and rows[0]["outcome"] == "defendant_wins"
+    assert not (tmp_path / "labels.csv.ckpt.json").exists()
@@ -0,0 +1,39 @@
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from backend import main, textmatch
+
+
+def test_term_categories_follow_priority():
+    groups = textmatch.TERM_CATEGORIES
+    assert groups.classify("breach") == "legal"
+    assert groups.classify("lawsuit") == "legal"  # substring match, as before
+    assert groups.classify("hearing") == "procedural"
+    assert groups.classify("refunds") == "financial"
+    assert groups.classify("contract_fee") == "legal"  # legal outranks financial
+    assert groups.classify("tenant") is None
+    assert groups.bucket(["tenant", "motion", "damages", "debt"], default="factual") == {
+        "legal": ["damages"], "procedural": ["motion"], "financial": ["debt"], "factual": ["tenant"],
+    }
+
+
+def test_phrase_confidence_tiers():
+    assert 0.85 <= main.extract_confidence_from_response("The record CLEARLY INDICATES liability") <= 0.94
+    # the strongest tier wins regardless of position in the text
+    assert 0.75 <= main.extract_confidence_from_response("it suggests, and strongly suggests, liability") <= 0.84
+    assert 0.55 <= main.extract_confidence_from_response("the outcome might go either way") <= 0.64
+    assert main.extract_confidence_from_response("no certainty language here") == 0.70
+
+
+def test_term_contributions_point_toward_predicted_class():
+    docs = ["breach contract damages", "breach contract payment", "dismissed statute limitations", "dismissed jurisdiction"]
+    labels = ["plaintiff_wins", "plaintiff_wins", "defendant_wins", "defendant_wins"]
+    vec = TfidfVectorizer().fit(docs)
+    model = LogisticRegression().fit(vec.transform(docs), labels)
+    X = vec.transform(["breach of contract but dismissed"])
+    plaintiff = list(model.classes_).index("plaintiff_wins")
+    toward_plaintiff = dict(main._term_contributions(model, vec, X, plaintiff))
+    toward_defendant = dict(main._term_contributions(model, vec, X, 1 - plaintiff))
+    assert toward_plaintiff["breach"] > 0 > toward_plaintiff["dismissed"]
+    assert toward_defendant["dismissed"] > 0 > toward_defendant["breach"]
+    assert main._term_contributions(model, vec, X, plaintiff)[0][0] in ("breach", "contract")
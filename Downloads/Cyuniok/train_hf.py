@@ -1,5 +1,8 @@
 from __future__ import annotations
+import argparse
 import os
+import re
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Tuple
@@ -16,10 +19,17 @@ import numpy as np
 import csv
 import json
 
+from backend import neardup, teacher
+
 DATA_PATH = Path("data/case_data.csv")
 OUT_DIR = Path("models/hf")
 MODEL_NAME = os.getenv("HF_BASE_MODEL", "nlpaueb/legal-bert-base-uncased")
 MAX_LEN = int(os.getenv("HF_MAX_LEN", "512"))
+# Near-duplicate summaries (MinHash Jaccard) kept once before splitting; 0 = off
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+# Teacher-labelled rows (python -m backend.teacher) added to the gold data
+TEACHER_DATA = os.getenv("TEACHER_DATA", "")
+TEACHER_MIN_CONFIDENCE = float(os.getenv("TEACHER_MIN_CONFIDENCE", "0.7"))
 
 
 def load_rows(path: Path) -> List[Tuple[str, str]]:
@@ -37,10 +47,15 @@ def load_rows(path: Path) -> List[Tuple[str, str]]:
     return rows
 
 
-def make_splits(rows: List[Tuple[str,str]], test_size=0.2, seed=42):
-    # Simple stratified split
+def make_splits(rows: List[Tuple[str,str]], test_size=0.2, seed=42, dedup_threshold=DEDUP_THRESHOLD):
+    # Simple stratified split, after dropping near-duplicates so the same
+    # case cannot end up on both sides
     from collections import defaultdict
     import random
+    n_rows = len(rows)
+    rows = neardup.dedupe_rows(rows, dedup_threshold)
+    if len(rows) < n_rows:
+        print(f"[train] dropped {n_rows - len(rows)} near-duplicate rows")
     by_label = defaultdict(list)
     for s,o in rows:
         by_label[o].append(s)
@@ -67,8 +82,28 @@ def encode_dataset(tokenizer, texts, labels, label2id):
     return Dataset.from_dict(enc)
 
 
-def main():
+def training_rows() -> List[Tuple[str, str]]:
     rows = load_rows(DATA_PATH)
+    if TEACHER_DATA:
+        # Gold rows come first, so they win over a near-duplicate teacher row
+        extra = teacher.load_labels(Path(TEACHER_DATA), TEACHER_MIN_CONFIDENCE)
+        print(f"[train] adding {len(extra)} teacher-labelled rows from {TEACHER_DATA}")
+        rows += extra
+    return rows
+
+
+def compute_metrics(eval_pred):
+    logits, labels = eval_pred
+    preds = np.argmax(logits, axis=-1)
+    from sklearn.metrics import accuracy_score, f1_score
+    return {
+        'accuracy': accuracy_score(labels, preds),
+        'f1': f1_score(labels, preds, average='macro'),
+    }
+
+
+def main():
+    rows = training_rows()
     labels = sorted(list({o for _,o in rows}))
     label2id = {l:i for i,l in enumerate(labels)}
     id2label = {i:l for l,i in label2id.items()}
@@ -102,15 +137,6 @@ def main():
 
     collator = DataCollatorWithPadding(tokenizer=tokenizer)
 
-    def compute_metrics(eval_pred):
-        logits, labels = eval_pred
-        preds = np.argmax(logits, axis=-1)
-        from sklearn.metrics import accuracy_score, f1_score
-        return {
-            'accuracy': accuracy_score(labels, preds),
-            'f1': f1_score(labels, preds, average='macro'),
-        }
-
     trainer = Trainer(
         model=model,
         args=args,
@@ -138,5 +164,191 @@ def main():
     print(f"Saved HF model to {OUT_DIR}")
 
 
+# -------- distillation --------
+# A student with fewer transformer layers (or a narrower hidden size) is
+# trained on the fine-tuned model's temperature-softened logits plus the gold
+# labels. With the teacher's width, the student starts from the teacher's
+# embeddings, classifier head and an evenly spaced subset of its layers, so
+# it begins close to the teacher. The student is saved like any fine-tuned
+# model: point `hf_model_dir` at it to serve it in `hf` mode.
+STUDENT_DIR = Path(os.getenv("HF_STUDENT_DIR", "models/hf_student"))
+_LAYER = re.compile(r"\.layer\.(\d+)\.")
+
+
+def student_layers(n_teacher: int, n_student: int) -> List[int]:
+    """Teacher layers the student starts from: evenly spaced, ending with the last."""
+    if n_student >= n_teacher:
+        return list(range(n_teacher))
+    step = n_teacher / n_student
+    return [min(n_teacher - 1, int(round((i + 1) * step)) - 1) for i in range(n_student)]
+
+
+def make_student(teacher_model, n_layers: int, hidden_size: int = 0):
+    import copy
+    cfg = copy.deepcopy(teacher_model.config)
+    cfg.num_hidden_layers = n_layers
+    if hidden_size and hidden_size != cfg.hidden_size:
+        # Narrower than the teacher: no weights to reuse, learned from soft labels alone
+        cfg.hidden_size = hidden_size
+        cfg.num_attention_heads = max(1, hidden_size // 64)
+        cfg.intermediate_size = 4 * hidden_size
+        return AutoModelForSequenceClassification.from_config(cfg)
+    student = AutoModelForSequenceClassification.from_config(cfg)
+    keep = {t: s for s, t in enumerate(student_layers(teacher_model.config.num_hidden_layers, n_layers))}
+    state = {}
+    for name, tensor in teacher_model.state_dict().items():
+        m = _LAYER.search(name)
+        if m is None:
+            state[name] = tensor
+        elif int(m.group(1)) in keep:
+            state[f"{name[:m.start()]}.layer.{keep[int(m.group(1))]}.{name[m.end():]}"] = tensor
+    missing, _ = student.load_state_dict(state, strict=False)
+    if missing:
+        print(f"[distill] {len(missing)} student weights not in the teacher; left at random init")
+    return student
+
+
+def batch_logits(model, tokenizer, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+    import torch
+    model.eval()
+    out = []
+    with torch.no_grad():
+        for i in range(0, len(texts), batch_size):
+            enc = tokenizer(texts[i:i + batch_size], truncation=True, max_length=MAX_LEN,
+                            padding=True, return_tensors='pt')
+            out.append(model(**enc).logits.float())
+    return torch.cat(out).tolist()
+
+
+class DistillTrainer(Trainer):
+    """Loss = alpha * T^2 * KL(student_T || teacher_T) + (1 - alpha) * cross-entropy."""
+
+    def __init__(self, *args, temperature: float = 2.0, alpha: float = 0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        import torch.nn.functional as F
+        soft = inputs.pop('teacher_logits')
+        outputs = model(**inputs)
+        t = self.temperature
+        kd = F.kl_div(F.log_softmax(outputs.logits / t, dim=-1), F.softmax(soft / t, dim=-1),
+                      reduction='batchmean') * (t * t)
+        loss = self.alpha * kd + (1 - self.alpha) * outputs.loss
+        return (loss, outputs) if return_outputs else loss
+
+
+def _dir_mb(path: Path) -> float:
+    return round(sum(f.stat().st_size for f in path.glob('*') if f.suffix in ('.safetensors', '.bin')) / 1e6, 1)
+
+
+def profile(model, tokenizer, texts: List[str], label_ids: List[int], min_calls: int = 20) -> Dict[str, float]:
+    """Accuracy and macro F1 on `texts`, and single-text CPU latency as served."""
+    import torch
+    from sklearn.metrics import accuracy_score, f1_score
+    model.eval()
+    with torch.no_grad():
+        preds = np.argmax(batch_logits(model, tokenizer, texts), axis=-1)
+        encoded = [tokenizer(t, truncation=True, max_length=MAX_LEN, return_tensors='pt') for t in texts]
+        model(**encoded[0])  # warm-up
+        times = []
+        while len(times) < max(min_calls, len(encoded)):
+            enc = encoded[len(times) % len(encoded)]
+            start = time.perf_counter()
+            model(**enc)
+            times.append((time.perf_counter() - start) * 1000)
+    return {
+        'accuracy': round(float(accuracy_score(label_ids, preds)), 4),
+        'f1': round(float(f1_score(label_ids, preds, average='macro')), 4),
+        'p50_ms': round(float(np.percentile(times, 50)), 2),
+        'p95_ms': round(float(np.percentile(times, 95)), 2),
+        'params_m': round(sum(p.numel() for p in model.parameters()) / 1e6, 1),
+    }
+
+
+def distill(teacher_dir: Path = OUT_DIR, out_dir: Path = STUDENT_DIR, layers: int = 4, hidden: int = 0,
+            temperature: float = 2.0, alpha: float = 0.5, epochs: int = 3) -> Dict[str, Dict[str, float]]:
+    tokenizer = AutoTokenizer.from_pretrained(str(teacher_dir))
+    teacher_model = AutoModelForSequenceClassification.from_pretrained(str(teacher_dir))
+    label2id = dict(teacher_model.config.label2id)
+    labels = [l for l, _ in sorted(label2id.items(), key=lambda kv: kv[1])]
+    rows = [(s, o) for s, o in training_rows() if o in label2id]
+    (tr_texts, tr_labels), (va_texts, va_labels) = make_splits(rows)
+
+    def encode(texts, labels_):
+        ds = encode_dataset(tokenizer, texts, labels_, label2id)
+        return ds.add_column('teacher_logits', batch_logits(teacher_model, tokenizer, texts))
+
+    train_ds, val_ds = encode(tr_texts, tr_labels), encode(va_texts, va_labels)
+    student = make_student(teacher_model, layers, hidden)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    args = TrainingArguments(
+        output_dir=str(out_dir / 'runs'),
+        per_device_train_batch_size=16,
+        per_device_eval_batch_size=16,
+        learning_rate=1e-4,
+        num_train_epochs=epochs,
+        weight_decay=0.01,
+        evaluation_strategy='epoch',
+        save_strategy='epoch',
+        load_best_model_at_end=True,
+        metric_for_best_model='f1',
+        logging_steps=50,
+        report_to=[],
+        remove_unused_columns=False,  # keep teacher_logits for the loss
+    )
+    trainer = DistillTrainer(
+        model=student,
+        args=args,
+        train_dataset=train_ds,
+        eval_dataset=val_ds,
+        tokenizer=tokenizer,
+        data_collator=DataCollatorWithPadding(tokenizer=tokenizer),
+        compute_metrics=compute_metrics,
+        temperature=temperature,
+        alpha=alpha,
+    )
+    trainer.train()
+    student = trainer.model
+    student.save_pretrained(out_dir)
+    tokenizer.save_pretrained(out_dir)
+
+    val_ids = [label2id[l] for l in va_labels]
+    report = {
+        'teacher': {**profile(teacher_model, tokenizer, va_texts, val_ids), 'size_mb': _dir_mb(teacher_dir)},
+        'student': {**profile(student, tokenizer, va_texts, val_ids), 'size_mb': _dir_mb(out_dir)},
+    }
+    meta = {
+        'base_model': str(teacher_dir),
+        'labels': labels,
+        'max_len': MAX_LEN,
+        'distillation': {'layers': layers, 'hidden_size': student.config.hidden_size,
+                         'temperature': temperature, 'alpha': alpha, **report},
+    }
+    with (out_dir / 'hf_metadata.json').open('w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"{'':8} {'accuracy':>8} {'f1':>6} {'p50 ms':>8} {'p95 ms':>8} {'params M':>9} {'size MB':>8}")
+    for name, r in report.items():
+        print(f"{name:8} {r['accuracy']:8.3f} {r['f1']:6.3f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f}"
+              f" {r['params_m']:9.1f} {r['size_mb']:8.1f}")
+    print(f"Saved student to {out_dir}; serve it with hf_model_dir={out_dir}")
+    return report
+
+
 if __name__ == '__main__':
-    main()
+    ap = argparse.ArgumentParser(description="Fine-tune the hf classifier, or distill it into a smaller student.")
+    ap.add_argument('--distill', action='store_true', help="train a student from the fine-tuned model")
+    ap.add_argument('--teacher-dir', default=str(OUT_DIR))
+    ap.add_argument('--out', default=str(STUDENT_DIR))
+    ap.add_argument('--layers', type=int, default=4, help="student transformer layers")
+    ap.add_argument('--hidden', type=int, default=0, help="student hidden size (default: the teacher's)")
+    ap.add_argument('--temperature', type=float, default=2.0)
+    ap.add_argument('--alpha', type=float, default=0.5, help="weight of the soft-label loss")
+    ap.add_argument('--epochs', type=int, default=3)
+    cli = ap.parse_args()
+    if cli.distill:
+        distill(Path(cli.teacher_dir), Path(cli.out), cli.layers, cli.hidden, cli.temperature, cli.alpha, cli.epochs)
+    else:
+        main()
@@ -9,11 +9,18 @@ from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 
+from backend import neardup, teacher
+
 DATA_PATH = Path("data/case_data.csv")
 MODELS_DIR = Path("models")
 MODEL_PATH = MODELS_DIR / "model.pkl"
 VECTORIZER_PATH = MODELS_DIR / "vectorizer.pkl"
 METADATA_PATH = MODELS_DIR / "metadata.json"
+# Near-duplicate summaries (MinHash Jaccard) kept once before training; 0 = off
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+# Teacher-labelled rows (python -m backend.teacher) added to the gold data
+TEACHER_DATA = os.getenv("TEACHER_DATA", "")
+TEACHER_MIN_CONFIDENCE = float(os.getenv("TEACHER_MIN_CONFIDENCE", "0.7"))
 
 def load_data(path: Path) -> list[tuple[str, str]]:
     if not path.exists():
@@ -130,8 +137,28 @@ def save(model: LogisticRegression, vectorizer: TfidfVectorizer, *, rows: list[t
 
 
 if __name__ == "__main__":
-    rows = load_data(DATA_PATH)
+    gold = load_data(DATA_PATH)
+    # Duplicates would be weighted twice and leak across the validation split
+    n_rows = len(gold)
+    rows = gold = neardup.dedupe_rows(gold, DEDUP_THRESHOLD)
+    if TEACHER_DATA:
+        # Gold rows come first, so they win over a near-duplicate teacher row
+        extra = teacher.load_labels(Path(TEACHER_DATA), TEACHER_MIN_CONFIDENCE)
+        print(f"[train] adding {len(extra)} teacher-labelled rows from {TEACHER_DATA}")
+        n_rows += len(extra)
+        rows = neardup.dedupe_rows(gold + extra, DEDUP_THRESHOLD)
+    if len(rows) < n_rows:
+        print(f"[train] dropped {n_rows - len(rows)} near-duplicate rows")
     model, vectorizer = train(rows)
     # training_mode is inferred based on size threshold used in train()
     training_mode = "all_data" if len(rows) < 6 else "train_test_split"
     save(model, vectorizer, rows=rows, training_mode=training_mode)
+    # Similar-case index over the same TF-IDF space, served by /similar. Past
+    # cases are the dataset only: teacher labels are model output
+    try:
+        from backend import similar
+        index = similar.build(vectorizer, gold)
+        similar.save(index)
+        print(f"Saved similar-case index ({len(index)} cases) -> {similar.INDEX_PATH}")
+    except Exception as e:
+        print(f"[warn] Failed to build similar-case index: {e}")